@@ -0,0 +1,47 @@
+"""add ticket counters
+
+Revision ID: 1529520475b7
+Revises: 3dfcbcd0f50c
+Create Date: 2026-10-17 11:03:27.540172
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '1529520475b7'
+down_revision: Union[str, Sequence[str], None] = '3dfcbcd0f50c'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+
+    op.create_table(
+        "ticket_counters",
+        sa.Column("outlet_id", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("last_no", sa.BigInteger(), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.PrimaryKeyConstraint("outlet_id"),
+    )
+
+    # Seed each outlet with the highest number already issued (same digit-stripping the services used)
+    op.execute(
+        r"""
+        INSERT INTO ticket_counters (outlet_id, last_no)
+        SELECT outlet_id, MAX(NULLIF(regexp_replace(support_ticket_id, '\D', '', 'g'), '')::bigint)
+        FROM tickets
+        GROUP BY outlet_id
+        HAVING MAX(NULLIF(regexp_replace(support_ticket_id, '\D', '', 'g'), '')::bigint) IS NOT NULL
+        """
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+
+    op.drop_table("ticket_counters")
@@ -0,0 +1,122 @@
+"""add ticket stats rollup
+
+Revision ID: 263e338a4b4b
+Revises: 1529520475b7
+Create Date: 2026-10-17 11:48:09.117356
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '263e338a4b4b'
+down_revision: Union[str, Sequence[str], None] = '1529520475b7'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Per-statement upsert of status deltas; {source} yields (outlet_id, status, delta) rows
+UPSERT_DELTAS = """
+        INSERT INTO ticket_stats AS s (outlet_id, total_count, open_count, pending_count, closed_count, assigned_count)
+        SELECT *
+        FROM (
+            SELECT
+                outlet_id,
+                SUM(delta) AS total_count,
+                COALESCE(SUM(delta) FILTER (WHERE status = 'open'), 0) AS open_count,
+                COALESCE(SUM(delta) FILTER (WHERE status = 'pending'), 0) AS pending_count,
+                COALESCE(SUM(delta) FILTER (WHERE status = 'closed'), 0) AS closed_count,
+                COALESCE(SUM(delta) FILTER (WHERE status = 'assigned'), 0) AS assigned_count
+            FROM ({source}) AS deltas
+            GROUP BY outlet_id
+        ) AS changes
+        WHERE (total_count, open_count, pending_count, closed_count, assigned_count) <> (0, 0, 0, 0, 0)
+        ON CONFLICT (outlet_id) DO UPDATE SET
+            total_count    = s.total_count + EXCLUDED.total_count,
+            open_count     = s.open_count + EXCLUDED.open_count,
+            pending_count  = s.pending_count + EXCLUDED.pending_count,
+            closed_count   = s.closed_count + EXCLUDED.closed_count,
+            assigned_count = s.assigned_count + EXCLUDED.assigned_count,
+            updated_at     = now();
+"""
+
+TRIGGER_FUNCTION = f"""
+CREATE OR REPLACE FUNCTION ticket_stats_apply_changes() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+{UPSERT_DELTAS.format(source="SELECT outlet_id, status, 1 AS delta FROM new_rows")}
+    ELSIF TG_OP = 'DELETE' THEN
+{UPSERT_DELTAS.format(source="SELECT outlet_id, status, -1 AS delta FROM old_rows")}
+    ELSE
+{UPSERT_DELTAS.format(source="SELECT outlet_id, status, 1 AS delta FROM new_rows UNION ALL SELECT outlet_id, status, -1 FROM old_rows")}
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+
+    op.create_table(
+        "ticket_stats",
+        sa.Column("outlet_id", sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column("total_count", sa.BigInteger(), server_default=sa.text("0"), nullable=False),
+        sa.Column("open_count", sa.BigInteger(), server_default=sa.text("0"), nullable=False),
+        sa.Column("pending_count", sa.BigInteger(), server_default=sa.text("0"), nullable=False),
+        sa.Column("closed_count", sa.BigInteger(), server_default=sa.text("0"), nullable=False),
+        sa.Column("assigned_count", sa.BigInteger(), server_default=sa.text("0"), nullable=False),
+        sa.Column("updated_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.PrimaryKeyConstraint("outlet_id"),
+    )
+
+    op.execute(TRIGGER_FUNCTION)
+
+    # Statement-level triggers with transition tables: bulk writes touch each outlet row once
+    op.execute("""
+        CREATE TRIGGER tickets_stats_insert
+        AFTER INSERT ON tickets
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION ticket_stats_apply_changes();
+    """)
+    op.execute("""
+        CREATE TRIGGER tickets_stats_update
+        AFTER UPDATE ON tickets
+        REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION ticket_stats_apply_changes();
+    """)
+    op.execute("""
+        CREATE TRIGGER tickets_stats_delete
+        AFTER DELETE ON tickets
+        REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION ticket_stats_apply_changes();
+    """)
+
+    # Backfill; writers are held off so no delta lands between the count and the triggers
+    op.execute("LOCK TABLE tickets IN SHARE MODE")
+    op.execute("""
+        INSERT INTO ticket_stats (outlet_id, total_count, open_count, pending_count, closed_count, assigned_count)
+        SELECT
+            outlet_id,
+            COUNT(*),
+            COUNT(*) FILTER (WHERE status = 'open'),
+            COUNT(*) FILTER (WHERE status = 'pending'),
+            COUNT(*) FILTER (WHERE status = 'closed'),
+            COUNT(*) FILTER (WHERE status = 'assigned')
+        FROM tickets
+        GROUP BY outlet_id
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+
+    op.execute("DROP TRIGGER IF EXISTS tickets_stats_delete ON tickets")
+    op.execute("DROP TRIGGER IF EXISTS tickets_stats_update ON tickets")
+    op.execute("DROP TRIGGER IF EXISTS tickets_stats_insert ON tickets")
+    op.execute("DROP FUNCTION IF EXISTS ticket_stats_apply_changes()")
+    op.drop_table("ticket_stats")
@@ -0,0 +1,116 @@
+"""buffer ticket stats in delta rows
+
+Revision ID: 2fa0e7e63bd6
+Revises: 600eebf68673
+Create Date: 2026-10-17 16:05:42.518203
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2fa0e7e63bd6'
+down_revision: Union[str, Sequence[str], None] = '600eebf68673'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# Per-outlet sums of a statement's status deltas; {source} yields (outlet_id, status, delta) rows
+SUMMED_DELTAS = """
+            SELECT *
+            FROM (
+                SELECT
+                    outlet_id,
+                    SUM(delta) AS total_count,
+                    COALESCE(SUM(delta) FILTER (WHERE status = 'open'), 0) AS open_count,
+                    COALESCE(SUM(delta) FILTER (WHERE status = 'pending'), 0) AS pending_count,
+                    COALESCE(SUM(delta) FILTER (WHERE status = 'closed'), 0) AS closed_count,
+                    COALESCE(SUM(delta) FILTER (WHERE status = 'assigned'), 0) AS assigned_count
+                FROM ({source}) AS deltas
+                GROUP BY outlet_id
+            ) AS changes
+            WHERE (total_count, open_count, pending_count, closed_count, assigned_count) <> (0, 0, 0, 0, 0)
+"""
+
+# Ticket writes only append delta rows, so a long request transaction no longer holds the
+# outlet's ticket_stats row lock; TicketStatsDao.fold_deltas moves them into ticket_stats.
+APPEND_DELTAS = """
+        INSERT INTO ticket_stats_deltas (outlet_id, total_count, open_count, pending_count, closed_count, assigned_count)
+""" + SUMMED_DELTAS + ";"
+
+# What 263e338a4b4b installed, restored on downgrade
+UPSERT_DELTAS = """
+        INSERT INTO ticket_stats AS s (outlet_id, total_count, open_count, pending_count, closed_count, assigned_count)
+""" + SUMMED_DELTAS + """
+        ON CONFLICT (outlet_id) DO UPDATE SET
+            total_count    = s.total_count + EXCLUDED.total_count,
+            open_count     = s.open_count + EXCLUDED.open_count,
+            pending_count  = s.pending_count + EXCLUDED.pending_count,
+            closed_count   = s.closed_count + EXCLUDED.closed_count,
+            assigned_count = s.assigned_count + EXCLUDED.assigned_count,
+            updated_at     = now();
+"""
+
+
+def trigger_function(statement: str) -> str:
+    return f"""
+CREATE OR REPLACE FUNCTION ticket_stats_apply_changes() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+{statement.format(source="SELECT outlet_id, status, 1 AS delta FROM new_rows")}
+    ELSIF TG_OP = 'DELETE' THEN
+{statement.format(source="SELECT outlet_id, status, -1 AS delta FROM old_rows")}
+    ELSE
+{statement.format(source="SELECT outlet_id, status, 1 AS delta FROM new_rows UNION ALL SELECT outlet_id, status, -1 FROM old_rows")}
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+
+    op.create_table(
+        "ticket_stats_deltas",
+        sa.Column("id", sa.BigInteger(), sa.Identity(), nullable=False),
+        sa.Column("outlet_id", sa.Integer(), nullable=False),
+        sa.Column("total_count", sa.BigInteger(), nullable=False),
+        sa.Column("open_count", sa.BigInteger(), nullable=False),
+        sa.Column("pending_count", sa.BigInteger(), nullable=False),
+        sa.Column("closed_count", sa.BigInteger(), nullable=False),
+        sa.Column("assigned_count", sa.BigInteger(), nullable=False),
+        sa.Column("created_at", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_ticket_stats_deltas_outlet_id", "ticket_stats_deltas", ["outlet_id"], unique=False)
+
+    # the existing statement triggers call this function, so replacing it is enough
+    op.execute(trigger_function(APPEND_DELTAS))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+
+    op.execute(trigger_function(UPSERT_DELTAS))
+
+    # fold what is still buffered before the table goes
+    op.execute("""
+        INSERT INTO ticket_stats AS s (outlet_id, total_count, open_count, pending_count, closed_count, assigned_count)
+        SELECT outlet_id, SUM(total_count), SUM(open_count), SUM(pending_count), SUM(closed_count), SUM(assigned_count)
+        FROM ticket_stats_deltas
+        GROUP BY outlet_id
+        ON CONFLICT (outlet_id) DO UPDATE SET
+            total_count    = s.total_count + EXCLUDED.total_count,
+            open_count     = s.open_count + EXCLUDED.open_count,
+            pending_count  = s.pending_count + EXCLUDED.pending_count,
+            closed_count   = s.closed_count + EXCLUDED.closed_count,
+            assigned_count = s.assigned_count + EXCLUDED.assigned_count,
+            updated_at     = now()
+    """)
+    op.drop_index("ix_ticket_stats_deltas_outlet_id", table_name="ticket_stats_deltas")
+    op.drop_table("ticket_stats_deltas")
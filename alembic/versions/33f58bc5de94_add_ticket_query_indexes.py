@@ -0,0 +1,57 @@
+"""add ticket query indexes
+
+Revision ID: 33f58bc5de94
+Revises: 39ec2bb272fd
+Create Date: 2026-10-17 13:52:10.381746
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '33f58bc5de94'
+down_revision: Union[str, Sequence[str], None] = '39ec2bb272fd'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+OPEN_TICKETS = sa.text("status <> 'closed'")
+
+# name -> (columns, partial predicate); every list query filters outlet_id first and
+# keysets on (sort column, id), so the default created_at order is covered per filter
+TICKET_INDEXES = {
+    "ix_tickets_outlet_created_at_id": (["outlet_id", sa.text("created_at DESC"), sa.text("id DESC")], None),
+    "ix_tickets_outlet_status_created_at": (["outlet_id", "status", sa.text("created_at DESC"), sa.text("id DESC")], None),
+    "ix_tickets_outlet_priority_created_at": (["outlet_id", "priority", sa.text("created_at DESC"), sa.text("id DESC")], None),
+    "ix_tickets_outlet_department_created_at": (["outlet_id", "department", sa.text("created_at DESC"), sa.text("id DESC")], None),
+    # open-ticket load per agent (count_open_tickets_by_agents) and open queues per outlet
+    "ix_tickets_open_assigned_agent_id": (["assigned_agent_id"], OPEN_TICKETS),
+    "ix_tickets_open_outlet_created_at": (["outlet_id", sa.text("created_at DESC")], OPEN_TICKETS),
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+
+    with op.get_context().autocommit_block():
+        for name, (columns, where) in TICKET_INDEXES.items():
+            op.create_index(
+                name,
+                "tickets",
+                columns,
+                unique=False,
+                postgresql_where=where,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+
+    with op.get_context().autocommit_block():
+        for name in reversed(list(TICKET_INDEXES)):
+            op.drop_index(name, table_name="tickets", postgresql_concurrently=True, if_exists=True)
@@ -0,0 +1,78 @@
+"""add ticket assignment events
+
+Revision ID: 39ec2bb272fd
+Revises: 263e338a4b4b
+Create Date: 2026-10-17 13:21:54.604318
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '39ec2bb272fd'
+down_revision: Union[str, Sequence[str], None] = '263e338a4b4b'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+
+    op.create_table(
+        "ticket_assignment_events",
+        sa.Column("id", sa.BigInteger(), nullable=False),
+        sa.Column("ticket_id", sa.Integer(), nullable=False),
+        sa.Column("outlet_id", sa.Integer(), nullable=False),
+        sa.Column("previous_agent_id", sa.Integer(), nullable=True),
+        sa.Column("agent_id", sa.Integer(), nullable=True),
+        sa.Column("ts", sa.DateTime(timezone=True), server_default=sa.text("now()"), nullable=False),
+        sa.ForeignKeyConstraint(["ticket_id"], ["tickets.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index("ix_ticket_assignment_events_ticket_id_ts", "ticket_assignment_events", ["ticket_id", "ts"], unique=False)
+    op.create_index("ix_ticket_assignment_events_agent_id_ts", "ticket_assignment_events", ["agent_id", "ts"], unique=False)
+
+    # Each JSONB entry holds the agent being replaced; the replacement is the next entry's
+    # agent, or the current assignee for the last entry
+    op.execute("""
+        INSERT INTO ticket_assignment_events (ticket_id, outlet_id, previous_agent_id, agent_id, ts)
+        SELECT
+            t.id,
+            t.outlet_id,
+            (e.entry ->> 'agent_id')::int,
+            CASE
+                WHEN e.ord = jsonb_array_length(t.previous_assigned_agent_id) THEN t.assigned_agent_id
+                ELSE (LEAD(e.entry) OVER (PARTITION BY t.id ORDER BY e.ord) ->> 'agent_id')::int
+            END,
+            COALESCE((e.entry ->> 'timestamp')::timestamptz, t.updated_at)
+        FROM tickets t
+        CROSS JOIN LATERAL jsonb_array_elements(
+            CASE WHEN jsonb_typeof(t.previous_assigned_agent_id) = 'array' THEN t.previous_assigned_agent_id ELSE '[]'::jsonb END
+        ) WITH ORDINALITY AS e(entry, ord)
+        ORDER BY t.id, e.ord
+    """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+
+    # Rebuild the JSONB arrays so reassignments made since the upgrade aren't lost
+    op.execute("""
+        UPDATE tickets t
+        SET previous_assigned_agent_id = h.entries
+        FROM (
+            SELECT
+                ticket_id,
+                jsonb_agg(jsonb_build_object('agent_id', previous_agent_id, 'timestamp', ts) ORDER BY ts, id) AS entries
+            FROM ticket_assignment_events
+            GROUP BY ticket_id
+        ) AS h
+        WHERE h.ticket_id = t.id
+    """)
+
+    op.drop_index("ix_ticket_assignment_events_agent_id_ts", table_name="ticket_assignment_events")
+    op.drop_index("ix_ticket_assignment_events_ticket_id_ts", table_name="ticket_assignment_events")
+    op.drop_table("ticket_assignment_events")
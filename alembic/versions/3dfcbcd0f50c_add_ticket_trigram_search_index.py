@@ -0,0 +1,62 @@
+"""add ticket trigram search index
+
+Revision ID: 3dfcbcd0f50c
+Revises: a21aa16666d0
+Create Date: 2026-10-17 10:12:41.208913
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3dfcbcd0f50c'
+down_revision: Union[str, Sequence[str], None] = 'a21aa16666d0'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+SEARCH_TEXT_EXPRESSION = """
+    lower(
+        coalesce(support_ticket_id, '') || ' ' ||
+        coalesce(customer_details ->> 'customer_first_name', '') || ' ' ||
+        coalesce(customer_details ->> 'customer_last_name', '') || ' ' ||
+        coalesce(customer_details ->> 'customer_email', '') || ' ' ||
+        coalesce(subject, '') || ' ' ||
+        coalesce(description, '')
+    )
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+
+    # pg_trgm for substring matching, btree_gin so outlet_id can live in the same GIN index
+    op.execute("CREATE EXTENSION IF NOT EXISTS pg_trgm")
+    op.execute("CREATE EXTENSION IF NOT EXISTS btree_gin")
+
+    # An expression index rather than a STORED generated column: adding that column rewrites
+    # tickets under ACCESS EXCLUSIVE, while this builds CONCURRENTLY next to live traffic.
+    # Queries use the same expression (models.TICKET_SEARCH_TEXT).
+    with op.get_context().autocommit_block():
+        op.execute(f"""
+            CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_tickets_outlet_search_text_trgm
+            ON tickets USING gin (outlet_id, ({SEARCH_TEXT_EXPRESSION}) gin_trgm_ops)
+        """)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+
+    with op.get_context().autocommit_block():
+        op.drop_index(
+            "ix_tickets_outlet_search_text_trgm",
+            table_name="tickets",
+            postgresql_concurrently=True,
+            if_exists=True,
+        )
+
+    # left behind by the first version of this migration, which stored the expression
+    op.execute("ALTER TABLE tickets DROP COLUMN IF EXISTS search_text")
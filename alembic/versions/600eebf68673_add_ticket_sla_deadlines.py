@@ -0,0 +1,93 @@
+"""add ticket sla deadlines
+
+Revision ID: 600eebf68673
+Revises: 33f58bc5de94
+Create Date: 2026-10-17 14:36:51.204118
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '600eebf68673'
+down_revision: Union[str, Sequence[str], None] = '33f58bc5de94'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+SLA_COLUMNS = (
+    "first_response_due_at",
+    "resolution_due_at",
+    "first_response_breached_at",
+    "resolution_breached_at",
+    "sla_due_at",
+)
+
+# Deadlines come from the outlet's settings at creation time. sla_due_at is the earliest
+# deadline that is neither met nor breached yet, so the scanner only ever looks at rows
+# in ix_tickets_sla_due_at and a ticket drops out of it once it is closed.
+TRIGGER_FUNCTION = """
+CREATE OR REPLACE FUNCTION tickets_sla_deadlines() RETURNS trigger AS $$
+DECLARE
+    sla jsonb;
+BEGIN
+    IF TG_OP = 'INSERT' THEN
+        SELECT settings -> 'sla' INTO sla FROM support_settings WHERE outlet_id = NEW.outlet_id;
+        IF sla IS NOT NULL THEN
+            NEW.first_response_due_at := COALESCE(NEW.first_response_due_at, NEW.created_at + make_interval(mins => (sla ->> 'first_response_minutes')::int));
+            NEW.resolution_due_at := COALESCE(NEW.resolution_due_at, NEW.created_at + make_interval(mins => (sla ->> 'resolution_minutes')::int));
+        END IF;
+    END IF;
+
+    NEW.sla_due_at := LEAST(
+        CASE WHEN NEW.status IN ('open', 'pending') AND NEW.first_response_breached_at IS NULL THEN NEW.first_response_due_at END,
+        CASE WHEN NEW.status <> 'closed' AND NEW.resolution_breached_at IS NULL THEN NEW.resolution_due_at END
+    );
+    RETURN NEW;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+
+    for column in SLA_COLUMNS:
+        op.add_column("tickets", sa.Column(column, sa.DateTime(timezone=True), nullable=True))
+    op.add_column("tickets", sa.Column("sla_escalation_level", sa.Integer(), server_default=sa.text("0"), nullable=False))
+
+    op.execute(TRIGGER_FUNCTION)
+    op.execute("""
+        CREATE TRIGGER tickets_sla_deadlines
+        BEFORE INSERT OR UPDATE OF status, first_response_due_at, resolution_due_at, first_response_breached_at, resolution_breached_at
+        ON tickets
+        FOR EACH ROW EXECUTE FUNCTION tickets_sla_deadlines();
+    """)
+
+    # Existing tickets are not backfilled: SLAs apply to tickets created after an outlet enables them
+    with op.get_context().autocommit_block():
+        op.create_index(
+            "ix_tickets_sla_due_at",
+            "tickets",
+            ["sla_due_at"],
+            unique=False,
+            postgresql_where=sa.text("sla_due_at IS NOT NULL"),
+            postgresql_concurrently=True,
+            if_not_exists=True,
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+
+    with op.get_context().autocommit_block():
+        op.drop_index("ix_tickets_sla_due_at", table_name="tickets", postgresql_concurrently=True, if_exists=True)
+
+    op.execute("DROP TRIGGER IF EXISTS tickets_sla_deadlines ON tickets")
+    op.execute("DROP FUNCTION IF EXISTS tickets_sla_deadlines()")
+    op.drop_column("tickets", "sla_escalation_level")
+    for column in reversed(SLA_COLUMNS):
+        op.drop_column("tickets", column)
@@ -0,0 +1,50 @@
+"""drop unused ticket outlet indexes
+
+Revision ID: 83ae268deb47
+Revises: 2fa0e7e63bd6
+Create Date: 2026-10-17 17:20:14.630915
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '83ae268deb47'
+down_revision: Union[str, Sequence[str], None] = '2fa0e7e63bd6'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+# No query filters open tickets by outlet and created_at, and every outlet_id lookup is
+# served by the (outlet_id, ...) composites from 33f58bc5de94; both only cost writes
+UNUSED_INDEXES = {
+    "ix_tickets_open_outlet_created_at": (["outlet_id", sa.text("created_at DESC")], sa.text("status <> 'closed'")),
+    "ix_tickets_outlet_id": (["outlet_id"], None),
+}
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+
+    with op.get_context().autocommit_block():
+        for name in UNUSED_INDEXES:
+            op.drop_index(name, table_name="tickets", postgresql_concurrently=True, if_exists=True)
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+
+    with op.get_context().autocommit_block():
+        for name, (columns, where) in UNUSED_INDEXES.items():
+            op.create_index(
+                name,
+                "tickets",
+                columns,
+                unique=False,
+                postgresql_where=where,
+                postgresql_concurrently=True,
+                if_not_exists=True,
+            )
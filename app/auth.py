@@ -1,27 +1,97 @@
 import jwt
+import time
+import hashlib
 from datetime import datetime, timedelta, timezone  # Changed from UTC
 from starlette.requests import Request
 from starlette.responses import JSONResponse
 from starlette.exceptions import HTTPException
 from starlette.status import HTTP_401_UNAUTHORIZED
 from app.settings import get_settings
-from typing import Optional
+from typing import Optional, Callable
+from cachetools import LRUCache
+from prometheus_client import Counter, Histogram
 
 settings = get_settings()
-async def verify_jwt_token(request: Request):
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or not auth_header.startswith("Bearer "):
-        raise HTTPException(status_code=HTTP_401_UNAUTHORIZED, detail="Unauthorized")
 
-    token = auth_header.split(" ")[1]
+# ------------------------------------------ Verified token cache ------------------------------------------
+# Merchant tokens are long-lived and reused constantly, so a verified payload is kept per
+# sha256(token) until the token's own exp. Revocation is checked on every request.
+
+JWT_CACHE: LRUCache = LRUCache(maxsize=10000)  # sha256(token) -> verified payload
+REVOKED_TOKEN_HASHES: set[bytes] = set()
+_revocation_checks: list[Callable[[dict], bool]] = []
+
+JWT_CACHE_HITS = Counter("jwt_cache_hits_total", "Bearer tokens served from the verified-token cache")
+JWT_CACHE_MISSES = Counter("jwt_cache_misses_total", "Bearer tokens that needed a full decode and signature check")
+JWT_VERIFY_SECONDS = Histogram("jwt_verify_seconds", "Time spent decoding and verifying a bearer token")
+JWT_VERIFY_SECONDS_SAVED = Counter("jwt_verify_seconds_saved_total", "Verification time avoided by cache hits, at the running average cost")
+
+_avg_verify_seconds = 0.0
+
+
+def _token_hash(token: str) -> bytes:
+    return hashlib.sha256(token.encode()).digest()
+
+
+def add_revocation_check(check: Callable[[dict], bool]) -> None:
+    """Register check(payload) -> True when the token must be rejected (e.g. a shared denylist)."""
+    _revocation_checks.append(check)
+
+
+def revoke_token(token: str) -> None:
+    token_hash = _token_hash(token)
+    REVOKED_TOKEN_HASHES.add(token_hash)
+    JWT_CACHE.pop(token_hash, None)
+
+
+def _is_revoked(token_hash: bytes, payload: dict) -> bool:
+    return token_hash in REVOKED_TOKEN_HASHES or any(check(payload) for check in _revocation_checks)
+
+
+def _decode_jwt(token: str) -> dict:
+    global _avg_verify_seconds
+
+    started = time.perf_counter()
     try:
         payload = jwt.decode(token, settings.security.jwt_secret, algorithms=["HS256"])
-        return payload
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=HTTP_401_UNAUTHORIZED, detail="Token expired")
     except jwt.InvalidTokenError:
         raise HTTPException(status_code=HTTP_401_UNAUTHORIZED, detail="Invalid token")
 
+    elapsed = time.perf_counter() - started
+    JWT_VERIFY_SECONDS.observe(elapsed)
+    _avg_verify_seconds = elapsed if not _avg_verify_seconds else 0.9 * _avg_verify_seconds + 0.1 * elapsed
+    return payload
+
+
+async def verify_jwt_token(request: Request):
+    auth_header = request.headers.get("Authorization")
+    if not auth_header or not auth_header.startswith("Bearer "):
+        raise HTTPException(status_code=HTTP_401_UNAUTHORIZED, detail="Unauthorized")
+
+    token = auth_header.split(" ")[1]
+    token_hash = _token_hash(token)
+
+    payload = JWT_CACHE.get(token_hash)
+    if payload is not None:
+        exp = payload.get("exp")
+        if exp is not None and exp <= time.time():
+            JWT_CACHE.pop(token_hash, None)
+            raise HTTPException(status_code=HTTP_401_UNAUTHORIZED, detail="Token expired")
+        JWT_CACHE_HITS.inc()
+        JWT_VERIFY_SECONDS_SAVED.inc(_avg_verify_seconds)
+    else:
+        JWT_CACHE_MISSES.inc()
+        payload = _decode_jwt(token)
+        JWT_CACHE[token_hash] = payload
+
+    if _is_revoked(token_hash, payload):
+        raise HTTPException(status_code=HTTP_401_UNAUTHORIZED, detail="Token revoked")
+
+    # callers get their own copy; the cached payload stays untouched
+    return dict(payload)
+
 
 
 
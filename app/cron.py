@@ -1,11 +1,73 @@
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
+from apscheduler.schedulers.base import STATE_PAUSED, STATE_STOPPED
 from app.settings import get_settings
+from app.database import AdvisoryLockLeader
+from app.jobstore import AsyncPgJobStore
 
 settings = get_settings()
 
-scheduler = AsyncIOScheduler(jobstores={"default": SQLAlchemyJobStore(url=settings.db.support_tickets_db_url_sync)})
+# advisory lock id held by the one process that runs the scheduler
+SCHEDULER_LOCK_KEY = 7_263_400_122
 
-def start_scheduler():
-    scheduler.start()
-    print("🚀 Async scheduler started without any cron jobs.")
+jobstore = AsyncPgJobStore(dsn=settings.db.support_tickets_dsn)
+scheduler = AsyncIOScheduler(jobstores={"default": jobstore})
+
+def register_jobs():
+    # Textual references keep the job store pickles independent of import order
+    scheduler.add_job(
+        "modules.TicketsHarbour.dao:TicketStatsDao.reconcile_all",
+        trigger="interval",
+        minutes=30,
+        id="reconcile_ticket_stats",
+        replace_existing=True,
+        coalesce=True,
+        max_instances=1,
+    )
+    scheduler.add_job(
+        "modules.TicketsHarbour.dao:TicketStatsDao.fold_deltas",
+        trigger="interval",
+        minutes=1,
+        id="fold_ticket_stats",
+        replace_existing=True,
+        coalesce=True,
+        max_instances=1,
+    )
+    scheduler.add_job(
+        "modules.TicketsHarbour.dao:TicketSlaDao.scan",
+        trigger="interval",
+        minutes=1,
+        id="scan_ticket_slas",
+        replace_existing=True,
+        coalesce=True,
+        max_instances=1,
+    )
+
+async def _on_elected():
+    # another process may have changed the jobs while we were following
+    await jobstore.load()
+    register_jobs()
+    if scheduler.state == STATE_PAUSED:
+        scheduler.resume()
+    else:
+        scheduler.start()
+    print("🚀 Async scheduler leader, running jobs:", ", ".join(job.id for job in scheduler.get_jobs()))
+
+async def _on_demoted():
+    # the election failed before the scheduler ever started; nothing to pause
+    if scheduler.state == STATE_STOPPED:
+        return
+    scheduler.pause()
+    await jobstore.flush()
+    print("⏸️ Async scheduler lost leadership, paused")
+
+scheduler_leader = AdvisoryLockLeader(settings.db.support_tickets_dsn, SCHEDULER_LOCK_KEY, on_elected=_on_elected, on_demoted=_on_demoted)
+
+async def start_scheduler():
+    # every worker competes; only the lock holder loads jobs and starts polling
+    await scheduler_leader.start()
+
+async def stop_scheduler():
+    await scheduler_leader.stop()
+    if scheduler.running:
+        scheduler.shutdown(wait=False)
+    await jobstore.close()
@@ -1,6 +1,12 @@
+import asyncio
+import asyncpg
+import orjson
 from collections.abc import Callable
-from typing import AsyncGenerator, Optional, TypeVar, Any, Type, Mapping
-from sqlalchemy import delete as sa_delete
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from typing import AsyncGenerator, AsyncIterator, Awaitable, Optional, TypeVar, Any, Type, Mapping
+from sqlalchemy import delete as sa_delete, insert as sa_insert, text
+from sqlalchemy.exc import DBAPIError
 from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
 from sqlalchemy.orm import sessionmaker, declarative_base
 from sqlalchemy.sql import Select, Executable
@@ -41,97 +47,356 @@ def get_session_factory(db_name: Optional[str] = None) -> Callable[[], AsyncSess
     return SupportTicketAsyncSession
 
 
-# ------------------------------------------ Generic CRUD Utilities ------------------------------------------
+# ------------------------------------------ Unit of Work ------------------------------------------
+
+_current_session: ContextVar[Optional[AsyncSession]] = ContextVar("support_ticket_session", default=None)
+
+
+@asynccontextmanager
+async def unit_of_work(db_name: Optional[str] = None) -> AsyncIterator[AsyncSession]:
+    """
+    One session, one connection and one transaction for everything inside the block.
+    The CRUD helpers below join it automatically; a nested block reuses the outer one.
+    The connection is only checked out on first use.
+    """
+    session = _current_session.get()
+    if session is not None:
+        yield session
+        return
 
-async def create(instance: T, db_name: Optional[str] = None) -> int:
     session_factory = get_session_factory(db_name)
     async with session_factory() as session:
+        token = _current_session.set(session)
         try:
             async with session.begin():
-                session.add(instance)
-                await session.flush()
-                return instance.id
-        except Exception:
-            await session.rollback()
+                yield session
+                # a statement failed and the caller handled the error (say, by returning a 500
+                # response); the transaction can only roll back, so don't try to commit it
+                aborted = _transaction_failed(session)
+                if aborted:
+                    await session.rollback()
+        except BaseException:
+            # rolled back (or the commit itself failed); undo what lives outside the database
+            await _run_on_rollback(session)
             raise
+        finally:
+            _current_session.reset(token)
 
+        if aborted:
+            print("[DB] Unit of work rolled back: a statement failed inside it")
+            await _run_on_rollback(session)
+            return
 
-async def update(instance: T, db_name: Optional[str] = None) -> int:
-    session_factory = get_session_factory(db_name)
-    async with session_factory() as session:
+        # only reached on commit; a rollback drops the callbacks
+        session.info.pop("on_rollback", None)
+        for callback in session.info.pop("after_commit", ()):
+            await callback()
+
+
+def _transaction_failed(session: AsyncSession) -> bool:
+    # failed: a database error went through session_scope; inactive: a failed flush
+    transaction = session.get_transaction()
+    return session.info.get("failed", False) or (session.in_transaction() and transaction is not None and not transaction.is_active)
+
+
+async def _run_on_rollback(session: AsyncSession) -> None:
+    session.info.pop("after_commit", None)
+    for callback in session.info.pop("on_rollback", ()):
         try:
-            async with session.begin():
-                await session.merge(instance)
-                await session.flush()
-                return instance.id
-        except Exception:
-            await session.rollback()
-            raise
+            await callback()
+        except Exception as e:
+            print(f"[DB] on_rollback callback failed: {e}")
 
 
-async def update_fields(model: Type[T], id: int, data: dict, db_name: Optional[str] = None) -> int:
+async def after_commit(callback: Callable[[], Awaitable[None]]) -> None:
+    """
+    Run callback once the active unit of work commits, or right away outside one (the
+    helpers have already committed then). For side effects that must not see, or
+    outlive, an uncommitted write, such as enqueueing background tasks.
+    """
+    session = _current_session.get()
+    if session is None:
+        await callback()
+    else:
+        session.info.setdefault("after_commit", []).append(callback)
+
+
+async def on_rollback(callback: Callable[[], Awaitable[None]]) -> None:
+    """
+    Run callback if the active unit of work rolls back instead of committing. Outside one
+    there is nothing left to roll back, so it is dropped. For compensating side effects
+    that were made before the write they belong to, such as objects uploaded to S3.
+    """
+    session = _current_session.get()
+    if session is not None:
+        session.info.setdefault("on_rollback", []).append(callback)
+
+
+async def get_unit_of_work() -> AsyncGenerator[AsyncSession, None]:
+    async with unit_of_work() as session:
+        yield session
+
+
+@asynccontextmanager
+async def session_scope(db_name: Optional[str] = None) -> AsyncIterator[AsyncSession]:
+    """
+    The active unit of work's session, or a short-lived session with its own transaction.
+    A database error inside a unit of work marks it failed, even if the caller handles it.
+    """
+    session = _current_session.get()
+    if session is not None:
+        try:
+            yield session
+        except DBAPIError:
+            # Postgres has aborted the transaction; unit_of_work must roll it back
+            session.info["failed"] = True
+            raise
+        return
+
     session_factory = get_session_factory(db_name)
     async with session_factory() as session:
-        try:
-            async with session.begin():
-                instance = await session.get(model, id)
-                if not instance:
-                    raise ValueError(f"{model.__name__} with id {id} not found")
+        async with session.begin():
+            yield session
 
-                for key, value in data.items():
-                    setattr(instance, key, value)
 
-                await session.flush()
-                return instance.id
-        except Exception:
-            await session.rollback()
-            raise
+# ------------------------------------------ Generic CRUD Utilities ------------------------------------------
+
+async def create(instance: T, db_name: Optional[str] = None) -> int:
+    async with session_scope(db_name) as session:
+        session.add(instance)
+        await session.flush()
+        return instance.id
+
+
+async def update(instance: T, db_name: Optional[str] = None) -> int:
+    async with session_scope(db_name) as session:
+        await session.merge(instance)
+        await session.flush()
+        return instance.id
+
+
+async def update_fields(model: Type[T], id: int, data: dict, db_name: Optional[str] = None) -> int:
+    async with session_scope(db_name) as session:
+        instance = await session.get(model, id)
+        if not instance:
+            raise ValueError(f"{model.__name__} with id {id} not found")
+
+        for key, value in data.items():
+            setattr(instance, key, value)
+
+        await session.flush()
+        return instance.id
 
 
 async def delete(instance: T, db_name: Optional[str] = None) -> None:
-    session_factory = get_session_factory(db_name)
-    async with session_factory() as session:
-        try:
-            async with session.begin():
-                await session.delete(instance)
-        except Exception:
-            await session.rollback()
-            raise
+    async with session_scope(db_name) as session:
+        await session.delete(instance)
+        await session.flush()
 
 
 async def delete_by_id(model: Type[T], id: int, db_name: Optional[str] = None) -> None:
-    session_factory = get_session_factory(db_name)
-    async with session_factory() as session:
-        try:
-            async with session.begin():
-                stmt = sa_delete(model).where(model.id == id)
-                await session.execute(stmt)
-        except Exception:
-            await session.rollback()
-            raise
+    async with session_scope(db_name) as session:
+        stmt = sa_delete(model).where(model.id == id)
+        await session.execute(stmt)
 
 
 async def fetch_one(query: Select, db_name: Optional[str] = None) -> Optional[Any]:
-    session_factory = get_session_factory(db_name)
-    async with session_factory() as session:
+    async with session_scope(db_name) as session:
         result = await session.execute(query)
         return result.scalar_one_or_none()
 
 
 async def fetch_all(query: Select, db_name: Optional[str] = None) -> list[Any]:
-    session_factory = get_session_factory(db_name)
-    async with session_factory() as session:
+    async with session_scope(db_name) as session:
         result = await session.execute(query)
         return result.scalars().all()
 
 
 async def execute_query(query: Executable, db_name: Optional[str] = None) -> Any:
+    async with session_scope(db_name) as session:
+        result = await session.execute(query)
+        return result
+
+
+async def bulk_insert(model: Type[T], rows: list[dict], db_name: Optional[str] = None) -> list[int]:
+    """
+    One multi-row INSERT ... RETURNING id, committed in its own transaction even inside a
+    unit of work, so a long import never holds its locks for the rest of the request.
+    """
+    if not rows:
+        return []
+
     session_factory = get_session_factory(db_name)
     async with session_factory() as session:
+        async with session.begin():
+            result = await session.execute(sa_insert(model).values(rows).returning(model.id))
+            return list(result.scalars().all())
+
+
+async def estimate_count(query: Select, db_name: Optional[str] = None) -> int:
+    """
+    Planner row estimate for `query` via EXPLAIN; the query itself is not executed.
+    """
+    async with session_scope(db_name) as session:
+        connection = await session.connection()
+        compiled = query.compile(dialect=connection.dialect, compile_kwargs={"literal_binds": True})
+        result = await connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {compiled}")
+        plan = result.scalar_one()
+
+    if isinstance(plan, (str, bytes)):
+        plan = orjson.loads(plan)
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+
+# ------------------------------------------ Postgres LISTEN / NOTIFY ------------------------------------------
+
+async def notify(channel: str, payload: dict, db_name: Optional[str] = None) -> None:
+    query = text("SELECT pg_notify(:channel, :payload)").bindparams(channel=channel, payload=orjson.dumps(payload).decode())
+    await execute_query(query, db_name)
+
+
+class PgListener:
+    """
+    One dedicated asyncpg connection per process that LISTENs on the subscribed channels
+    and hands decoded payloads to in-process callbacks. After a reconnect every callback
+    is called with None, since notifications sent while disconnected are lost.
+    """
+
+    def __init__(self, dsn: str, reconnect_delay: float = 2.0):
+        self._dsn = dsn
+        self._reconnect_delay = reconnect_delay
+        self._callbacks: dict[str, list[Callable[[Optional[dict]], None]]] = {}
+        self._connection: Optional[asyncpg.Connection] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def subscribe(self, channel: str, callback: Callable[[Optional[dict]], None]) -> None:
+        self._callbacks.setdefault(channel, []).append(callback)
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _dispatch(self, connection, pid, channel, payload) -> None:
         try:
-            async with session.begin():
-                result = await session.execute(query)
-                return result
+            data = orjson.loads(payload) if payload else None
+        except orjson.JSONDecodeError:
+            data = None
+        for callback in self._callbacks.get(channel, []):
+            callback(data)
+
+    async def _run(self) -> None:
+        connected_before = False
+        while True:
+            closed = asyncio.Event()
+            try:
+                self._connection = await asyncpg.connect(self._dsn)
+                self._connection.add_termination_listener(lambda _: closed.set())
+                for channel in self._callbacks:
+                    await self._connection.add_listener(channel, self._dispatch)
+
+                if connected_before:
+                    for callbacks in self._callbacks.values():
+                        for callback in callbacks:
+                            callback(None)
+                connected_before = True
+
+                await closed.wait()
+            except asyncio.CancelledError:
+                if self._connection is not None and not self._connection.is_closed():
+                    await self._connection.close()
+                raise
+            except Exception as e:
+                print(f"⚠️ LISTEN connection failed: {e}")
+
+            await asyncio.sleep(self._reconnect_delay)
+
+
+pg_listener = PgListener(settings.db.support_tickets_dsn)
+
+
+class AdvisoryLockLeader:
+    """
+    Leader election over a session-level pg_try_advisory_lock held on a dedicated connection.
+    Followers retry every `interval` seconds and the leader pings its connection just as
+    often, so a dead leader is replaced within about one interval (Postgres drops the lock
+    with the session). on_elected / on_demoted are awaited on each transition.
+    """
+
+    def __init__(self, dsn: str, lock_key: int, on_elected: Callable[[], Any], on_demoted: Callable[[], Any], interval: float = 2.0):
+        self._dsn = dsn
+        self._lock_key = lock_key
+        self._on_elected = on_elected
+        self._on_demoted = on_demoted
+        self._interval = interval
+        self._connection: Optional[asyncpg.Connection] = None
+        self._task: Optional[asyncio.Task] = None
+        self.is_leader = False
+
+    async def start(self) -> None:
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        try:
+            await self._demote()
+        finally:
+            await self._close_connection()
+
+    async def _demote(self) -> None:
+        if not self.is_leader:
+            return
+        self.is_leader = False
+        try:
+            await self._on_demoted()
+        except Exception as e:
+            print(f"⚠️ Leader on_demoted hook failed: {e}")
+
+    async def _close_connection(self) -> None:
+        # closing the session is what releases the advisory lock
+        connection, self._connection = self._connection, None
+        if connection is None or connection.is_closed():
+            return
+        try:
+            await connection.close()
         except Exception:
-            await session.rollback()
-            raise
+            connection.terminate()
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                if self._connection is None or self._connection.is_closed():
+                    self._connection = await asyncpg.connect(self._dsn)
+
+                if self.is_leader:
+                    await self._connection.execute("SELECT 1")
+                elif await self._connection.fetchval("SELECT pg_try_advisory_lock($1)", self._lock_key):
+                    self.is_leader = True
+                    await self._on_elected()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # a dropped connection or a failed on_elected: give the lock up either way,
+                # so another worker (or this one, next round) can take over
+                print(f"⚠️ Leader election failed, releasing the lock: {e}")
+                try:
+                    await self._demote()
+                finally:
+                    await self._close_connection()
+
+            await asyncio.sleep(self._interval)
@@ -0,0 +1,150 @@
+import asyncio
+import pickle
+import asyncpg
+from typing import Optional
+from apscheduler.job import Job
+from apscheduler.jobstores.memory import MemoryJobStore
+from apscheduler.util import datetime_to_utc_timestamp
+
+# ------------------------------------------ Async write-behind job store ------------------------------------------
+
+class AsyncPgJobStore(MemoryJobStore):
+    """
+    APScheduler calls job stores synchronously from the event loop, so every lookup here is
+    served from memory and never touches the database. Adds, updates and removals are
+    queued and written by a background task in one transaction per flush, so a burst of
+    jobs firing costs one round trip instead of one blocking query each.
+    Uses the SQLAlchemyJobStore table layout, so existing apscheduler_jobs rows load as-is.
+    """
+
+    def __init__(self, dsn: str, tablename: str = "apscheduler_jobs", flush_interval: float = 1.0, pickle_protocol: int = pickle.HIGHEST_PROTOCOL):
+        super().__init__()
+        self._dsn = dsn
+        self._tablename = tablename
+        self._flush_interval = flush_interval
+        self._pickle_protocol = pickle_protocol
+        self._connection: Optional[asyncpg.Connection] = None
+        self._pending: dict[str, Optional[tuple[Optional[float], bytes]]] = {}  # job id -> (next_run_time, state), None to delete
+        self._wakeup = asyncio.Event()
+        self._flush_task: Optional[asyncio.Task] = None
+
+    async def _connect(self) -> asyncpg.Connection:
+        if self._connection is None or self._connection.is_closed():
+            self._connection = await asyncpg.connect(self._dsn)
+        return self._connection
+
+    async def load(self) -> None:
+        """Replace the in-memory jobs with the persisted ones; changes still queued are kept."""
+        connection = await self._connect()
+        await connection.execute(f"""
+            CREATE TABLE IF NOT EXISTS {self._tablename} (
+                id VARCHAR(191) PRIMARY KEY,
+                next_run_time DOUBLE PRECISION,
+                job_state BYTEA NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS ix_{self._tablename}_next_run_time ON {self._tablename} (next_run_time);
+        """)
+        rows = await connection.fetch(f"SELECT id, job_state FROM {self._tablename} ORDER BY next_run_time")
+
+        self._jobs = []
+        self._jobs_index = {}
+        scheduler = getattr(self, "_scheduler", None)
+        for row in rows:
+            try:
+                job = Job.__new__(Job)
+                job.__setstate__(pickle.loads(row["job_state"]))
+            except BaseException as e:
+                print(f"[CRON] Unable to restore job {row['id']}, removing it: {e}")
+                self._queue(row["id"], None)
+                continue
+            if scheduler is not None:
+                job._scheduler = scheduler
+                job._jobstore_alias = self._alias
+            MemoryJobStore.add_job(self, job)
+
+    def start(self, scheduler, alias):
+        super().start(scheduler, alias)
+        for job, _ in self._jobs:
+            job._scheduler = scheduler
+            job._jobstore_alias = alias
+        self._flush_task = asyncio.get_running_loop().create_task(self._flush_loop())
+
+    async def close(self) -> None:
+        """Stop the writer and persist whatever is still queued."""
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        await self.flush()
+        if self._connection is not None:
+            await self._connection.close()
+            self._connection = None
+
+    # writes land in memory right away and are persisted by the flush task
+
+    def _queue(self, job_id: str, job: Optional[Job]) -> None:
+        if job is None:
+            self._pending[job_id] = None
+        else:
+            state = pickle.dumps(job.__getstate__(), self._pickle_protocol)
+            self._pending[job_id] = (datetime_to_utc_timestamp(job.next_run_time), state)
+        self._wakeup.set()
+
+    def add_job(self, job):
+        super().add_job(job)
+        self._queue(job.id, job)
+
+    def update_job(self, job):
+        super().update_job(job)
+        self._queue(job.id, job)
+
+    def remove_job(self, job_id):
+        super().remove_job(job_id)
+        self._queue(job_id, None)
+
+    def remove_all_jobs(self):
+        for job, _ in self._jobs:
+            self._queue(job.id, None)
+        super().remove_all_jobs()
+
+    async def _flush_loop(self) -> None:
+        while True:
+            await self._wakeup.wait()
+            # let a burst of changes collapse into a single batch
+            await asyncio.sleep(self._flush_interval)
+            self._wakeup.clear()
+            await self.flush()
+
+    async def flush(self) -> None:
+        if not self._pending:
+            return
+
+        pending, self._pending = self._pending, {}
+        upserts = [(job_id, change[0], change[1]) for job_id, change in pending.items() if change is not None]
+        deletes = [job_id for job_id, change in pending.items() if change is None]
+
+        try:
+            connection = await self._connect()
+            async with connection.transaction():
+                if deletes:
+                    await connection.execute(f"DELETE FROM {self._tablename} WHERE id = ANY($1::varchar[])", deletes)
+                if upserts:
+                    await connection.executemany(f"""
+                        INSERT INTO {self._tablename} (id, next_run_time, job_state)
+                        VALUES ($1, $2, $3)
+                        ON CONFLICT (id) DO UPDATE SET
+                            next_run_time = EXCLUDED.next_run_time,
+                            job_state = EXCLUDED.job_state
+                    """, upserts)
+        except Exception as e:
+            print(f"[CRON] Job store flush failed, retrying: {e}")
+            # keep anything queued meanwhile; it is newer than what failed
+            for job_id, change in pending.items():
+                self._pending.setdefault(job_id, change)
+            if self._connection is not None and not self._connection.is_closed():
+                await self._connection.close()
+            self._connection = None
+            self._wakeup.set()
@@ -0,0 +1,223 @@
+import asyncio
+import time
+import aiosmtplib
+from collections import deque
+from email.message import EmailMessage
+from email.utils import make_msgid
+from typing import Optional
+from prometheus_client import Counter
+
+from app.settings import get_settings
+
+settings = get_settings()
+
+MAIL_SENT = Counter("smtp_messages_sent_total", "Messages accepted by the SMTP server")
+MAIL_FAILED = Counter("smtp_messages_failed_total", "Messages refused by the SMTP server or not sent")
+MAIL_DIGESTED = Counter("smtp_notifications_digested_total", "Notifications folded into a per-recipient digest")
+
+# connection-level failures: the session is dropped and the message retried on a fresh one
+SMTP_CONNECTION_ERRORS = (aiosmtplib.SMTPServerDisconnected, aiosmtplib.SMTPConnectError, aiosmtplib.SMTPTimeoutError, OSError)
+
+# ------------------------------------------ Pooled SMTP delivery ------------------------------------------
+
+def build_message(to: str, subject: str, body: str, subtype: str = "plain") -> EmailMessage:
+    message = EmailMessage()
+    message["From"] = settings.email.from_email
+    message["To"] = to
+    message["Subject"] = subject
+    message["Message-ID"] = make_msgid()
+    message.set_content(body, subtype=subtype)
+    return message
+
+
+def _resolve(future: Optional[asyncio.Future], error: Optional[BaseException] = None) -> None:
+    if error is not None:
+        MAIL_FAILED.inc()
+    else:
+        MAIL_SENT.inc()
+    if future is None or future.done():
+        return
+    if error is not None:
+        future.set_exception(error)
+    else:
+        future.set_result(None)
+
+
+async def _close(smtp: Optional[aiosmtplib.SMTP]) -> None:
+    if smtp is None or not smtp.is_connected:
+        return
+    try:
+        await smtp.quit()
+    except (aiosmtplib.SMTPException, OSError):
+        smtp.close()
+
+
+class Mailer:
+    """
+    A fixed set of sender tasks, each owning one persistent authenticated SMTP session.
+    send() queues the message and waits until the server accepted it (or raises), so
+    callers such as the notification tasks can retry. Each sender takes whatever is queued,
+    up to a batch, and sends it back to back on its session; sessions idle for
+    smtp_idle_timeout are closed and reopened on demand.
+    Digestible notifications to a recipient who already got digest_threshold of them in
+    the window are held and sent together as one digest.
+    Without SMTP_HOST messages are only logged.
+    """
+
+    def __init__(self):
+        email = settings.email
+        self.pool_size = email.smtp_pool_size
+        self.batch_size = email.smtp_batch_size
+        self.idle_timeout = email.smtp_idle_timeout
+        self.digest_threshold = email.digest_threshold
+        self.digest_window = email.digest_window_seconds
+        self.digest_interval = email.digest_interval_seconds
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._senders: list[asyncio.Task] = []
+        self._digest_task: Optional[asyncio.Task] = None
+        self._recent: dict[str, deque[float]] = {}  # recipient -> send times within the digest window
+        self._held: dict[str, list[str]] = {}       # recipient -> subjects waiting for the next digest
+
+    async def start(self) -> None:
+        if self._senders:
+            return
+        if not settings.email.smtp_host:
+            print("[MAIL] SMTP_HOST not set, emails are only logged")
+            return
+
+        # bounded, so a stalled server pushes back on producers instead of growing memory
+        self._queue = asyncio.Queue(maxsize=self.pool_size * self.batch_size * 2)
+        loop = asyncio.get_running_loop()
+        self._senders = [loop.create_task(self._sender()) for _ in range(self.pool_size)]
+        self._digest_task = loop.create_task(self._digest_loop())
+
+    async def stop(self) -> None:
+        if not self._senders:
+            return
+        self._digest_task.cancel()
+        await asyncio.gather(self._digest_task, return_exceptions=True)
+        await self._flush_digests()
+        await self._queue.join()
+
+        for sender in self._senders:
+            sender.cancel()
+        await asyncio.gather(*self._senders, return_exceptions=True)
+        self._senders = []
+        self._digest_task = None
+        self._queue = None
+
+    async def send(self, to: str, subject: str, body: str, subtype: str = "plain", digest: bool = False) -> None:
+        if self._queue is None:
+            print(f"[MAIL] {to}: {subject}")
+            return
+
+        if digest and self._over_threshold(to):
+            self._held.setdefault(to, []).append(subject)
+            MAIL_DIGESTED.inc()
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((build_message(to, subject, body, subtype), future))
+        await future
+
+    def _over_threshold(self, to: str) -> bool:
+        now = time.monotonic()
+        sent = self._recent.setdefault(to, deque())
+        while sent and sent[0] <= now - self.digest_window:
+            sent.popleft()
+        if to in self._held or len(sent) >= self.digest_threshold:
+            return True
+        sent.append(now)
+        return False
+
+    # ---- digests ----
+
+    async def _digest_loop(self) -> None:
+        while True:
+            await asyncio.sleep(self.digest_interval)
+            try:
+                await self._flush_digests()
+            except Exception as e:
+                print(f"[MAIL] Digest flush failed: {e}")
+
+    async def _flush_digests(self) -> None:
+        held, self._held = self._held, {}
+        for to, subjects in held.items():
+            body = "\n".join(f"- {subject}" for subject in subjects)
+            # fire and forget: the notifications were already acknowledged when they were held
+            await self._queue.put((build_message(to, f"{len(subjects)} ticket updates", body), None))
+
+        cutoff = time.monotonic() - self.digest_window
+        for to in [to for to, sent in self._recent.items() if not sent or sent[-1] <= cutoff]:
+            del self._recent[to]
+
+    # ---- senders ----
+
+    async def _connect(self) -> aiosmtplib.SMTP:
+        email = settings.email
+        implicit_tls = email.use_tls and email.smtp_port == 465
+        smtp = aiosmtplib.SMTP(
+            hostname=email.smtp_host,
+            port=email.smtp_port,
+            username=email.smtp_user or None,
+            password=email.smtp_password or None,
+            use_tls=implicit_tls,
+            start_tls=email.use_tls and not implicit_tls,
+            timeout=email.smtp_timeout,
+        )
+        await smtp.connect()
+        return smtp
+
+    async def _sender(self) -> None:
+        smtp: Optional[aiosmtplib.SMTP] = None
+        try:
+            while True:
+                try:
+                    first = await asyncio.wait_for(self._queue.get(), timeout=self.idle_timeout)
+                except asyncio.TimeoutError:
+                    await _close(smtp)
+                    smtp = None
+                    continue
+
+                batch = [first]
+                while len(batch) < self.batch_size and not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                try:
+                    smtp = await self._send_batch(smtp, batch)
+                finally:
+                    for _ in batch:
+                        self._queue.task_done()
+        finally:
+            await _close(smtp)
+
+    async def _send_batch(self, smtp: Optional[aiosmtplib.SMTP], batch: list) -> Optional[aiosmtplib.SMTP]:
+        index, reconnected = 0, False
+        while index < len(batch):
+            message, future = batch[index]
+            try:
+                if smtp is None:
+                    smtp = await self._connect()
+                await smtp.send_message(message)
+            except SMTP_CONNECTION_ERRORS as e:
+                await _close(smtp)
+                smtp = None
+                if reconnected:
+                    # a fresh session failed as well; fail the rest rather than hammer the server
+                    print(f"[MAIL] SMTP unavailable, {len(batch) - index} messages failed: {e}")
+                    for _, pending in batch[index:]:
+                        _resolve(pending, e)
+                    return None
+                reconnected = True
+                continue
+            except Exception as e:
+                # refused recipient or malformed message; the session itself is still usable
+                _resolve(future, e)
+            else:
+                _resolve(future)
+                reconnected = False
+            index += 1
+        return smtp
+
+
+mailer = Mailer()
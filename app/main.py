@@ -18,7 +18,11 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
 from app.settings import get_settings
 from app.utility import exception_handler, ApiResponse
 from app.project_schemas import APIResponse
-from app.cron import start_scheduler
+from app.cron import start_scheduler, stop_scheduler
+from app.database import pg_listener
+from app.storage import s3_clients
+from app.tasks import task_queue
+from app.mailer import mailer
 from app.routers import routers 
 
 settings = get_settings()
@@ -114,9 +118,18 @@ routers(app)
 # --------------------------------------------- Lifespan Events ---------------------------------------------
 @app.on_event("startup")
 async def on_startup():
-    start_scheduler()
+    await start_scheduler()
+    await pg_listener.start()
+    await s3_clients.start()
+    await mailer.start()
+    await task_queue.start()
     print("🟢 App is starting up...")
 
 @app.on_event("shutdown")
 async def on_shutdown():
+    await stop_scheduler()
+    await task_queue.stop()
+    await mailer.stop()
+    await pg_listener.stop()
+    await s3_clients.stop()
     print("🔴 App is shutting down...")
@@ -15,6 +15,11 @@ class APIResponse(BaseModel, Generic[T]):
     def success(cls, message: str = "Success", data: Optional[T] = None, code: int = 200):
         return cls(code=code, message=message, status="success", data=data)
 
+    @staticmethod
+    def success_body(message: str = "Success", data: Optional[Any] = None, code: int = 200) -> dict:
+        # same envelope as success(), as a plain dict for handlers that render JSON themselves
+        return {"code": code, "message": message, "status": "success", "data": data}
+
     @classmethod
     def error(cls, message: str = "Something went wrong", code: int = 400):
         return cls(code=code, message=message, status="error", data=None)
@@ -0,0 +1,118 @@
+import os
+import hashlib
+import orjson
+from itertools import count
+from typing import Callable, Optional, Any
+from cachetools import TTLCache
+from fastapi import Request
+from fastapi.responses import Response
+
+from app.database import notify, pg_listener
+
+# ------------------------------------------ Per-outlet response cache ------------------------------------------
+# Every outlet has a version token that ticket/agent writes bump (locally and, via NOTIFY,
+# in the other workers). ETags are derived from the token and the normalized query params,
+# so an unchanged If-None-Match is answered with 304 before any database work.
+# Tokens are per process: a client bouncing between workers just gets a full response.
+
+RESPONSE_CACHE_CHANNEL = "response_cache_invalidate"
+
+# (scope, outlet_id, params) -> (etag, rendered body)
+RESPONSE_CACHE: TTLCache = TTLCache(maxsize=2048, ttl=300)
+
+# outlet_id -> current version token
+OUTLET_VERSIONS: dict[int, str] = {}
+
+# other per-outlet caches (such as ticket counts) dropped together with the responses;
+# called with the outlet id, or None when every outlet may be stale
+INVALIDATION_HOOKS: list[Callable[[Optional[int]], None]] = []
+
+_PROCESS_NONCE = os.urandom(4).hex()
+_version_counter = count(1)
+
+
+def _bump(outlet_id: int) -> None:
+    OUTLET_VERSIONS[outlet_id] = f"{_PROCESS_NONCE}.{next(_version_counter)}"
+
+
+def on_invalidate(hook: Callable[[Optional[int]], None]) -> Callable[[Optional[int]], None]:
+    INVALIDATION_HOOKS.append(hook)
+    return hook
+
+
+def _run_invalidation_hooks(outlet_id: Optional[int]) -> None:
+    for hook in INVALIDATION_HOOKS:
+        hook(outlet_id)
+
+
+def outlet_version(outlet_id: int) -> str:
+    if outlet_id not in OUTLET_VERSIONS:
+        _bump(outlet_id)
+    return OUTLET_VERSIONS[outlet_id]
+
+
+async def invalidate_outlet(outlet_id: Optional[int]) -> None:
+    """
+    Call after any ticket/agent write. The NOTIFY is delivered on commit, and this worker
+    receives it too, so a read that raced the uncommitted write can't keep a stale token.
+    """
+    if outlet_id is None:
+        return
+    _bump(outlet_id)
+    _run_invalidation_hooks(outlet_id)
+    await notify(RESPONSE_CACHE_CHANNEL, {"outlet_id": outlet_id})
+
+
+def _on_response_cache_notify(payload: Optional[dict]) -> None:
+    # None means the listener reconnected and may have missed invalidations
+    if payload is None:
+        OUTLET_VERSIONS.clear()
+        RESPONSE_CACHE.clear()
+        _run_invalidation_hooks(None)
+        return
+    if payload.get("outlet_id") is not None:
+        _bump(payload["outlet_id"])
+        _run_invalidation_hooks(payload["outlet_id"])
+
+
+pg_listener.subscribe(RESPONSE_CACHE_CHANNEL, _on_response_cache_notify)
+
+
+def cache_key(scope: str, outlet_id: int, params: dict) -> tuple:
+    normalized = tuple(sorted((k, str(v)) for k, v in params.items() if k != "outlet_id" and v not in (None, "")))
+    return scope, outlet_id, normalized
+
+
+def etag_for(key: tuple) -> str:
+    digest = hashlib.blake2b(repr(key).encode(), digest_size=8).hexdigest()
+    return f'W/"{outlet_version(key[1])}-{digest}"'
+
+
+def not_modified(request: Request, etag: str) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return False
+    candidates = {tag.strip() for tag in if_none_match.split(",")}
+    return "*" in candidates or etag in candidates or etag.removeprefix("W/") in candidates
+
+
+def not_modified_response(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag})
+
+
+def cached_response(key: tuple, etag: str) -> Optional[Response]:
+    cached = RESPONSE_CACHE.get(key)
+    if cached is None or cached[0] != etag:
+        return None
+    return Response(content=cached[1], media_type="application/json", headers={"ETag": etag})
+
+
+def render_json(content: Any) -> bytes:
+    # UTC as "Z", the way Pydantic writes it, so cached rows match TicketRead output
+    return orjson.dumps(content, option=orjson.OPT_UTC_Z)
+
+
+def store_response(key: tuple, etag: str, content: Any) -> Response:
+    body = render_json(content)
+    RESPONSE_CACHE[key] = (etag, body)
+    return Response(content=body, media_type="application/json", headers={"ETag": etag})
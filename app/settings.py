@@ -16,6 +16,9 @@ class AppSettings(CommonSettings):
     api_version: str    = "1.0.0"
     project_name: str   = Field(env="PROJECT_NAME")
     project_domain: str = Field(env="PROJECT_DOMAIN")
+
+    # ticket numbers reserved per counter round trip; 1 keeps numbering strictly sequential
+    ticket_number_block_size: int = Field(default=1, env="TICKET_NUMBER_BLOCK_SIZE")
     
 
 # -------------------------------------------------------------- SECURITY ----------------------------------------------------------
@@ -39,6 +42,18 @@ class AWSSettings(CommonSettings):
     aws_secret_access_key: str   = Field(default="", env="AWS_SECRET_ACCESS_KEY")
     aws_region_name: str         = Field(default="", env="AWS_REGION_NAME")
     aws_storage_bucket_name: str = Field(default="", env="AWS_STORAGE_BUCKET_NAME")
+    # S3-compatible endpoint (moto server, MinIO) for local runs; empty means AWS
+    aws_s3_endpoint_url: str     = Field(default="", env="AWS_S3_ENDPOINT_URL")
+    # connections the shared S3 client keeps open (see app/storage.py)
+    aws_s3_max_pool_connections: int = Field(default=50, env="AWS_S3_MAX_POOL_CONNECTIONS")
+
+    # ticket attachment uploads
+    attachment_max_bytes: int    = Field(default=25 * 1024 * 1024, env="ATTACHMENT_MAX_BYTES")
+
+    def object_url(self, key: str) -> str:
+        if self.aws_s3_endpoint_url:
+            return f"{self.aws_s3_endpoint_url.rstrip('/')}/{self.aws_storage_bucket_name}/{key}"
+        return f"https://s3.{self.aws_region_name}.amazonaws.com/{self.aws_storage_bucket_name}/{key}"
 
     @property
     def media_url(self) -> str:
@@ -56,7 +71,19 @@ class EmailSettings(CommonSettings):
     smtp_user: str     = Field(default="", env="SMTP_USER")
     smtp_password: str = Field(default="", env="SMTP_PASSWORD")
     from_email: str    = Field(default="", env="SMTP_FROM_EMAIL")
-    use_tls: bool      = Field(default=True)
+    use_tls: bool      = Field(default=True, env="SMTP_USE_TLS") # implicit TLS on 465, STARTTLS on any other port
+    smtp_timeout: float = Field(default=30, env="SMTP_TIMEOUT")
+
+    # persistent authenticated sessions kept by app/mailer.py; each sends up to a batch back to back
+    smtp_pool_size: int      = Field(default=4, env="SMTP_POOL_SIZE")
+    smtp_batch_size: int     = Field(default=50, env="SMTP_BATCH_SIZE")
+    smtp_idle_timeout: float = Field(default=60, env="SMTP_IDLE_TIMEOUT")
+
+    # past digest_threshold notifications to one agent within digest_window_seconds, the rest are
+    # held and sent as a single digest every digest_interval_seconds
+    digest_threshold: int        = Field(default=10, env="SMTP_DIGEST_THRESHOLD")
+    digest_window_seconds: int   = Field(default=5 * 60, env="SMTP_DIGEST_WINDOW_SECONDS")
+    digest_interval_seconds: int = Field(default=5 * 60, env="SMTP_DIGEST_INTERVAL_SECONDS")
 
 
 # --------------------------------------------------------------- CELERY ---------------------------------------------------------
@@ -66,6 +93,11 @@ class CelerySettings(CommonSettings):
     redis_password: str = Field(default="", env="REDIS_PASSWORD")
     redis_db: int       = Field(default=0)
 
+    # background tasks (app/tasks.py): "arq" sends them to the worker through Redis,
+    # "inline" runs them in the web process, for tests and setups without Redis
+    task_queue_backend: str   = Field(default="arq", env="TASK_QUEUE_BACKEND")
+    task_worker_max_jobs: int = Field(default=50, env="TASK_WORKER_MAX_JOBS")
+
     @property
     def broker_url(self) -> str:
         return f"redis://:{self.redis_password}@{self.redis_host}:{self.redis_port}/{self.redis_db}"
@@ -89,6 +121,11 @@ class DatabaseSettings(CommonSettings):
     def support_tickets_url(self) -> str:
         return f"postgresql+asyncpg://{self.support_tickets_db_user}:{self.support_tickets_db_password}@{self.support_tickets_db_host}:{self.support_tickets_db_port}/{self.support_tickets_db_name}"
     
+    @property
+    def support_tickets_dsn(self) -> str:
+        # plain libpq-style DSN for direct asyncpg connections (LISTEN/NOTIFY)
+        return f"postgresql://{self.support_tickets_db_user}:{self.support_tickets_db_password}@{self.support_tickets_db_host}:{self.support_tickets_db_port}/{self.support_tickets_db_name}"
+
     @property
     def support_tickets_db_url_sync(self) -> str:
         return f"postgresql+psycopg2://{self.support_tickets_db_user}:{self.support_tickets_db_password}@{self.support_tickets_db_host}:{self.support_tickets_db_port}/{self.support_tickets_db_name}"
@@ -0,0 +1,103 @@
+import asyncio
+import argparse
+import time
+from typing import Optional
+
+# ------------------------------------------ Local SMTP sink ------------------------------------------
+# Stand-in SMTP server for exercising app/mailer.py locally and measuring its throughput:
+# it speaks just enough ESMTP (EHLO, AUTH PLAIN/LOGIN, MAIL, RCPT, DATA, RSET, NOOP, QUIT)
+# for aiosmtplib, accepts every message and keeps only counters.
+#
+#   python -m app.smtp_sink --port 1025
+#   SMTP_HOST=127.0.0.1 SMTP_PORT=1025 SMTP_USE_TLS=false SMTP_USER=sink SMTP_PASSWORD=sink
+
+class SMTPSink:
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 1025, latency: float = 0.0):
+        self.host = host
+        self.port = port
+        self.latency = latency  # seconds added to every DATA, to mimic a remote relay
+        self.connections = 0
+        self.messages = 0
+        self.bytes = 0
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+
+    async def stop(self) -> None:
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+    async def _reply(self, writer: asyncio.StreamWriter, line: str) -> None:
+        writer.write(line.encode() + b"\r\n")
+        await writer.drain()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        try:
+            await self._reply(writer, "220 smtp-sink ESMTP")
+            while line := await reader.readline():
+                parts = line.decode(errors="replace").strip().split()
+                command = parts[0].upper() if parts else ""
+
+                if command == "EHLO":
+                    await self._reply(writer, "250-smtp-sink\r\n250-8BITMIME\r\n250-PIPELINING\r\n250 AUTH PLAIN LOGIN")
+                elif command == "HELO":
+                    await self._reply(writer, "250 smtp-sink")
+                elif command == "AUTH":
+                    mechanism = parts[1].upper() if len(parts) > 1 else ""
+                    if mechanism == "LOGIN":
+                        await self._reply(writer, "334 VXNlcm5hbWU6")
+                        await reader.readline()
+                        await self._reply(writer, "334 UGFzc3dvcmQ6")
+                        await reader.readline()
+                    elif mechanism == "PLAIN" and len(parts) < 3:
+                        await self._reply(writer, "334 ")
+                        await reader.readline()
+                    await self._reply(writer, "235 2.7.0 Authentication successful")
+                elif command in ("MAIL", "RCPT", "RSET", "NOOP"):
+                    await self._reply(writer, "250 OK")
+                elif command == "DATA":
+                    await self._reply(writer, "354 End data with <CR><LF>.<CR><LF>")
+                    while (data := await reader.readline()) not in (b".\r\n", b""):
+                        self.bytes += len(data)
+                    if self.latency:
+                        await asyncio.sleep(self.latency)
+                    self.messages += 1
+                    await self._reply(writer, "250 OK queued")
+                elif command == "QUIT":
+                    await self._reply(writer, "221 Bye")
+                    break
+                else:
+                    await self._reply(writer, "502 Command not implemented")
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+async def _serve(host: str, port: int, latency: float, report_every: float) -> None:
+    sink = SMTPSink(host, port, latency)
+    await sink.start()
+    print(f"📭 SMTP sink listening on {host}:{port}")
+
+    last_messages, last_time = 0, time.monotonic()
+    while True:
+        await asyncio.sleep(report_every)
+        now = time.monotonic()
+        rate = (sink.messages - last_messages) / (now - last_time)
+        print(f"[SINK] {sink.messages} messages, {sink.connections} connections, {rate:.0f} msg/s")
+        last_messages, last_time = sink.messages, now
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local SMTP sink for mailer throughput runs")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=1025)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every DATA")
+    parser.add_argument("--report-every", type=float, default=5.0)
+    args = parser.parse_args()
+    asyncio.run(_serve(args.host, args.port, args.latency, args.report_every))
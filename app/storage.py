@@ -0,0 +1,73 @@
+import asyncio
+import aioboto3
+from contextlib import AsyncExitStack, asynccontextmanager
+from typing import AsyncIterator, Any, Optional
+from botocore.config import Config
+from prometheus_client import Gauge
+
+from app.settings import get_settings
+
+settings = get_settings()
+
+S3_IN_FLIGHT = Gauge("s3_requests_in_flight", "S3 operations currently holding the shared client")
+
+# ------------------------------------------ Shared S3 client ------------------------------------------
+
+class S3ClientManager:
+    """
+    One aioboto3 session and S3 client for the whole process, opened on startup and closed
+    on shutdown, so credentials, TLS sessions and pooled connections are reused.
+    Code that runs outside the app (scripts, jobs) gets the client opened lazily.
+    """
+
+    def __init__(self):
+        self._stack: Optional[AsyncExitStack] = None
+        self._client: Any = None
+        self._lock = asyncio.Lock()
+
+    async def start(self) -> None:
+        async with self._lock:
+            if self._client is not None:
+                return
+            aws = settings.aws
+            session = aioboto3.Session(
+                aws_access_key_id=aws.aws_access_key_id or None,
+                aws_secret_access_key=aws.aws_secret_access_key or None,
+                region_name=aws.aws_region_name or None,
+            )
+            stack = AsyncExitStack()
+            self._client = await stack.enter_async_context(
+                session.client(
+                    "s3",
+                    endpoint_url=aws.aws_s3_endpoint_url or None,
+                    config=Config(
+                        region_name=aws.aws_region_name or None,
+                        retries={"max_attempts": 3, "mode": "adaptive"},
+                        connect_timeout=5,
+                        read_timeout=20,
+                        max_pool_connections=aws.aws_s3_max_pool_connections,
+                        tcp_keepalive=True,
+                    ),
+                )
+            )
+            self._stack = stack
+
+    async def stop(self) -> None:
+        async with self._lock:
+            if self._stack is not None:
+                await self._stack.aclose()
+            self._stack = None
+            self._client = None
+
+    @asynccontextmanager
+    async def client(self) -> AsyncIterator[Any]:
+        if self._client is None:
+            await self.start()
+        S3_IN_FLIGHT.inc()
+        try:
+            yield self._client
+        finally:
+            S3_IN_FLIGHT.dec()
+
+
+s3_clients = S3ClientManager()
@@ -0,0 +1,272 @@
+import asyncio
+import random
+from typing import Awaitable, Callable, Optional
+from arq import create_pool, Retry
+from arq.connections import ArqRedis, RedisSettings
+from arq.worker import func
+from pydantic import BaseModel, ValidationError
+
+from app.settings import get_settings
+from app.database import after_commit, support_tickets_engine
+from app.storage import s3_clients
+from app.mailer import mailer
+from app.template_loader import load_template_from_s3
+
+settings = get_settings()
+
+# ------------------------------------------ Background tasks ------------------------------------------
+# Work that should not hold up a request runs in the arq worker (`arq app.tasks.WorkerSettings`).
+# Every task takes one typed payload; the web process only enqueues it after its unit of work
+# commits, so the worker never looks for a ticket that isn't visible yet.
+
+TASK_MAX_TRIES = 5
+
+# seconds before the first retry; doubles every try up to the cap
+TASK_RETRY_BASE_DELAY = 5
+TASK_RETRY_MAX_DELAY = 5 * 60
+
+
+class TicketCreatedNotification(BaseModel):
+    ticket_id: int
+    outlet_id: int
+
+
+class TicketAssignedNotification(BaseModel):
+    ticket_id: int
+    outlet_id: int
+    agent_id: int
+    previous_agent_id: Optional[int] = None
+
+
+class TicketClosedNotification(BaseModel):
+    ticket_id: int
+    outlet_id: int
+
+
+# task name -> arq coroutine(ctx, payload dict)
+TASKS: dict[str, Callable[[dict, dict], Awaitable[None]]] = {}
+
+# payload type -> task name, so callers enqueue by payload alone
+TASK_NAMES: dict[type[BaseModel], str] = {}
+
+
+def retry_delay(job_try: int) -> float:
+    delay = min(TASK_RETRY_BASE_DELAY * 2 ** (job_try - 1), TASK_RETRY_MAX_DELAY)
+    # jitter, so a batch that failed together doesn't retry together
+    return delay * random.uniform(0.5, 1.0)
+
+
+def task(payload_model: type[BaseModel]):
+    """
+    Register handler(payload) as a task. Failures are retried with exponential backoff
+    until TASK_MAX_TRIES, then logged and dropped; a payload that doesn't validate is
+    dropped straight away since retrying can't fix it.
+    """
+    def decorator(handler: Callable[[BaseModel], Awaitable[None]]):
+        name = handler.__name__
+
+        async def run(ctx: dict, payload: dict) -> None:
+            try:
+                model = payload_model.model_validate(payload)
+            except ValidationError as e:
+                print(f"[TASKS] {name} dropped, invalid payload: {e}")
+                return
+
+            job_try = ctx.get("job_try", 1)
+            try:
+                await handler(model)
+            except Exception as e:
+                if job_try >= TASK_MAX_TRIES:
+                    print(f"[TASKS] {name} failed after {job_try} tries, giving up: {e}")
+                    return
+                delay = retry_delay(job_try)
+                print(f"[TASKS] {name} failed (try {job_try}), retrying in {delay:.0f}s: {e}")
+                raise Retry(defer=delay) from e
+
+        run.__name__ = run.__qualname__ = name
+        TASKS[name] = run
+        TASK_NAMES[payload_model] = name
+        return handler
+    return decorator
+
+
+# ------------------------------------------ Notifications ------------------------------------------
+
+async def render_notification(template_name: str, fallback: str, **context) -> tuple[str, str]:
+    """Returns (body, MIME subtype): the HTML template from S3, or the plain-text fallback."""
+    try:
+        template = await load_template_from_s3(f"notifications/{template_name}")
+    except FileNotFoundError:
+        return fallback.format(**context), "plain"
+    return template.render(**context), "html"
+
+
+def _customer_email(ticket) -> Optional[str]:
+    return (ticket.customer_details or {}).get("customer_email")
+
+
+@task(TicketCreatedNotification)
+async def notify_ticket_created(payload: TicketCreatedNotification) -> None:
+    from modules.TicketsHarbour.dao import TicketsDao
+
+    ticket = await TicketsDao.get_by_id(payload.ticket_id)
+    if ticket is None or not _customer_email(ticket):
+        return
+
+    body, subtype = await render_notification(
+        "ticket_created.html",
+        "We received your request {support_ticket_id}: {subject}",
+        support_ticket_id=ticket.support_ticket_id,
+        subject=ticket.subject,
+    )
+    await mailer.send(_customer_email(ticket), f"[{ticket.support_ticket_id}] We received your request", body, subtype)
+
+
+@task(TicketAssignedNotification)
+async def notify_ticket_assigned(payload: TicketAssignedNotification) -> None:
+    from modules.TicketsHarbour.dao import TicketsDao, AgentsDao
+
+    ticket = await TicketsDao.get_by_id(payload.ticket_id)
+    agent = await AgentsDao.get_by_id(payload.agent_id)
+    # reassigned again before this ran; the newer assignment sends its own notification
+    if ticket is None or agent is None or ticket.assigned_agent_id != agent.id:
+        return
+
+    body, subtype = await render_notification(
+        "ticket_assigned.html",
+        "Ticket {support_ticket_id} was assigned to you: {subject}",
+        support_ticket_id=ticket.support_ticket_id,
+        subject=ticket.subject,
+        agent_first_name=agent.agent_first_name,
+    )
+    # agents get a digest instead when assignments spike
+    await mailer.send(agent.agent_email, f"[{ticket.support_ticket_id}] Assigned to you", body, subtype, digest=True)
+
+
+@task(TicketClosedNotification)
+async def notify_ticket_closed(payload: TicketClosedNotification) -> None:
+    from modules.TicketsHarbour.dao import TicketsDao
+
+    ticket = await TicketsDao.get_by_id(payload.ticket_id)
+    if ticket is None or ticket.status != "closed" or not _customer_email(ticket):
+        return
+
+    body, subtype = await render_notification(
+        "ticket_closed.html",
+        "Your request {support_ticket_id} has been closed: {subject}",
+        support_ticket_id=ticket.support_ticket_id,
+        subject=ticket.subject,
+    )
+    await mailer.send(_customer_email(ticket), f"[{ticket.support_ticket_id}] Your request has been closed", body, subtype)
+
+
+# ------------------------------------------ Enqueueing ------------------------------------------
+
+def redis_settings() -> RedisSettings:
+    redis = settings.celery
+    return RedisSettings(host=redis.redis_host, port=redis.redis_port, password=redis.redis_password or None, database=redis.redis_db)
+
+
+class TaskQueue:
+    """
+    Sends tasks to the arq worker. With TASK_QUEUE_BACKEND=inline, or when Redis can't be
+    reached, tasks run on this process's event loop instead, with the same retries and
+    backoff; drain() waits for them, which is what tests without Redis use.
+    """
+
+    def __init__(self):
+        self._redis: Optional[ArqRedis] = None
+        self._inline: set[asyncio.Task] = set()
+
+    async def start(self) -> None:
+        if settings.celery.task_queue_backend != "arq":
+            print("[TASKS] Running background tasks in-process")
+            return
+        try:
+            self._redis = await create_pool(redis_settings())
+        except Exception as e:
+            print(f"[TASKS] Redis unavailable, running background tasks in-process: {e}")
+
+    async def stop(self) -> None:
+        await self.drain()
+        if self._redis is not None:
+            await self._redis.close()
+            self._redis = None
+
+    async def enqueue(self, payload: BaseModel) -> None:
+        name = TASK_NAMES[type(payload)]
+        data = payload.model_dump(mode="json")
+        if self._redis is not None:
+            try:
+                await self._redis.enqueue_job(name, data)
+                return
+            except Exception as e:
+                print(f"[TASKS] Enqueue of {name} failed, running it in-process: {e}")
+
+        running = asyncio.get_running_loop().create_task(self._run_inline(name, data))
+        self._inline.add(running)
+        running.add_done_callback(self._inline.discard)
+
+    async def _run_inline(self, name: str, data: dict) -> None:
+        for job_try in range(1, TASK_MAX_TRIES + 1):
+            try:
+                await TASKS[name]({"job_try": job_try}, data)
+                return
+            except Retry as e:
+                await asyncio.sleep((e.defer_score or 0) / 1000)
+
+    async def drain(self) -> None:
+        while self._inline:
+            await asyncio.gather(*self._inline, return_exceptions=True)
+
+
+task_queue = TaskQueue()
+
+
+async def enqueue(payload: BaseModel) -> None:
+    """Queue a task once the current unit of work commits; a rollback never sends it."""
+    await after_commit(lambda: task_queue.enqueue(payload))
+
+
+async def enqueue_ticket_created(ticket_id: int, outlet_id: int, assigned_agent_id: Optional[int] = None) -> None:
+    await enqueue(TicketCreatedNotification(ticket_id=ticket_id, outlet_id=outlet_id))
+    if assigned_agent_id is not None:
+        await enqueue(TicketAssignedNotification(ticket_id=ticket_id, outlet_id=outlet_id, agent_id=assigned_agent_id))
+
+
+async def enqueue_ticket_updated(updated: dict, outlet_id: int) -> None:
+    """Queue what a TicketsDao.update_status_and_agent result calls for: a new assignee, a close."""
+    if updated.get("id") is None:
+        return
+    if updated["assigned_agent_id"] is not None and updated["assigned_agent_id"] != updated["previous_agent_id"]:
+        await enqueue(TicketAssignedNotification(
+            ticket_id=updated["id"],
+            outlet_id=outlet_id,
+            agent_id=updated["assigned_agent_id"],
+            previous_agent_id=updated["previous_agent_id"],
+        ))
+    if updated["status"] == "closed" and updated["previous_status"] != "closed":
+        await enqueue(TicketClosedNotification(ticket_id=updated["id"], outlet_id=outlet_id))
+
+
+# ------------------------------------------ Worker ------------------------------------------
+
+async def _worker_startup(ctx: dict) -> None:
+    await s3_clients.start()
+    await mailer.start()
+
+
+async def _worker_shutdown(ctx: dict) -> None:
+    await mailer.stop()
+    await s3_clients.stop()
+    await support_tickets_engine.dispose()
+
+
+class WorkerSettings:
+    functions = [func(coroutine, name=name, max_tries=TASK_MAX_TRIES) for name, coroutine in TASKS.items()]
+    redis_settings = redis_settings()
+    on_startup = _worker_startup
+    on_shutdown = _worker_shutdown
+    max_jobs = settings.celery.task_worker_max_jobs
+    job_timeout = 5 * 60
+    keep_result = 0
@@ -1,7 +1,7 @@
-import aioboto3
 from jinja2 import Template
 from cachetools import TTLCache
 from app.settings import get_settings
+from app.storage import s3_clients
 from botocore.exceptions import ClientError, BotoCoreError
 from fastapi import HTTPException, status, UploadFile, File
 import os
@@ -19,9 +19,8 @@ async def load_template_from_s3(template_name: str) -> Template:
     if template_name in TEMPLATE_CACHE:
         return TEMPLATE_CACHE[template_name]
     s3_key  = f"templates/{template_name}"
-    session = aioboto3.Session()
     try:
-        async with session.client('s3', region_name=settings.aws.aws_region_name) as s3:
+        async with s3_clients.client() as s3:
             response = await s3.get_object(Bucket=settings.aws.aws_storage_bucket_name,Key=s3_key)
             body     = await response["Body"].read()
             content  = body.decode("utf-8")
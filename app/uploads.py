@@ -0,0 +1,336 @@
+import os
+import uuid
+from botocore.exceptions import ClientError
+import orjson
+from typing import Any, Optional
+from fastapi import Request
+from multipart.exceptions import FormParserError
+from multipart.multipart import MultipartParser, STATE_END, parse_options_header
+
+from app.settings import get_settings
+from app.storage import s3_clients
+
+settings = get_settings()
+
+# ------------------------------------------ Streaming multipart -> S3 ------------------------------------------
+# The request body is fed to python-multipart's callback parser chunk by chunk. File parts
+# go to S3 one part at a time, so memory stays around one S3 part per request however large
+# the upload; size and type are checked as bytes arrive.
+
+# S3's minimum size for every part but the last
+ATTACHMENT_PART_SIZE = 5 * 1024 * 1024
+
+# text form fields are buffered in memory, so they get a small cap of their own
+FORM_FIELD_MAX_BYTES = 1024 * 1024
+
+ATTACHMENT_ALLOWED_TYPES = {
+    "image/png",
+    "image/jpeg",
+    "image/gif",
+    "image/webp",
+    "application/pdf",
+    "text/plain",
+    "text/csv",
+    "application/zip",
+    "application/msword",
+    "application/vnd.openxmlformats-officedocument.wordprocessingml.document",
+    "application/vnd.ms-excel",
+    "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+}
+
+# leading bytes -> the only content type a part starting with them may claim
+ATTACHMENT_SIGNATURES = {
+    b"\x89PNG\r\n\x1a\n": "image/png",
+    b"\xff\xd8\xff": "image/jpeg",
+    b"GIF87a": "image/gif",
+    b"GIF89a": "image/gif",
+    b"%PDF-": "application/pdf",
+}
+
+# bytes of a file part held back until its signature can be checked
+ATTACHMENT_SIGNATURE_BYTES = max(map(len, ATTACHMENT_SIGNATURES))
+
+
+class UploadRejected(ValueError):
+    def __init__(self, message: str, status_code: int = 400):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+def check_signature(head: bytes, content_type: str) -> None:
+    """
+    A type with known signatures must start with one of them; any other type must not
+    start with a signature that belongs to a different type.
+    """
+    expected = [signature for signature, signed_type in ATTACHMENT_SIGNATURES.items() if signed_type == content_type]
+    if expected:
+        matches = any(head.startswith(signature) for signature in expected)
+    else:
+        matches = not any(head.startswith(signature) for signature in ATTACHMENT_SIGNATURES)
+    if not matches:
+        raise UploadRejected(f"File content does not match {content_type}", 415)
+
+
+def attachment_key(key_prefix: str, filename: str) -> str:
+    extension = os.path.splitext(filename)[1].lower()
+    return f"{key_prefix}/{uuid.uuid4().hex}{extension}"
+
+
+# ------------------------------------------ Presigned direct uploads ------------------------------------------
+
+PRESIGNED_UPLOAD_EXPIRES_IN = 15 * 60
+
+
+async def presign_upload(*, key: str, content_type: str, max_file_size: Optional[int] = None, method: str = "post") -> dict:
+    """
+    Let the client upload one object straight to the bucket. A presigned POST enforces the
+    size range and content type server side; a presigned PUT only pins the content type.
+    """
+    max_file_size = max_file_size or settings.aws.attachment_max_bytes
+    bucket = settings.aws.aws_storage_bucket_name
+
+    async with s3_clients.client() as s3:
+        if method == "put":
+            url = await s3.generate_presigned_url(
+                "put_object",
+                Params={"Bucket": bucket, "Key": key, "ContentType": content_type},
+                ExpiresIn=PRESIGNED_UPLOAD_EXPIRES_IN,
+            )
+            return {"method": "PUT", "url": url, "headers": {"Content-Type": content_type}, "key": key, "expires_in": PRESIGNED_UPLOAD_EXPIRES_IN}
+
+        presigned = await s3.generate_presigned_post(
+            Bucket=bucket,
+            Key=key,
+            Fields={"Content-Type": content_type},
+            Conditions=[
+                {"Content-Type": content_type},
+                ["content-length-range", 1, max_file_size],
+            ],
+            ExpiresIn=PRESIGNED_UPLOAD_EXPIRES_IN,
+        )
+        return {"method": "POST", "url": presigned["url"], "fields": presigned["fields"], "key": key, "expires_in": PRESIGNED_UPLOAD_EXPIRES_IN}
+
+
+async def head_object(key: str) -> Optional[dict]:
+    async with s3_clients.client() as s3:
+        try:
+            return await s3.head_object(Bucket=settings.aws.aws_storage_bucket_name, Key=key)
+        except ClientError as e:
+            if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+                return None
+            raise
+
+
+async def delete_object(key: str) -> None:
+    async with s3_clients.client() as s3:
+        await s3.delete_object(Bucket=settings.aws.aws_storage_bucket_name, Key=key)
+
+
+async def delete_objects(keys: list[str]) -> None:
+    """Best-effort cleanup of objects nothing will reference; failures are only logged."""
+    for key in keys:
+        try:
+            await delete_object(key)
+        except Exception as e:
+            print(f"[S3] Could not delete orphaned object {key}: {e}")
+
+
+class S3MultipartWriter:
+    """
+    Buffers at most one part and ships it with upload_part. The multipart upload is only
+    created once a full part exists, so small files are a single put_object.
+    """
+
+    def __init__(self, s3, bucket: str, key: str, content_type: str, part_size: int = ATTACHMENT_PART_SIZE):
+        self.s3 = s3
+        self.bucket = bucket
+        self.key = key
+        self.content_type = content_type
+        self.part_size = part_size
+        self.buffer = bytearray()
+        self.parts: list[dict] = []
+        self.upload_id: Optional[str] = None
+
+    async def write(self, data: bytes) -> None:
+        self.buffer += data
+        while len(self.buffer) >= self.part_size:
+            await self._upload_part(bytes(self.buffer[:self.part_size]))
+            del self.buffer[:self.part_size]
+
+    async def _upload_part(self, body: bytes) -> None:
+        if self.upload_id is None:
+            response = await self.s3.create_multipart_upload(Bucket=self.bucket, Key=self.key, ContentType=self.content_type)
+            self.upload_id = response["UploadId"]
+
+        part_number = len(self.parts) + 1
+        response = await self.s3.upload_part(Bucket=self.bucket, Key=self.key, UploadId=self.upload_id, PartNumber=part_number, Body=body)
+        self.parts.append({"ETag": response["ETag"], "PartNumber": part_number})
+
+    async def complete(self) -> None:
+        if self.upload_id is None:
+            await self.s3.put_object(Bucket=self.bucket, Key=self.key, Body=bytes(self.buffer), ContentType=self.content_type)
+        else:
+            if self.buffer:
+                await self._upload_part(bytes(self.buffer))
+            await self.s3.complete_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self.upload_id, MultipartUpload={"Parts": self.parts})
+        self.buffer.clear()
+
+    async def abort(self) -> None:
+        self.buffer.clear()
+        if self.upload_id is not None:
+            await self.s3.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self.upload_id)
+
+
+def _form_value(value: str) -> Any:
+    # same JSON sniffing get_request_data applies to multipart text fields
+    value = value.strip()
+    if value.startswith(("{", "[")):
+        try:
+            return orjson.loads(value)
+        except orjson.JSONDecodeError:
+            pass
+    return value
+
+
+class _MultipartEvents:
+    """Collects python-multipart's synchronous callbacks so they can be handled with awaits."""
+
+    def __init__(self):
+        self.events: list[tuple[str, Any]] = []
+        self._headers: dict[bytes, bytes] = {}
+        self._field = b""
+        self._value = b""
+
+    def on_part_begin(self) -> None:
+        self._headers = {}
+
+    def on_header_field(self, data: bytes, start: int, end: int) -> None:
+        self._field += data[start:end]
+
+    def on_header_value(self, data: bytes, start: int, end: int) -> None:
+        self._value += data[start:end]
+
+    def on_header_end(self) -> None:
+        self._headers[self._field.lower()] = self._value
+        self._field = b""
+        self._value = b""
+
+    def on_headers_finished(self) -> None:
+        self.events.append(("headers", self._headers))
+
+    def on_part_data(self, data: bytes, start: int, end: int) -> None:
+        self.events.append(("data", data[start:end]))
+
+    def on_part_end(self) -> None:
+        self.events.append(("end", None))
+
+    def callbacks(self) -> dict:
+        return {
+            "on_part_begin": self.on_part_begin,
+            "on_header_field": self.on_header_field,
+            "on_header_value": self.on_header_value,
+            "on_header_end": self.on_header_end,
+            "on_headers_finished": self.on_headers_finished,
+            "on_part_data": self.on_part_data,
+            "on_part_end": self.on_part_end,
+        }
+
+
+async def stream_multipart_to_s3(request: Request, *, key_prefix: str, max_file_size: Optional[int] = None, allowed_types: set[str] = ATTACHMENT_ALLOWED_TYPES) -> tuple[dict, list[str]]:
+    """
+    Parse a multipart/form-data body as it arrives. Returns (fields, uploaded keys): text
+    fields come back like get_request_data returns them; each file field holds the uploaded
+    object's URL (a list when the field repeats). Raises UploadRejected; nothing is left in
+    S3 then. Otherwise the caller owns the keys and deletes them if it doesn't keep them.
+    """
+    max_file_size = max_file_size or settings.aws.attachment_max_bytes
+    bucket = settings.aws.aws_storage_bucket_name
+
+    _, params = parse_options_header(request.headers.get("content-type", ""))
+    boundary = params.get(b"boundary")
+    if not boundary:
+        raise UploadRejected("Missing multipart boundary")
+
+    collector = _MultipartEvents()
+    parser = MultipartParser(boundary, collector.callbacks())
+
+    fields: dict[str, list[Any]] = {}
+    uploaded_keys: list[str] = []
+
+    name: Optional[str] = None
+    writer: Optional[S3MultipartWriter] = None
+    head: Optional[bytearray] = None  # start of the current file part, until its signature is checked
+    field_value = bytearray()
+    size = 0
+
+    async with s3_clients.client() as s3:
+        try:
+            async for chunk in request.stream():
+                try:
+                    parser.write(chunk)
+                except FormParserError as e:
+                    raise UploadRejected("Malformed multipart body", 400) from e
+                events, collector.events = collector.events, []
+
+                for kind, payload in events:
+                    if kind == "headers":
+                        _, disposition = parse_options_header(payload.get(b"content-disposition", b""))
+                        name = disposition.get(b"name", b"").decode()
+                        filename = disposition.get(b"filename")
+                        size = 0
+                        field_value.clear()
+                        writer = None
+                        head = None
+
+                        if filename is not None:
+                            content_type = payload.get(b"content-type", b"application/octet-stream").decode().split(";")[0].strip().lower()
+                            if content_type not in allowed_types:
+                                raise UploadRejected(f"File type {content_type} is not allowed", 415)
+                            key = attachment_key(key_prefix, filename.decode(errors="replace"))
+                            writer = S3MultipartWriter(s3, bucket, key, content_type)
+                            head = bytearray()
+
+                    elif kind == "data":
+                        if writer is not None:
+                            size += len(payload)
+                            if size > max_file_size:
+                                raise UploadRejected(f"File exceeds {max_file_size} bytes", 413)
+                            # the parser may hand over the first bytes in slices of any size
+                            if head is not None:
+                                head += payload
+                                if len(head) < ATTACHMENT_SIGNATURE_BYTES:
+                                    continue
+                                check_signature(head, writer.content_type)
+                                payload, head = bytes(head), None
+                            await writer.write(payload)
+                        else:
+                            field_value += payload
+                            if len(field_value) > FORM_FIELD_MAX_BYTES:
+                                raise UploadRejected(f"Form field {name} is too large", 413)
+
+                    elif kind == "end":
+                        if writer is not None:
+                            if head is not None:
+                                check_signature(head, writer.content_type)
+                                await writer.write(bytes(head))
+                                head = None
+                            await writer.complete()
+                            uploaded_keys.append(writer.key)
+                            fields.setdefault(name, []).append(settings.aws.object_url(writer.key))
+                            writer = None
+                        else:
+                            fields.setdefault(name, []).append(_form_value(field_value.decode(errors="replace")))
+
+            parser.finalize()
+            # python-multipart's finalize() doesn't notice a body cut off before the closing boundary
+            if parser.state != STATE_END or writer is not None:
+                raise UploadRejected("Malformed multipart body", 400)
+        except BaseException:
+            # no half-written or orphaned objects when the request is rejected or dropped
+            if writer is not None:
+                await writer.abort()
+            for key in uploaded_keys:
+                await s3.delete_object(Bucket=bucket, Key=key)
+            raise
+
+    return {field: values if len(values) > 1 else values[0] for field, values in fields.items()}, uploaded_keys
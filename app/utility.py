@@ -1,14 +1,15 @@
 import re
 import sys
-import aioboto3
+import csv
+import base64
+import codecs
 import orjson
 import logging
 import traceback
 import uuid
 import httpx
-from typing import Dict, Optional, Union
+from typing import AsyncIterator, Dict, Optional, Union
 from fastapi import Body, Request
-from botocore.config import Config
 from jinja2 import Template
 from fastapi import Request,UploadFile
 from urllib.parse import urlparse
@@ -20,6 +21,7 @@ from typing import Optional, Any, Union ,Generic ,TypeVar, Dict
 
 from app.settings import get_settings
 from app.template_loader import load_template_from_s3
+from app.storage import s3_clients
 
 settings = get_settings()
 
@@ -35,6 +37,21 @@ class ApiResponse(Response, Generic[T]):
     def render(self, content: any) -> bytes:
         return orjson.dumps(content)
 
+#------------------------------------------------------------ PAGINATION CURSORS ------------------------------------------------------
+def encode_cursor(payload: dict) -> str:
+    return base64.urlsafe_b64encode(orjson.dumps(payload)).rstrip(b"=").decode()
+
+
+def decode_cursor(cursor: str) -> dict:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = orjson.loads(base64.urlsafe_b64decode(padded))
+    except (ValueError, orjson.JSONDecodeError) as e:
+        raise ValueError("Invalid cursor") from e
+    if not isinstance(payload, dict):
+        raise ValueError("Invalid cursor")
+    return payload
+
 #------------------------------------------------------------ REQUEST DATA PARSER ------------------------------------------------------ 
 
 
@@ -97,6 +114,84 @@ async def get_request_data(content_type, request):
 
 
   
+#------------------------------------------------------------ STREAMED IMPORT PARSERS ------------------------------------------------------
+# Both parsers yield (row_no, record) where record is a dict, or an error string for a row
+# that could not be parsed; row_no counts data rows from 1 (CSV header excluded).
+
+async def _iter_lines(chunks: AsyncIterator[bytes]) -> AsyncIterator[str]:
+    decoder = codecs.getincrementaldecoder("utf-8-sig")(errors="replace")
+    pending = ""
+    async for chunk in chunks:
+        pending += decoder.decode(chunk)
+        *lines, pending = pending.split("\n")
+        for line in lines:
+            yield line.rstrip("\r")
+    pending += decoder.decode(b"", final=True)
+    if pending:
+        yield pending.rstrip("\r")
+
+
+async def iter_jsonl_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[tuple[int, Union[dict, str]]]:
+    row_no = 0
+    async for line in _iter_lines(chunks):
+        if not line.strip():
+            continue
+        row_no += 1
+        try:
+            record = orjson.loads(line)
+        except orjson.JSONDecodeError as e:
+            yield row_no, f"Invalid JSON: {e}"
+            continue
+        yield row_no, record if isinstance(record, dict) else "Each line must be a JSON object"
+
+
+def _csv_value(value: str) -> Any:
+    value = value.strip()
+    if value.startswith(("{", "[")):
+        try:
+            return orjson.loads(value)
+        except orjson.JSONDecodeError:
+            pass
+    return value
+
+
+async def iter_csv_records(chunks: AsyncIterator[bytes]) -> AsyncIterator[tuple[int, Union[dict, str]]]:
+    header = None
+    row_no = 0
+    record = ""
+    async for line in _iter_lines(chunks):
+        record = f"{record}\n{line}" if record else line
+        # an odd number of quotes means a quoted field continues on the next line
+        if record.count('"') % 2:
+            continue
+
+        try:
+            values = next(csv.reader([record]), [])
+        except csv.Error as e:
+            values = e
+        record = ""
+
+        if isinstance(values, csv.Error):
+            row_no += 1
+            yield row_no, f"Malformed CSV row: {values}"
+            continue
+        if not any(v.strip() for v in values):
+            continue
+        if header is None:
+            header = [h.strip() for h in values]
+            continue
+
+        row_no += 1
+        if len(values) != len(header):
+            yield row_no, f"Expected {len(header)} columns, got {len(values)}"
+            continue
+        # empty cells are left out so schema defaults apply
+        yield row_no, {k: _csv_value(v) for k, v in zip(header, values) if v.strip()}
+
+    if record:
+        yield row_no + 1, "Unterminated quoted field"
+
+
 #------------------------------------------------------------- EXEPTION HANDLER ---------------------------------------------------------
 async def exception_handler(e: Exception, request: Optional[Request] = None, data: Optional[Union[dict, str]] = None) -> str:
     tb_str     = traceback.format_exception(type(e), e, e.__traceback__)
@@ -124,29 +219,12 @@ async def exception_handler(e: Exception, request: Optional[Request] = None, dat
 # ====================================================================================================================================
 
 
-def _get_s3(aws_key, aws_secret, aws_region):
-    return aioboto3.Session().client(
-        "s3",
-        aws_access_key_id=aws_key,
-        aws_secret_access_key=aws_secret,
-        config=Config(
-            region_name=aws_region,
-            retries={"max_attempts": 3, "mode": "adaptive"},
-            connect_timeout=5,
-            read_timeout=20,
-        ),
-    )
-
-
 async def media_to_aws_s3(*, key: str | None = None, file: UploadFile | None = None, file_data: bytes | None = None, file_type: str | None = None, media_link: HttpUrl | None = None, delete: bool = False,) -> str | dict[str, Any]:
     settings = get_settings()
     if not key:
         key = f"media_gallery/{uuid.uuid4().hex}.{file_type}"
     bucket_name = settings.aws.aws_storage_bucket_name
-    aws_region = settings.aws.aws_region_name
-    aws_key = settings.aws.aws_access_key_id
-    aws_secret = settings.aws.aws_secret_access_key
-    async with _get_s3(aws_key, aws_secret, aws_region) as s3:
+    async with s3_clients.client() as s3:
         if delete:
             await s3.delete_object(Bucket=bucket_name, Key=key)
             return {"status": "deleted", "key": key, "detail": "Object removed"}
@@ -154,7 +232,7 @@ async def media_to_aws_s3(*, key: str | None = None, file: UploadFile | None = N
         if file is not None:
             content_type = file.content_type or "application/octet-stream"
             await s3.upload_fileobj(file.file, bucket_name, key, ExtraArgs={"ContentType": content_type},)
-            url = f"https://s3.{aws_region}.amazonaws.com/{bucket_name}/{key}"
+            url = settings.aws.object_url(key)
             return url
         if file_data is not None:
             content_type = file_type or "application/octet-stream"
@@ -164,7 +242,7 @@ async def media_to_aws_s3(*, key: str | None = None, file: UploadFile | None = N
                 Body=file_data,
                 ContentType=content_type,
             )
-            url = f"https://s3.{aws_region}.amazonaws.com/{bucket_name}/{key}"
+            url = settings.aws.object_url(key)
             return url
 
         if media_link is not None:
@@ -181,7 +259,7 @@ async def media_to_aws_s3(*, key: str | None = None, file: UploadFile | None = N
                         key,
                         ExtraArgs={"ContentType": content_type},
                     )
-            url = f"https://s3.{aws_region}.amazonaws.com/{bucket_name}/{key}"
+            url = settings.aws.object_url(key)
             return url
         raise ValueError("No file, file_data, or media_link provided, and delete=False")
 
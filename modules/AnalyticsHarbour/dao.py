@@ -1,137 +1,110 @@
+import orjson
 from sqlalchemy import text, select, func
 from sqlalchemy.dialects.postgresql import JSONB
-from typing import List, Tuple, Optional
-from app.database import fetch_one, fetch_all, SupportTicketAsyncSession
+from typing import List, Tuple, Optional, Any
+from app.database import fetch_one, fetch_all, session_scope
 from modules.TicketsHarbour.models import Ticket
 
 
 class AnalyticsDao:
-    
-    @staticmethod
-    async def get_ticket_counts(outlet_id: int) -> Tuple[int, int]:
-        """
-        Get total tickets and in-progress tickets count for an outlet.
-        In-progress = status='assign' OR status='open'
-        Returns: (total_count, in_progress_count)
-        """
-        query = text("""
-            SELECT 
-                COUNT(*) FILTER (WHERE is_in_trash = false) as total,
-                COUNT(*) FILTER (
-                    WHERE is_in_trash = false 
-                    AND (status = 'assign' OR status = 'open')
-                ) as in_progress
-            FROM tickets
-            WHERE outlet_id = :outlet_id
-        """)
-        
-        async with SupportTicketAsyncSession() as session:
-            result = await session.execute(query, {"outlet_id": outlet_id})
-            row = result.fetchone()
-            if row:
-                return (row[0] or 0, row[1] or 0)
-            return (0, 0)
-    
-    @staticmethod
-    async def get_top_categories(outlet_id: int, limit: int = 10) -> List[Tuple[str, int]]:
-        """
-        Get top categories (departments) by ticket count for an outlet.
-        Returns: List of (department, count) tuples, sorted by count descending
-        """
-        query = text("""
-            SELECT 
-                additional_details->>'department' as department,
-                COUNT(*) as count
-            FROM tickets
-            WHERE outlet_id = :outlet_id
-                AND is_in_trash = false
-                AND additional_details->>'department' IS NOT NULL
-            GROUP BY additional_details->>'department'
-            ORDER BY count DESC
-            LIMIT :limit
-        """)
-        
-        async with SupportTicketAsyncSession() as session:
-            result = await session.execute(query, {"outlet_id": outlet_id, "limit": limit})
-            rows = result.fetchall()
-            return [(row[0], row[1]) for row in rows if row[0]]
-    
-    @staticmethod
-    async def get_average_closing_time(outlet_id: int) -> Optional[float]:
-        """
-        Get average closing time in hours for closed tickets.
-        Returns: Average hours from created_at to closed_at, or None if no closed tickets
-        """
-        query = text("""
-            SELECT 
-                AVG(EXTRACT(EPOCH FROM (closed_at - created_at)) / 3600.0) as avg_hours
-            FROM tickets
-            WHERE outlet_id = :outlet_id
-                AND is_in_trash = false
-                AND status = 'close'
-                AND closed_at IS NOT NULL
-        """)
-        
-        async with SupportTicketAsyncSession() as session:
-            result = await session.execute(query, {"outlet_id": outlet_id})
-            row = result.fetchone()
-            if row and row[0] is not None:
-                return float(row[0])
-            return None
-    
-    @staticmethod
-    async def get_closing_time_comparison(outlet_id: int) -> Tuple[Optional[float], Optional[float]]:
-        """
-        Get average closing time for today and yesterday.
-        Returns: (today_avg_hours, yesterday_avg_hours)
-        """
-        query = text("""
-            SELECT 
-                AVG(EXTRACT(EPOCH FROM (closed_at - created_at)) / 3600.0) FILTER (
-                    WHERE DATE(closed_at) = CURRENT_DATE
-                ) as today_avg,
-                AVG(EXTRACT(EPOCH FROM (closed_at - created_at)) / 3600.0) FILTER (
-                    WHERE DATE(closed_at) = CURRENT_DATE - INTERVAL '1 day'
-                ) as yesterday_avg
-            FROM tickets
-            WHERE outlet_id = :outlet_id
-                AND is_in_trash = false
-                AND status = 'close'
-                AND closed_at IS NOT NULL
-                AND DATE(closed_at) >= CURRENT_DATE - INTERVAL '1 day'
-        """)
-        
-        async with SupportTicketAsyncSession() as session:
-            result = await session.execute(query, {"outlet_id": outlet_id})
-            row = result.fetchone()
-            if row:
-                today_avg = float(row[0]) if row[0] is not None else None
-                yesterday_avg = float(row[1]) if row[1] is not None else None
-                return (today_avg, yesterday_avg)
-            return (None, None)
-    
+
     @staticmethod
-    async def get_top_closing_users(outlet_id: int, limit: int = 5) -> List[Tuple[int, int]]:
+    async def get_basic_analytics(outlet_id: int, top_users_limit: int = 5, top_categories_limit: int = 10) -> dict[str, Any]:
         """
-        Get top users who closed most tickets (by assigned_agent).
-        Returns: List of (user_id, closed_count) tuples, sorted by count descending
+        Ticket counts, closing-time averages, top closing agents and top departments
+        for an outlet in a single round trip. The outlet's tickets are scanned once
+        (outlet_tickets is referenced several times, so Postgres materializes it).
+        In-progress = status 'assigned' or 'open'.
+        Returns: dict with total, in_progress, avg_hours, today_avg, yesterday_avg,
+        top_users [(user_id, closed_count)] and top_categories [(department, count)]
         """
         query = text("""
-            SELECT 
-                assigned_agent as user_id,
-                COUNT(*) as closed_count
-            FROM tickets
-            WHERE outlet_id = :outlet_id
-                AND is_in_trash = false
-                AND status = 'close'
-                AND assigned_agent IS NOT NULL
-            GROUP BY assigned_agent
-            ORDER BY closed_count DESC
-            LIMIT :limit
+            WITH outlet_tickets AS (
+                SELECT status, department, assigned_agent_id, created_at, closed_at
+                FROM tickets
+                WHERE outlet_id = :outlet_id
+                    AND is_trash = false
+            ),
+            counts AS (
+                SELECT
+                    COUNT(*) as total,
+                    COUNT(*) FILTER (WHERE status IN ('assigned', 'open')) as in_progress
+                FROM outlet_tickets
+            ),
+            closing AS (
+                SELECT
+                    AVG(EXTRACT(EPOCH FROM (closed_at - created_at)) / 3600.0) as avg_hours,
+                    AVG(EXTRACT(EPOCH FROM (closed_at - created_at)) / 3600.0) FILTER (
+                        WHERE DATE(closed_at) = CURRENT_DATE
+                    ) as today_avg,
+                    AVG(EXTRACT(EPOCH FROM (closed_at - created_at)) / 3600.0) FILTER (
+                        WHERE DATE(closed_at) = CURRENT_DATE - INTERVAL '1 day'
+                    ) as yesterday_avg
+                FROM outlet_tickets
+                WHERE status = 'closed'
+                    AND closed_at IS NOT NULL
+            ),
+            top_users AS (
+                SELECT
+                    assigned_agent_id as user_id,
+                    COUNT(*) as closed_count
+                FROM outlet_tickets
+                WHERE status = 'closed'
+                    AND assigned_agent_id IS NOT NULL
+                GROUP BY assigned_agent_id
+                ORDER BY closed_count DESC
+                LIMIT CAST(:top_users_limit AS INTEGER)
+            ),
+            top_categories AS (
+                SELECT
+                    department,
+                    COUNT(*) as count
+                FROM outlet_tickets
+                WHERE department IS NOT NULL
+                GROUP BY department
+                ORDER BY count DESC
+                LIMIT CAST(:top_categories_limit AS INTEGER)
+            )
+            SELECT
+                counts.total,
+                counts.in_progress,
+                closing.avg_hours,
+                closing.today_avg,
+                closing.yesterday_avg,
+                COALESCE(
+                    (SELECT json_agg(json_build_array(user_id, closed_count) ORDER BY closed_count DESC) FROM top_users),
+                    '[]'::json
+                ) as top_users,
+                COALESCE(
+                    (SELECT json_agg(json_build_array(department, count) ORDER BY count DESC) FROM top_categories),
+                    '[]'::json
+                ) as top_categories
+            FROM counts, closing
         """)
-        
-        async with SupportTicketAsyncSession() as session:
-            result = await session.execute(query, {"outlet_id": outlet_id, "limit": limit})
-            rows = result.fetchall()
-            return [(row[0], row[1]) for row in rows if row[0]]
 
+        params = {
+            "outlet_id": outlet_id,
+            "top_users_limit": top_users_limit,
+            "top_categories_limit": top_categories_limit,
+        }
+
+        async with session_scope() as session:
+            result = await session.execute(query, params)
+            row = result.mappings().one()
+
+        top_users = row["top_users"]
+        top_categories = row["top_categories"]
+        if isinstance(top_users, (str, bytes)):
+            top_users = orjson.loads(top_users)
+        if isinstance(top_categories, (str, bytes)):
+            top_categories = orjson.loads(top_categories)
+
+        return {
+            "total": row["total"] or 0,
+            "in_progress": row["in_progress"] or 0,
+            "avg_hours": float(row["avg_hours"]) if row["avg_hours"] is not None else None,
+            "today_avg": float(row["today_avg"]) if row["today_avg"] is not None else None,
+            "yesterday_avg": float(row["yesterday_avg"]) if row["yesterday_avg"] is not None else None,
+            "top_users": [(user_id, count) for user_id, count in top_users if user_id],
+            "top_categories": [(department, count) for department, count in top_categories if department],
+        }
@@ -11,30 +11,28 @@ class AnalyticsService:
         Get complete analytics for an outlet.
         Returns ticket counts, closing times, top users, and top categories.
         """
-        # Get ticket counts
-        total_count, in_progress_count = await AnalyticsDao.get_ticket_counts(outlet_id)
-        
-        # Get closing time metrics
-        avg_closing_time = await AnalyticsDao.get_average_closing_time(outlet_id)
-        today_avg, yesterday_avg = await AnalyticsDao.get_closing_time_comparison(outlet_id)
+        # Counts, closing times, top users and top categories in one round trip
+        analytics = await AnalyticsDao.get_basic_analytics(outlet_id, top_users_limit=5, top_categories_limit=10)
+
+        total_count = analytics["total"]
+        in_progress_count = analytics["in_progress"]
+        avg_closing_time = analytics["avg_hours"]
+        today_avg = analytics["today_avg"]
+        yesterday_avg = analytics["yesterday_avg"]
         
         # Calculate change percent
         change_percent = None
         if today_avg is not None and yesterday_avg is not None and yesterday_avg > 0:
             change_percent = ((today_avg - yesterday_avg) / yesterday_avg) * 100
         
-        # Get top users
-        top_users_data = await AnalyticsDao.get_top_closing_users(outlet_id, limit=5)
         top_users = [
             TopUser(user_id=user_id, closed_count=count)
-            for user_id, count in top_users_data
+            for user_id, count in analytics["top_users"]
         ]
         
-        # Get top categories
-        top_categories_data = await AnalyticsDao.get_top_categories(outlet_id, limit=10)
         top_categories = [
             CategoryCount(department=dept, count=count)
-            for dept, count in top_categories_data
+            for dept, count in analytics["top_categories"]
         ]
         
         # Build response
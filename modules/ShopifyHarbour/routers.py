@@ -2,10 +2,12 @@ from fastapi import APIRouter, Depends, Request
 from app.utility import ApiResponse
 from app.project_schemas import APIResponse
 from app.auth import verify_jwt_token
+from app.database import get_unit_of_work
 
 from .controller import *
 
-router = APIRouter()
+# every request on this router shares one session/transaction across its DAO calls
+router = APIRouter(dependencies=[Depends(get_unit_of_work)])
 
 # ========================== UNAUTHENTICATED TICKET ROUTES ==========================
 
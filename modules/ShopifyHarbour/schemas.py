@@ -100,7 +100,6 @@ class TicketBase(BaseModel):
     
     status: TicketStatusEnum = TicketStatusEnum.PENDING
     assigned_agent_id: Optional[int] = None
-    previous_assigned_agent_id: List[Dict[str, Any]]
     
     source: Optional[SourceInfo] = None 
 
@@ -1,5 +1,8 @@
+from pydantic import ValidationError
 from .schemas import *
 from modules.TicketsHarbour.dao import *
+from modules.TicketsHarbour.services import AgentAssignmentService
+from app.tasks import enqueue_ticket_created, enqueue_ticket_updated
 
 class TicketService:
 
@@ -19,7 +22,6 @@ class TicketService:
             return {"error": "department field is required"}, 400
 
         outlet_id = data["outlet_id"]
-        support_settings_for_outlet = await SupportSettingsDao.get_by_outlet_id_or_web_url(outlet_id=outlet_id)
         settings = support_settings_for_outlet.settings
 
         ticket_prefix = settings["prefix"]
@@ -30,39 +32,37 @@ class TicketService:
         if email_required and email is None:
             return {"error": "kindly provide email to generate Ticket."}, 400
 
-        # ---- Generate ticket number ----
-        last_ticket = await TicketsDao.get_last_ticket(outlet_id=outlet_id)
-        if last_ticket:
-            current_no = ''.join(ch for ch in last_ticket if ch.isdigit())
-            next_no = int(current_no) + 1
-        else:
-            next_no = int(start_no)
+        taxonomy = await OutletTaxonomyDao.resolve_one(outlet_id, (data.get("issue"), data.get("category"), data.get("sub_category")))
+        if taxonomy is None:
+            return {"error": "Unknown issue, category or sub-category for this outlet"}, 400
 
-        padded_no = str(next_no).zfill(3)
-        support_ticket_id = f"{ticket_prefix}{padded_no}"
+        # validated before a ticket number is taken, so a bad payload doesn't burn one
+        try:
+            ticket_model = TicketBase.model_validate({**data, "support_ticket_id": ""})
+        except ValidationError as e:
+            return {"error": "Invalid ticket", "errors": e.errors(include_url=False, include_context=False, include_input=False)}, 400
 
-        data["support_ticket_id"] = support_ticket_id
+        department = additional.get("department")
+        if settings.get("auto_assign", True):
+            selected_agent = await AgentAssignmentService.pick_agent(
+                outlet_id=outlet_id,
+                department=department,
+                strategy=settings.get("assignment_strategy") or "least_loaded",
+                skills=data.get("tags") or additional.get("tags"),
+                language=data.get("language") or additional.get("language"),
+            )
 
-        # department = additional.get("department")
-        # department_agents = await AgentsDao.filters(outlet_id=outlet_id, department=department)
+            if not selected_agent:
+                return {"error": f"No agents found for department '{department}'"}, 400
 
-        # if not department_agents:
-        #     return {"error": f"No agents found for department '{department}'"}, 400
-        
-        # # Find agent with least open tickets, default to first agent
-        # lowest_load = -1
-        # selected_agent = department_agents[0]
-        
-        # for agent in department_agents:
-        #     open_ticket_count = await TicketsDao.count_open_tickets_by_agent(agent_id=agent.id)
-        #     if open_ticket_count < lowest_load or lowest_load == -1:
-        #         lowest_load = open_ticket_count
-        #         selected_agent = agent
+            ticket_model = ticket_model.model_copy(update={"assigned_agent_id": selected_agent.id})
 
-        # data["assigned_agent"] = selected_agent.id
+        # ---- Generate ticket number ----
+        support_ticket_id = await TicketNumberAllocator.next_support_ticket_id(outlet_id=outlet_id, prefix=ticket_prefix, start_no=start_no)
+        ticket_model = ticket_model.model_copy(update={"support_ticket_id": support_ticket_id})
 
-        ticket_model = TicketBase(**data)
-        id_ = await TicketsDao.create(ticket_model)
+        id_ = await TicketsDao.create(ticket_model, taxonomy)
+        await enqueue_ticket_created(id_, outlet_id, ticket_model.assigned_agent_id)
         return {"id": id_}, 200
     
     @staticmethod
@@ -80,7 +80,8 @@ class TicketService:
     async def update(**data):
         id_ = data.get("id")
         status = data.get("status")
-        assigned_agent = data.get("assigned_agent")
+        # older storefront clients send the agent as "assigned_agent"
+        assigned_agent_id = data.get("assigned_agent_id", data.get("assigned_agent"))
 
         if not id_:
             return {"error": "id is required for update"}, 400
@@ -99,11 +100,25 @@ class TicketService:
             id=id_,
             outlet_id=ticket.outlet_id,
             status=status,
-            assigned_agent=assigned_agent,
+            # a status-only update keeps the current assignee instead of clearing it
+            assigned_agent_id=assigned_agent_id if assigned_agent_id is not None else ticket.assigned_agent_id,
         )
 
-        updated_id = await TicketsDao.update_status_and_agent(ticket_update)
-        return {"id": updated_id}, 200
+        # the agent checks run inside the UPDATE; nothing is written when one fails
+        updated = await TicketsDao.update_status_and_agent(ticket_update)
+
+        if assigned_agent_id is not None and updated["id"] is None:
+            if updated["agent_outlet_id"] is None:
+                return {"error": "Assigned agent not found"}, 400
+
+            if updated["agent_outlet_id"] != ticket.outlet_id:
+                return {"error": "Agent does not belong to this outlet"}, 403
+
+            if updated["agent_status"] != "active":
+                return {"error": "Agent is not active"}, 400
+
+        await enqueue_ticket_updated(updated, ticket.outlet_id)
+        return {"id": updated["id"]}, 200
 
 
     @staticmethod
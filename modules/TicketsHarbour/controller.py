@@ -1,7 +1,11 @@
 from fastapi import Request
+from functools import lru_cache
 from typing import Optional
-from app.utility import ApiResponse, get_request_data
+from app.utility import ApiResponse, get_request_data, iter_jsonl_records, iter_csv_records
 from app.project_schemas import APIResponse
+from app import response_cache
+from app.uploads import stream_multipart_to_s3, delete_objects, UploadRejected
+from app.database import on_rollback
 from user_agents import parse
 
 from .services import *
@@ -9,12 +13,9 @@ from .services import *
 
 # ========================== AUTHENTICATED TICKET CONTROLLER ==========================
 
-async def auth_tickets_controller(request: Request, outlet_id: Optional[int] = None) -> ApiResponse:
-    data = await get_request_data(request.headers.get("content-type", ""), request)
-    data.update({"outlet_id": outlet_id})
-
-    # Device detection
-    user_agent_str = request.headers.get("user-agent", "")
+@lru_cache(maxsize=1024)
+def _source_from_user_agent(user_agent_str: str) -> dict:
+    # UA parsing is regex-heavy and traffic comes from few distinct UA strings
     ua = parse(user_agent_str)
 
     if ua.is_mobile:
@@ -26,15 +27,33 @@ async def auth_tickets_controller(request: Request, outlet_id: Optional[int] = N
     else:
         device_type = "Unknown"
 
-    source_payload = {
+    return {
         "browser": ua.browser.family,
         "os": ua.os.family,
         "device": device_type,
         "raw_user_agent": user_agent_str
     }
 
+
+async def auth_tickets_controller(request: Request, outlet_id: Optional[int] = None) -> ApiResponse:
+    content_type = request.headers.get("content-type", "")
+
+    # attachments stream straight to S3 instead of being buffered by request.form()
+    uploaded_keys: list[str] = []
+    if request.method == "POST" and "multipart/form-data" in content_type.lower():
+        try:
+            data, uploaded_keys = await stream_multipart_to_s3(request, key_prefix=TICKET_ATTACHMENT_PREFIX.format(outlet_id=outlet_id))
+        except UploadRejected as e:
+            return APIResponse.error(message=str(e), code=e.status_code)
+        # the objects are only kept if the ticket referencing them commits
+        await on_rollback(lambda: delete_objects(uploaded_keys))
+    else:
+        data = await get_request_data(content_type, request)
+    data.update({"outlet_id": outlet_id})
+
+    # Device detection, only needed when the ticket is written
     if request.method in ("POST", "PUT"):
-        data["source"] = source_payload
+        data["source"] = dict(_source_from_user_agent(request.headers.get("user-agent", "")))
     
     method = request.method
 
@@ -42,9 +61,24 @@ async def auth_tickets_controller(request: Request, outlet_id: Optional[int] = N
         case "POST":
             result, status_code = await AuthTicketService.save(**data)
             message = "Tickets send successfully"
+            if status_code >= 400 and uploaded_keys:
+                # rejected without an exception, so nothing rolls back; no ticket points at them
+                await delete_objects(uploaded_keys)
+                uploaded_keys.clear()
         case "GET":
+            # answered from the per-outlet cache until a ticket/agent write bumps the version
+            cache_key = response_cache.cache_key("tickets", outlet_id, data)
+            etag = response_cache.etag_for(cache_key)
+            if response_cache.not_modified(request, etag):
+                return response_cache.not_modified_response(etag)
+            cached = response_cache.cached_response(cache_key, etag)
+            if cached is not None:
+                return cached
+
             result, status_code = await AuthTicketService.get_auth_paginated_tickets(**data)
             message = "Tickets fetched successfully"
+            if status_code == 200:
+                return response_cache.store_response(cache_key, etag, APIResponse.success_body(data=result, message=message, code=status_code))
         case "PUT":
             result, status_code = await AuthTicketService.update(**data)
             message = "Tickets updated successfully"
@@ -57,6 +91,75 @@ async def auth_tickets_controller(request: Request, outlet_id: Optional[int] = N
     return APIResponse.success(data=result, message=message, code=status_code)
 
 
+# content-type -> bulk import format (a ?format=jsonl|csv query param overrides it)
+BULK_IMPORT_FORMATS = {
+    "application/x-ndjson": "jsonl",
+    "application/jsonl": "jsonl",
+    "application/json-lines": "jsonl",
+    "text/csv": "csv",
+}
+
+
+async def auth_tickets_bulk_controller(request: Request, outlet_id: Optional[int] = None) -> ApiResponse:
+    if request.method != "POST":
+        return APIResponse.error(message="Method not allowed", code=405)
+
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    file_format = request.query_params.get("format") or BULK_IMPORT_FORMATS.get(content_type)
+
+    # the body is parsed as it streams in, never buffered whole
+    match file_format:
+        case "jsonl":
+            records = iter_jsonl_records(request.stream())
+        case "csv":
+            records = iter_csv_records(request.stream())
+        case _:
+            return APIResponse.error(message="Send tickets as JSONL (application/x-ndjson) or CSV (text/csv)", code=415)
+
+    result, status_code = await AuthTicketService.bulk_import(outlet_id=outlet_id, records=records)
+    if status_code != 200:
+        return APIResponse.error(message=result.get("error", "Bulk import failed"), code=status_code)
+
+    return APIResponse.success(data=result, message="Tickets imported", code=status_code)
+
+
+async def auth_ticket_attachments_controller(request: Request, action: str, outlet_id: Optional[int] = None) -> ApiResponse:
+    data = await get_request_data(request.headers.get("content-type", ""), request)
+    data.update({"outlet_id": outlet_id})
+
+    if request.method != "POST":
+        return APIResponse.error(message="Method not allowed", code=405)
+
+    match action:
+        case "presign":
+            result, status_code = await TicketAttachmentService.presign(**data)
+            message = "Upload URL issued"
+        case "complete":
+            result, status_code = await TicketAttachmentService.complete(**data)
+            message = "Attachment saved"
+        case _:
+            return APIResponse.error(message="Not found", code=404)
+
+    if status_code != 200:
+        return APIResponse.error(message=result.get("error", "Attachment request failed"), code=status_code)
+
+    return APIResponse.success(data=result, message=message, code=status_code)
+
+
+async def auth_tickets_history_controller(request: Request, outlet_id: Optional[int] = None) -> ApiResponse:
+    data = await get_request_data(request.headers.get("content-type", ""), request)
+    data.update({"outlet_id": outlet_id})
+
+    if request.method != "GET":
+        return APIResponse.error(message="Method not allowed", code=405)
+
+    result, status_code = await AuthTicketService.get_assignment_history(**data)
+    if status_code != 200:
+        return APIResponse.error(message=result.get("error", "Failed to fetch assignment history"), code=status_code)
+
+    return APIResponse.success(data=result, message="Assignment history fetched successfully", code=status_code)
+
+
 async def auth_tickets_stats_controller(request: Request, outlet_id: Optional[int] = None) -> ApiResponse:
     data = await get_request_data(request.headers.get("content-type", ""), request)
     
@@ -156,8 +259,18 @@ async def agents_controller(request: Request, outlet_id: Optional[int] = None) -
             message = "Agent created successfully"
 
         case "GET":
+            cache_key = response_cache.cache_key("agents", outlet_id, data)
+            etag = response_cache.etag_for(cache_key)
+            if response_cache.not_modified(request, etag):
+                return response_cache.not_modified_response(etag)
+            cached = response_cache.cached_response(cache_key, etag)
+            if cached is not None:
+                return cached
+
             result, status_code = await AgentService.get_auth_paginated_agents(**data)
             message = "Agents fetched successfully"
+            if status_code == 200:
+                return response_cache.store_response(cache_key, etag, APIResponse.success_body(data=result, message=message, code=status_code))
 
         case "PUT":
             result, status_code = await AgentService.update(**data)
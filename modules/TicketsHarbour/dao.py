@@ -1,10 +1,15 @@
-from sqlalchemy import text, or_, select, bindparam
+import asyncio
+from sqlalchemy import text, or_, select, bindparam, tuple_, literal_column, delete as sa_delete
 from .models import *
 from.schemas import *
 from app.database import *
-from typing import Tuple
+from typing import Any, Tuple
 from app.database import SupportTicketAsyncSession
+from app.utility import encode_cursor, decode_cursor
+from app.response_cache import invalidate_outlet, on_invalidate
+from app.settings import get_settings
 from sqlalchemy import func
+from cachetools import LRUCache, TTLCache
 
 
 
@@ -27,12 +32,182 @@ TICKETS_NORMAL_COLUMNS_MAPPING = {
     "tags": Ticket.tags,
 }
 
+TICKETS_SORTABLE_EXPRESSIONS = {
+    "created_at": Ticket.created_at,
+    "support_ticket_id": Ticket.support_ticket_id,
+    "priority": Ticket.priority,
+    "department": Ticket.department,
+}
+
+
+# TicketRead's slugs live on the outlet taxonomy rows the ticket points at
+TICKET_LIST_SLUG_COLUMNS = {
+    "issue_slug": OutletIssue.slug,
+    "category_slug": OutletCategory.slug,
+    "sub_category_slug": OutletSubCategory.slug,
+}
+
+# Columns the list endpoints return (every TicketRead field, in its order), fetched as
+# plain rows so pages skip ORM identity-map and Pydantic work
+TICKET_LIST_COLUMNS = tuple(
+    getattr(Ticket, name) if name in Ticket.__table__.c else TICKET_LIST_SLUG_COLUMNS[name].label(name)
+    for name in TicketRead.model_fields
+)
+TICKET_LIST_FIELDS = tuple(column.key for column in TICKET_LIST_COLUMNS)
+
+# the foreign keys are NOT NULL, so inner joins keep every ticket
+TICKET_LIST_FROM = (
+    Ticket.__table__
+    .join(OutletIssue.__table__, Ticket.outlet_issue_id == OutletIssue.id)
+    .join(OutletCategory.__table__, Ticket.outlet_category_id == OutletCategory.id)
+    .join(OutletSubCategory.__table__, Ticket.outlet_sub_category_id == OutletSubCategory.id)
+)
+
+
+def ticket_list_query(query):
+    """A tickets query narrowed to TICKET_LIST_COLUMNS, slugs joined in."""
+    return query.with_only_columns(*TICKET_LIST_COLUMNS).select_from(TICKET_LIST_FROM)
+
+
+def ticket_rows_to_dicts(rows) -> list[dict]:
+    # zip stops at the list columns, dropping any trailing extras such as the window count
+    return [dict(zip(TICKET_LIST_FIELDS, row)) for row in rows]
+
+
+TICKET_COLUMN_KEYS = frozenset(Ticket.__table__.columns.keys())
+
+
+def ticket_taxonomy_key(ticket) -> tuple[str, str, str]:
+    # storefront (ShopifyHarbour) payloads name the slugs issue/category/sub_category
+    return (
+        getattr(ticket, "issue_slug", None) or getattr(ticket, "issue", None),
+        getattr(ticket, "category_slug", None) or getattr(ticket, "category", None),
+        getattr(ticket, "sub_category_slug", None) or getattr(ticket, "sub_category", None),
+    )
+
+
+def ticket_insert_row(ticket, taxonomy: dict) -> dict:
+    """
+    Column values for a new ticket: the payload fields that are Ticket columns, plus the
+    outlet issue/category/sub-category ids and name snapshots resolved from its slugs.
+    """
+    row = {key: value for key, value in ticket.model_dump(mode="json").items() if key in TICKET_COLUMN_KEYS}
+    row.update(taxonomy)
+    return row
+
+
+TICKET_COUNT_MODES = ("exact", "estimated", "none")
+
+# short-lived totals per outlet/search/filter combination, so page flips reuse one count
+TICKET_COUNT_CACHE: TTLCache = TTLCache(maxsize=4096, ttl=30)
+
+
+@on_invalidate
+def _drop_ticket_counts(outlet_id: Optional[int]) -> None:
+    # a write (here or, via NOTIFY, in another worker) changed the outlet's totals
+    if outlet_id is None:
+        TICKET_COUNT_CACHE.clear()
+        return
+    for key in [key for key in TICKET_COUNT_CACHE if key[0] == outlet_id]:
+        TICKET_COUNT_CACHE.pop(key, None)
+
+
+def _ticket_count_key(outlet_id: int, search: str | None, filters: dict | None, count_mode: str) -> tuple:
+    return (outlet_id, search, tuple(sorted((filters or {}).items())), count_mode)
+
+
+async def _count_tickets(query, cache_key: tuple, count_mode: str) -> Optional[int]:
+    if count_mode == "none":
+        return None
+
+    total_count = TICKET_COUNT_CACHE.get(cache_key)
+    if total_count is None:
+        if count_mode == "estimated":
+            total_count = await estimate_count(query)
+        else:
+            total_count = await fetch_one(select(func.count()).select_from(query.subquery()))
+        TICKET_COUNT_CACHE[cache_key] = total_count
+    return total_count
+
+
+def _search_term(search: str) -> str:
+    # TICKET_SEARCH_TEXT is lower-cased
+    return search.strip().lower()
+
+
+def _search_rank(search: str):
+    return func.word_similarity(_search_term(search), TICKET_SEARCH_TEXT)
+
+
+def _normalize_ticket_sort(sort_by: str | None) -> str:
+    return sort_by if sort_by in TICKETS_SORTABLE_EXPRESSIONS else "created_at"
+
+
+def _cursor_position(cursor: str, sort_by: str, sort_order: str) -> tuple[bool, Any, int]:
+    """
+    Decode a page cursor into (backwards, sort value, id). Cursors come back from clients,
+    so anything that page_cursor would not have produced for this sort raises ValueError.
+    """
+    position = decode_cursor(cursor)
+    if position.get("sort_by") != sort_by or position.get("sort_order") != sort_order:
+        raise ValueError("Cursor does not match the requested sort_by/sort_order")
+
+    direction, value, id_ = position.get("direction"), position.get("value"), position.get("id")
+    if direction not in ("next", "prev") or type(id_) is not int or not isinstance(value, str):
+        raise ValueError("Invalid cursor")
+    if sort_by == "created_at":
+        value = datetime.fromisoformat(value)
+    return direction == "prev", value, id_
+
+
+def _tickets_base_query(outlet_id: int, search: str | None = None, filters: dict | None = None):
+    # base select query to fetch based on outlet_id
+    query = select(Ticket).where(Ticket.outlet_id == outlet_id)
+
+    # search (trigram expression index on TICKET_SEARCH_TEXT)
+    if search is not None:
+        query = query.where(TICKET_SEARCH_TEXT.contains(_search_term(search), autoescape=True))
+
+    # filter
+    if filters is not None:
+        for key, value in filters.items():
+
+            if key in TICKETS_NORMAL_COLUMNS_MAPPING:
+                query = query.where(TICKETS_NORMAL_COLUMNS_MAPPING[key] == value)
+
+            elif key in TICKETS_JSON_KEY_MAPPING:
+                column = getattr(Ticket, TICKETS_JSON_KEY_MAPPING[key])
+                query = query.where(column[key].astext == str(value))
+
+            else:
+                raise ValueError(f"Unsupported filter: {key}")
+
+    return query
+
+
+# Inlined rather than bound: Postgres only uses the partial ix_tickets_open_assigned_agent_id
+# when it can prove the query implies the index predicate at plan time
+TICKET_IS_OPEN = Ticket.status != literal_column("'closed'")
+
+
 class TicketsDao:
 
     @staticmethod
-    async def create(ticket: TicketBase) -> int:
-        ticket_obj = Ticket(**ticket.dict())
-        return await create(ticket_obj)
+    async def create(ticket: TicketBase, taxonomy: dict) -> int:
+        """taxonomy: OutletTaxonomyDao.resolve's entry for the ticket's slugs."""
+        ticket_obj = Ticket(**ticket_insert_row(ticket, taxonomy))
+        id_ = await create(ticket_obj)
+        await invalidate_outlet(ticket.outlet_id)
+        return id_
+
+    @staticmethod
+    async def bulk_create(tickets: list[TicketBase], taxonomies: dict[tuple[str, str, str], dict]) -> list[int]:
+        """taxonomies must hold an OutletTaxonomyDao.resolve entry for every ticket's slugs."""
+        rows = [ticket_insert_row(ticket, taxonomies[ticket_taxonomy_key(ticket)]) for ticket in tickets]
+        ids = await bulk_insert(Ticket, rows)
+        for outlet_id in {ticket.outlet_id for ticket in tickets}:
+            await invalidate_outlet(outlet_id)
+        return ids
 
     @staticmethod
     async def get_by_support_ticket_id(support_ticket_id: String) -> Optional[Ticket]:
@@ -49,15 +224,6 @@ class TicketsDao:
         query = select(Ticket).where(Ticket.id== id)
         return await fetch_one(query)
 
-    @staticmethod
-    async def get_last_ticket(outlet_id: int) -> Optional[str]:
-        query = select(Ticket.support_ticket_id).where(Ticket.outlet_id == outlet_id).order_by(Ticket.id.desc()).limit(1)
-        row = await fetch_one(query)
-
-        if row is None:
-            return None
-        return str(row) 
-        
     @staticmethod
     async def get_outlet(shop: str) -> Tuple[str, str]:
         query = text(""" SELECT * FROM shopify_shop WHERE shop = :shop """).bindparams(shop=shop)
@@ -74,164 +240,242 @@ class TicketsDao:
         search: str | None = None,
         filters: dict | None = None,
         sort_by: str = "created_at",
-        sort_order: str = "desc"
+        sort_order: str = "desc",
+        count_mode: str = "exact"
     ):
+        """
+        Offset pagination. Returns (rows, total_count): rows hold TICKET_LIST_COLUMNS and
+        total_count is exact, a planner estimate, or None depending on count_mode.
+        """
         
-        # base select query to fetch based on outlet_id
-        query = select(Ticket).where(Ticket.outlet_id == outlet_id)
-        
-        # search
-        if search is not None:
-            search_pattern = f"%{search}%"
-            
-            query = query.where(
-            or_(
-                Ticket.support_ticket_id.ilike(search_pattern),
-                Ticket.customer_details["customer_first_name"].astext.ilike(search_pattern),
-                Ticket.customer_details["customer_last_name"].astext.ilike(search_pattern),
-                Ticket.customer_details["customer_email"].astext.ilike(search_pattern),
-            )
-        )
+        query = _tickets_base_query(outlet_id, search=search, filters=filters)
+        page_query = ticket_list_query(query)
+
+        # sort & order (id keeps the order stable so page cursors line up)
+        if sort_by == "relevance" and search:
+            page_query = page_query.order_by(_search_rank(search).desc(), Ticket.created_at.desc(), Ticket.id.desc())
+        else:
+            sort_by = _normalize_ticket_sort(sort_by)
+            column = TICKETS_SORTABLE_EXPRESSIONS[sort_by]
+
+            if sort_order == "asc":
+                page_query = page_query.order_by(column.asc(), Ticket.id.asc())
+            else:
+                page_query = page_query.order_by(column.desc(), Ticket.id.desc())
         
-        # filter
-        if filters is not None:
-            for key, value in filters.items():
-                
-                if key in TICKETS_NORMAL_COLUMNS_MAPPING:
-                    query = query.where(TICKETS_NORMAL_COLUMNS_MAPPING[key] == value)
-                
-                elif key in TICKETS_JSON_KEY_MAPPING:
-                    column = getattr(Ticket, TICKETS_JSON_KEY_MAPPING[key])
-                    query = query.where(column[key].astext == str(value))
-                
-                else:
-                    raise ValueError(f"Unsupported filter: {key}")
+        # limit & offset
+        page_query = page_query.limit(limit).offset(offset) if limit != 0 else page_query
 
-        # sort & order
-        SORTABLE_EXPRESSIONS = {
-            "created_at": Ticket.created_at,
-            "support_ticket_id": Ticket.support_ticket_id,
-            "priority": Ticket.priority,
-            "department": Ticket.department,
-        }
+        cache_key = _ticket_count_key(outlet_id, search, filters, count_mode)
+        if count_mode != "exact" or cache_key in TICKET_COUNT_CACHE:
+            total_count = await _count_tickets(query, cache_key, count_mode)
+            result = await execute_query(page_query)
+            return result.all(), total_count
 
-        column = SORTABLE_EXPRESSIONS.get(sort_by, Ticket.created_at)
+        # exact total rides along with the page as a window aggregate: one round trip
+        result = await execute_query(page_query.add_columns(func.count().over().label("total_count")))
+        rows = result.all()
 
-        if sort_order == "asc":
-            query = query.order_by(column.asc())
+        if rows:
+            total_count = rows[0].total_count
+        elif offset == 0:
+            total_count = 0
         else:
-            query = query.order_by(column.desc())
-        
-        # fallback sort_by
-        if sort_by is None and sort_order is None:
-            query = query.order_by(Ticket.support_ticket_id.asc())
-        
+            # past the last page the window has nothing to report
+            total_count = await fetch_one(select(func.count()).select_from(query.subquery()))
+
+        TICKET_COUNT_CACHE[cache_key] = total_count
+        return rows, total_count
+
+    @staticmethod
+    async def get_cursor_paginated_tickets(
+        outlet_id: int,
+        limit: int,
+        cursor: str | None = None,
+        search: str | None = None,
+        filters: dict | None = None,
+        sort_by: str = "created_at",
+        sort_order: str = "desc",
+        count_mode: str = "exact"
+    ):
+        """
+        Keyset pagination on (sort column, id).
+        Returns (rows, total_count, next_cursor, prev_cursor) with rows holding
+        TICKET_LIST_COLUMNS; the cost of a page
+        does not depend on how deep into the result set it is.
+        """
+
+        sort_by = _normalize_ticket_sort(sort_by)
+        sort_order = "asc" if sort_order == "asc" else "desc"
+        column = TICKETS_SORTABLE_EXPRESSIONS[sort_by]
+
+        # decoded before any query runs, so a bad cursor costs nothing
+        backwards, value, id_ = _cursor_position(cursor, sort_by, sort_order) if cursor else (False, None, None)
+
+        query = _tickets_base_query(outlet_id, search=search, filters=filters)
+
         # total count
-        count_query = select(func.count()).select_from(query.subquery())
-        total_count = await fetch_all(count_query)
-        
-        # limit & offset
-        query = query.limit(limit).offset(offset) if limit != 0 else query
-        row_query = await fetch_all(query)
-        
-        return row_query, total_count
+        total_count = await _count_tickets(query, _ticket_count_key(outlet_id, search, filters, count_mode), count_mode)
+
+        if cursor:
+            # walking backwards flips both the comparison and the ordering
+            if (sort_order == "desc") != backwards:
+                query = query.where(tuple_(column, Ticket.id) < tuple_(value, id_))
+            else:
+                query = query.where(tuple_(column, Ticket.id) > tuple_(value, id_))
+
+        if (sort_order == "desc") != backwards:
+            query = query.order_by(column.desc(), Ticket.id.desc())
+        else:
+            query = query.order_by(column.asc(), Ticket.id.asc())
+
+        # one extra row tells us whether another page exists in the walking direction
+        result = await execute_query(ticket_list_query(query).limit(limit + 1))
+        rows = result.all()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        if backwards:
+            rows.reverse()
+
+        next_cursor = None
+        prev_cursor = None
+        if rows:
+            if has_more or backwards:
+                next_cursor = TicketsDao.page_cursor(rows[-1], sort_by, sort_order, "next")
+            if (cursor and not backwards) or (backwards and has_more):
+                prev_cursor = TicketsDao.page_cursor(rows[0], sort_by, sort_order, "prev")
+
+        return rows, total_count, next_cursor, prev_cursor
 
     @staticmethod
-    async def get_ticket_stats(outlet_id: int):
+    def page_cursor(ticket, sort_by: str, sort_order: str, direction: str) -> str:
+        sort_by = _normalize_ticket_sort(sort_by)
+        value = getattr(ticket, sort_by)
+        if isinstance(value, datetime):
+            value = value.isoformat()
+        return encode_cursor({
+            "sort_by": sort_by,
+            "sort_order": "asc" if sort_order == "asc" else "desc",
+            "direction": direction,
+            "value": value,
+            "id": ticket.id,
+        })
+
+    @staticmethod
+    async def global_search(outlet_id: int, search: str, limit: int = 20) -> List[Ticket]:
+        """
+        Best matches first, ranked by trigram word similarity.
+        """
         query = (
-            select(
-                func.count().label("total"),
-                func.count().filter(Ticket.status == "open").label("open_count"),
-                func.count().filter(Ticket.status == "pending").label("pending_count"),
-                func.count().filter(Ticket.status == "closed").label("closed_count"),
-                func.count().filter(Ticket.status == "assigned").label("assigned_count"),
-            ).where(Ticket.outlet_id == outlet_id)
+            select(Ticket)
+            .where(Ticket.outlet_id == outlet_id, TICKET_SEARCH_TEXT.contains(_search_term(search), autoescape=True))
+            .order_by(_search_rank(search).desc(), Ticket.created_at.desc())
+            .limit(limit)
         )
+        return await fetch_all(query)
 
-        result = await execute_query(query)
-
-        row = result.one()  # IMPORTANT
-
-        return {
-            "total_tickets_count": row.total,
-            "open_tickets_count": row.open_count,
-            "pending_tickets_count": row.pending_count,
-            "closed_tickets_count": row.closed_count,
-            "assigned_tickets_count": row.assigned_count,
-        }
+    @staticmethod
+    async def get_ticket_stats(outlet_id: int):
+        return await TicketStatsDao.get_by_outlet_id(outlet_id)
 
     @staticmethod
     async def update(ticket: TicketUpdateIn) -> int:
         ticket = Ticket(**ticket.dict())
-        return await update(ticket)
+        id_ = await update(ticket)
+        await invalidate_outlet(ticket.outlet_id)
+        return id_
 
     @staticmethod
-    async def update_status_and_agent(ticket_update: TicketUpdateIn):
+    async def update_status_and_agent(ticket_update: TicketUpdateIn) -> dict:
         """
-        Update ticket using TicketUpdateIn typehint.
-        Sets closed_at timestamp when status changes to 'closed'.
+        Update ticket status/assignee in one statement.
+        A new agent must exist, belong to the outlet and be active, otherwise nothing is
+        written; agent_outlet_id/agent_status come back so the caller can say why. Passing
+        the current assignee again keeps it, even if that agent has since been deactivated.
+        Records a ticket_assignment_events row when the assignee changes and sets
+        closed_at the first time the ticket is closed.
+        Returns {"id", "agent_outlet_id", "agent_status", "previous_status", "status",
+        "previous_agent_id", "assigned_agent_id"}; id is None when nothing was updated.
         """
-        
-        query = select(Ticket.assigned_agent_id).where(Ticket.outlet_id == ticket_update.outlet_id, Ticket.id == ticket_update.id)
-        current_assigned_agent_id = await fetch_one(query)
-        
-        status_value = ticket_update.status.value.lower() if hasattr(ticket_update.status, 'value') else str(ticket_update.status).lower()
-        
-        # Set closed_at if status is being changed to 'closed'
-        if status_value == 'closed':
-            query = text("""
-                UPDATE tickets
-                SET 
-                    status = :status,
-                    assigned_agent_id = :assigned_agent_id,
+
+        status = ticket_update.status
+        status_value = (status.value if hasattr(status, "value") else str(status)).lower() if status is not None else None
+
+        query = text("""
+            WITH agent AS (
+                SELECT outlet_id, status
+                FROM agents
+                WHERE id = CAST(:assigned_agent_id AS INTEGER)
+            ),
+            current_ticket AS (
+                SELECT id, status, assigned_agent_id
+                FROM tickets
+                WHERE id = :id AND outlet_id = :outlet_id
+                FOR UPDATE
+            ),
+            updated AS (
+                UPDATE tickets t
+                SET
+                    status = COALESCE(CAST(:status AS VARCHAR), t.status),
+                    assigned_agent_id = CAST(:assigned_agent_id AS INTEGER),
                     updated_at = NOW(),
-                    closed_at = CASE 
-                        WHEN closed_at IS NULL THEN NOW()
-                        ELSE closed_at
+                    closed_at = CASE
+                        WHEN COALESCE(CAST(:status AS VARCHAR), t.status) = 'closed' THEN COALESCE(t.closed_at, NOW())
+                        ELSE t.closed_at
                     END
-                WHERE id = :id AND outlet_id = :outlet_id
-                RETURNING id;
-            """)
-        elif current_assigned_agent_id != ticket_update.assigned_agent_id: # updating previous_assigned_agent_id
-            query = text("""
-                UPDATE tickets
-                SET 
-                    status = :status,
-                    previous_assigned_agent_id = 
-                        COALESCE(previous_assigned_agent_id, '[]'::jsonb)
-                        || jsonb_build_array(
-                            jsonb_build_object(
-                                'agent_id', assigned_agent_id,
-                                'timestamp', NOW()
-                            )
-                        ),
-                    assigned_agent_id = :assigned_agent_id,
-                    updated_at = NOW()
-                WHERE id = :id 
-                AND outlet_id = :outlet_id
-                RETURNING id;
-            """)
-        else:
-            query = text("""
-                UPDATE tickets
-                SET 
-                    status = :status,
-                    assigned_agent_id = :assigned_agent_id,
-                    updated_at = NOW()
-                WHERE id = :id AND outlet_id = :outlet_id
-                RETURNING id;
-            """)
-        
-        query = query.bindparams(
+                FROM current_ticket c
+                WHERE t.id = c.id
+                AND (
+                    CAST(:assigned_agent_id AS INTEGER) IS NULL
+                    OR CAST(:assigned_agent_id AS INTEGER) = c.assigned_agent_id
+                    OR EXISTS (SELECT 1 FROM agent WHERE agent.outlet_id = :outlet_id AND agent.status = 'active')
+                )
+                RETURNING t.id, t.outlet_id, c.status AS previous_status, t.status, c.assigned_agent_id AS previous_agent_id, t.assigned_agent_id
+            ),
+            history AS (
+                INSERT INTO ticket_assignment_events (ticket_id, outlet_id, previous_agent_id, agent_id)
+                SELECT id, outlet_id, previous_agent_id, assigned_agent_id
+                FROM updated
+                WHERE previous_agent_id IS DISTINCT FROM assigned_agent_id
+            )
+            SELECT
+                (SELECT id FROM updated) AS id,
+                (SELECT outlet_id FROM agent) AS agent_outlet_id,
+                (SELECT status FROM agent) AS agent_status,
+                (SELECT previous_status FROM updated) AS previous_status,
+                (SELECT status FROM updated) AS status,
+                (SELECT previous_agent_id FROM updated) AS previous_agent_id,
+                (SELECT assigned_agent_id FROM updated) AS assigned_agent_id;
+        """).bindparams(
             id=ticket_update.id,
             outlet_id=ticket_update.outlet_id,
             status=status_value,
             assigned_agent_id=ticket_update.assigned_agent_id,
         )
 
+        result = await execute_query(query)
+        updated = dict(result.mappings().one())
+        if updated["id"] is not None:
+            await invalidate_outlet(ticket_update.outlet_id)
+        return updated
+
+    @staticmethod
+    async def set_attachment(id: int, outlet_id: int, attachment: str) -> Optional[int]:
+        query = text("""
+                UPDATE tickets
+                SET
+                    attachment = :attachment,
+                    updated_at = NOW()
+                WHERE id = :id AND outlet_id = :outlet_id
+                RETURNING id;
+            """).bindparams(id=id, outlet_id=outlet_id, attachment=attachment)
+
         result = await execute_query(query)
         row = result.fetchone()
-        return row[0] if row else None
+        if not row:
+            return None
+        await invalidate_outlet(outlet_id)
+        return row.id
 
     @staticmethod
     async def update_agent_rating(id: int, rating: int):
@@ -241,12 +485,15 @@ class TicketsDao:
                     agent_rating = :rating,
                     updated_at = NOW()
                 WHERE id = :id
-                RETURNING id;
+                RETURNING id, outlet_id;
             """).bindparams(id=id, rating=rating)
         
         result = await execute_query(query)
         row = result.fetchone()
-        return row[0] if row else None
+        if not row:
+            return None
+        await invalidate_outlet(row.outlet_id)
+        return row.id
 
     @staticmethod
     async def update_customer_rating(ticket_id: int, rating: int):
@@ -257,16 +504,21 @@ class TicketsDao:
                     customer_rating = :rating,
                     updated_at = NOW()
                 WHERE id = :id
-                RETURNING id;
+                RETURNING id, outlet_id;
             """).bindparams(id=ticket_id, rating=rating)
         
         result = await execute_query(query)
         row = result.fetchone()
-        return row[0] if row else None
+        if not row:
+            return None
+        await invalidate_outlet(row.outlet_id)
+        return row.id
 
     @staticmethod
     async def delete(id: int):
-        await delete_by_id(Ticket, id=id)
+        query = sa_delete(Ticket).where(Ticket.id == id).returning(Ticket.outlet_id)
+        result = await execute_query(query)
+        await invalidate_outlet(result.scalar_one_or_none())
 
     @staticmethod
     async def filters(**filters) -> List[Ticket]:
@@ -295,25 +547,569 @@ class TicketsDao:
 
     @staticmethod
     async def count_open_tickets_by_agent(agent_id: int) -> int:
-        query = select(func.count(Ticket.id)).where(Ticket.assigned_agent_id == agent_id, Ticket.status != 'closed')
+        query = select(func.count(Ticket.id)).where(Ticket.assigned_agent_id == agent_id, TICKET_IS_OPEN)
         return await fetch_one(query)
 
+    @staticmethod
+    async def count_open_tickets_by_agents(agent_ids: List[int]) -> dict[int, int]:
+        """
+        Open-ticket load for many agents in one grouped query; agents without open tickets are absent.
+        """
+        if not agent_ids:
+            return {}
+        query = (
+            select(Ticket.assigned_agent_id, func.count(Ticket.id))
+            .where(Ticket.assigned_agent_id.in_(agent_ids), TICKET_IS_OPEN)
+            .group_by(Ticket.assigned_agent_id)
+        )
+        result = await execute_query(query)
+        return {agent_id: count for agent_id, count in result.all()}
+
+# -------------------------------------------------------------- Ticket stats ------------------------------------------------------------
+
+# buffered ticket_stats_deltas rows folded per transaction
+TICKET_STATS_FOLD_CHUNK_SIZE = 5000
+
+# counts of one outlet's tickets, in ticket_stats column order
+ACTUAL_TICKET_COUNTS = """
+    SELECT
+        COUNT(*) AS total_count,
+        COUNT(*) FILTER (WHERE status = 'open') AS open_count,
+        COUNT(*) FILTER (WHERE status = 'pending') AS pending_count,
+        COUNT(*) FILTER (WHERE status = 'closed') AS closed_count,
+        COUNT(*) FILTER (WHERE status = 'assigned') AS assigned_count
+    FROM tickets
+    WHERE outlet_id = :outlet_id
+"""
+
+TICKET_STATS_COUNTS = ("total_count", "open_count", "pending_count", "closed_count", "assigned_count")
+
+
+class TicketStatsDao:
+    """
+    Ticket writes never touch ticket_stats: the triggers append per-statement deltas to
+    ticket_stats_deltas, which take no row lock another request could wait on. The rollup
+    row is only locked by fold_deltas and reconcile, for a single short statement each, so
+    readers add whatever is still buffered to it.
+    """
+
+    @staticmethod
+    async def get_by_outlet_id(outlet_id: int) -> dict:
+        query = text("""
+            SELECT
+                COALESCE(SUM(total_count), 0) AS total_count,
+                COALESCE(SUM(open_count), 0) AS open_count,
+                COALESCE(SUM(pending_count), 0) AS pending_count,
+                COALESCE(SUM(closed_count), 0) AS closed_count,
+                COALESCE(SUM(assigned_count), 0) AS assigned_count
+            FROM (
+                SELECT total_count, open_count, pending_count, closed_count, assigned_count
+                FROM ticket_stats WHERE outlet_id = :outlet_id
+                UNION ALL
+                SELECT total_count, open_count, pending_count, closed_count, assigned_count
+                FROM ticket_stats_deltas WHERE outlet_id = :outlet_id
+            ) AS counts
+        """).bindparams(outlet_id=outlet_id)
+        row = (await execute_query(query)).first()
+
+        return {
+            "total_tickets_count": int(row.total_count),
+            "open_tickets_count": int(row.open_count),
+            "pending_tickets_count": int(row.pending_count),
+            "closed_tickets_count": int(row.closed_count),
+            "assigned_tickets_count": int(row.assigned_count),
+        }
+
+    @staticmethod
+    async def fold_deltas(limit: int = TICKET_STATS_FOLD_CHUNK_SIZE) -> int:
+        """
+        Move buffered deltas into ticket_stats, `limit` rows per transaction, until none are left.
+        Rows another folder has claimed are skipped rather than waited on.
+        Returns the number of delta rows folded.
+        """
+        folded = 0
+        while True:
+            async with SupportTicketAsyncSession() as session:
+                async with session.begin():
+                    result = await session.execute(
+                        text("""
+                            WITH moved AS (
+                                DELETE FROM ticket_stats_deltas
+                                WHERE id IN (
+                                    SELECT id FROM ticket_stats_deltas
+                                    ORDER BY id
+                                    LIMIT :limit
+                                    FOR UPDATE SKIP LOCKED
+                                )
+                                RETURNING outlet_id, total_count, open_count, pending_count, closed_count, assigned_count
+                            ),
+                            summed AS (
+                                SELECT
+                                    outlet_id,
+                                    COUNT(*) AS rows_count,
+                                    SUM(total_count) AS total_count,
+                                    SUM(open_count) AS open_count,
+                                    SUM(pending_count) AS pending_count,
+                                    SUM(closed_count) AS closed_count,
+                                    SUM(assigned_count) AS assigned_count
+                                FROM moved
+                                GROUP BY outlet_id
+                            ),
+                            applied AS (
+                                INSERT INTO ticket_stats AS s (outlet_id, total_count, open_count, pending_count, closed_count, assigned_count)
+                                SELECT outlet_id, total_count, open_count, pending_count, closed_count, assigned_count
+                                FROM summed
+                                ORDER BY outlet_id
+                                ON CONFLICT (outlet_id) DO UPDATE SET
+                                    total_count    = s.total_count + EXCLUDED.total_count,
+                                    open_count     = s.open_count + EXCLUDED.open_count,
+                                    pending_count  = s.pending_count + EXCLUDED.pending_count,
+                                    closed_count   = s.closed_count + EXCLUDED.closed_count,
+                                    assigned_count = s.assigned_count + EXCLUDED.assigned_count,
+                                    updated_at     = now()
+                            )
+                            SELECT COALESCE(SUM(rows_count), 0) FROM summed;
+                        """).bindparams(limit=limit)
+                    )
+                    moved = int(result.scalar_one())
+
+            folded += moved
+            if moved < limit:
+                break
+
+        if folded:
+            print(f"[CRON] ticket_stats folded {folded} deltas")
+        return folded
+
+    @staticmethod
+    async def reconcile(outlet_id: int) -> bool:
+        """
+        Recount one outlet's tickets and overwrite its rollup row if it drifted.
+        Runs in one REPEATABLE READ snapshot: the outlet's buffered deltas are claimed and the
+        tickets counted as of the same moment, so deltas committed after it stay buffered and
+        apply on top of the recount. Returns True when rollup plus deltas had drifted.
+        """
+        async with SupportTicketAsyncSession() as session:
+            async with session.begin():
+                await session.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+
+                buffered = (await session.execute(
+                    text("""
+                        WITH moved AS (
+                            DELETE FROM ticket_stats_deltas WHERE outlet_id = :outlet_id
+                            RETURNING total_count, open_count, pending_count, closed_count, assigned_count
+                        )
+                        SELECT
+                            COALESCE(SUM(total_count), 0) AS total_count,
+                            COALESCE(SUM(open_count), 0) AS open_count,
+                            COALESCE(SUM(pending_count), 0) AS pending_count,
+                            COALESCE(SUM(closed_count), 0) AS closed_count,
+                            COALESCE(SUM(assigned_count), 0) AS assigned_count
+                        FROM moved
+                    """).bindparams(outlet_id=outlet_id)
+                )).one()
+                stored = (await session.execute(
+                    text("""
+                        SELECT total_count, open_count, pending_count, closed_count, assigned_count
+                        FROM ticket_stats WHERE outlet_id = :outlet_id
+                    """).bindparams(outlet_id=outlet_id)
+                )).first()
+                actual = (await session.execute(text(ACTUAL_TICKET_COUNTS).bindparams(outlet_id=outlet_id))).one()
+
+                expected = tuple(
+                    int(getattr(buffered, column)) + (int(getattr(stored, column)) if stored else 0)
+                    for column in TICKET_STATS_COUNTS
+                )
+                counted = tuple(int(getattr(actual, column)) for column in TICKET_STATS_COUNTS)
+
+                await session.execute(
+                    text("""
+                        INSERT INTO ticket_stats AS s (outlet_id, total_count, open_count, pending_count, closed_count, assigned_count)
+                        VALUES (:outlet_id, :total_count, :open_count, :pending_count, :closed_count, :assigned_count)
+                        ON CONFLICT (outlet_id) DO UPDATE SET
+                            total_count    = EXCLUDED.total_count,
+                            open_count     = EXCLUDED.open_count,
+                            pending_count  = EXCLUDED.pending_count,
+                            closed_count   = EXCLUDED.closed_count,
+                            assigned_count = EXCLUDED.assigned_count,
+                            updated_at     = now()
+                    """).bindparams(outlet_id=outlet_id, **dict(zip(TICKET_STATS_COUNTS, counted)))
+                )
+                return expected != counted
+
+    @staticmethod
+    async def reconcile_all() -> int:
+        """
+        Repair drift for every outlet that has tickets or a rollup row.
+        Returns the number of outlets that were corrected.
+        """
+        query = text("""
+            SELECT outlet_id FROM ticket_stats
+            UNION
+            SELECT DISTINCT outlet_id FROM tickets
+        """)
+        result = await execute_query(query)
+        outlet_ids = result.scalars().all()
+
+        repaired = 0
+        for outlet_id in outlet_ids:
+            try:
+                if await TicketStatsDao.reconcile(outlet_id):
+                    repaired += 1
+            except Exception as e:
+                # a concurrent fold of the same rows fails the snapshot; the next run retries it
+                print(f"[CRON] ticket_stats reconcile failed for outlet {outlet_id}: {e}")
+
+        print(f"[CRON] ticket_stats reconciled for {len(outlet_ids)} outlets, {repaired} repaired")
+        return repaired
+
+
+# ---------------------------------------------------------------- Ticket SLAs -------------------------------------------------------------
+
+# overdue tickets breached and escalated per transaction
+SLA_SCAN_CHUNK_SIZE = 500
+
+class TicketSlaDao:
+
+    @staticmethod
+    async def escalate_due(limit: int = SLA_SCAN_CHUNK_SIZE) -> list[int]:
+        """
+        Stamp the missed deadlines of up to `limit` overdue tickets, oldest deadline first,
+        and raise their priority one step, all in one statement. Rows another scanner has
+        locked are skipped rather than waited on. Returns the outlet id of each escalated ticket.
+        """
+        async with SupportTicketAsyncSession() as session:
+            async with session.begin():
+                result = await session.execute(
+                    text("""
+                        WITH due AS (
+                            SELECT id
+                            FROM tickets
+                            WHERE sla_due_at <= now()
+                            ORDER BY sla_due_at
+                            LIMIT :limit
+                            FOR UPDATE SKIP LOCKED
+                        )
+                        UPDATE tickets t
+                        SET
+                            first_response_breached_at = CASE
+                                WHEN t.first_response_breached_at IS NULL AND t.status IN ('open', 'pending') AND t.first_response_due_at <= now()
+                                THEN now() ELSE t.first_response_breached_at
+                            END,
+                            resolution_breached_at = CASE
+                                WHEN t.resolution_breached_at IS NULL AND t.status <> 'closed' AND t.resolution_due_at <= now()
+                                THEN now() ELSE t.resolution_breached_at
+                            END,
+                            sla_escalation_level = t.sla_escalation_level + 1,
+                            priority = CASE t.priority
+                                WHEN 'low' THEN 'medium'
+                                WHEN 'medium' THEN 'high'
+                                ELSE 'critical'
+                            END,
+                            updated_at = now()
+                        FROM due
+                        WHERE t.id = due.id
+                        RETURNING t.outlet_id;
+                    """).bindparams(limit=limit)
+                )
+                # the tickets_sla_deadlines trigger moves sla_due_at past the stamped deadlines
+                return list(result.scalars().all())
+
+    @staticmethod
+    async def scan(chunk_size: int = SLA_SCAN_CHUNK_SIZE) -> int:
+        """
+        Escalate every overdue ticket, one chunk per transaction, until a chunk comes back short.
+        Only one chunk of outlet ids is held at a time, whatever the backlog.
+        Returns the number of tickets escalated.
+        """
+        escalated = 0
+        while True:
+            outlet_ids = await TicketSlaDao.escalate_due(chunk_size)
+            escalated += len(outlet_ids)
+            for outlet_id in set(outlet_ids):
+                await invalidate_outlet(outlet_id)
+            if len(outlet_ids) < chunk_size:
+                break
+
+        if escalated:
+            print(f"[CRON] SLA scan escalated {escalated} tickets")
+        return escalated
+
+
+# --------------------------------------------------------- Outlet issue taxonomy ---------------------------------------------------------
+
+class OutletTaxonomyDao:
+
+    @staticmethod
+    async def resolve(outlet_id: int, keys: set[tuple[str, str, str]]) -> dict[tuple[str, str, str], dict]:
+        """
+        Map (issue_slug, category_slug, sub_category_slug) to the outlet's ids and current
+        names, in one query for any number of combinations. Only active, untrashed entries
+        that are mapped to each other resolve; missing keys are left out of the result.
+        """
+        keys = {key for key in keys if all(key)}
+        if not keys:
+            return {}
+
+        query = (
+            select(
+                OutletIssue.slug.label("issue_slug"),
+                OutletCategory.slug.label("category_slug"),
+                OutletSubCategory.slug.label("sub_category_slug"),
+                OutletIssue.id.label("outlet_issue_id"),
+                OutletCategory.id.label("outlet_category_id"),
+                OutletSubCategory.id.label("outlet_sub_category_id"),
+                OutletIssue.name.label("issue_name_snapshot"),
+                OutletCategory.name.label("category_name_snapshot"),
+                OutletSubCategory.name.label("sub_category_name_snapshot"),
+            )
+            .join(OutletIssueCategoryMap, OutletIssueCategoryMap.outlet_issue_id == OutletIssue.id)
+            .join(OutletCategory, OutletCategory.id == OutletIssueCategoryMap.outlet_category_id)
+            .join(OutletCategorySubCategoryMap, OutletCategorySubCategoryMap.outlet_category_id == OutletCategory.id)
+            .join(OutletSubCategory, OutletSubCategory.id == OutletCategorySubCategoryMap.outlet_sub_category_id)
+            .where(
+                OutletIssue.outlet_id == outlet_id,
+                tuple_(OutletIssue.slug, OutletCategory.slug, OutletSubCategory.slug).in_(list(keys)),
+                OutletIssue.is_active.is_(True), OutletIssue.is_trash.is_(False),
+                OutletCategory.is_active.is_(True), OutletCategory.is_trash.is_(False),
+                OutletSubCategory.is_active.is_(True), OutletSubCategory.is_trash.is_(False),
+                OutletIssueCategoryMap.is_active.is_(True),
+                OutletCategorySubCategoryMap.is_active.is_(True),
+            )
+        )
+        result = await execute_query(query)
+
+        resolved = {}
+        for row in result.mappings():
+            row = dict(row)
+            key = (row.pop("issue_slug"), row.pop("category_slug"), row.pop("sub_category_slug"))
+            resolved[key] = row
+        return resolved
+
+    @staticmethod
+    async def resolve_one(outlet_id: int, key: tuple[str, str, str]) -> Optional[dict]:
+        return (await OutletTaxonomyDao.resolve(outlet_id, {key})).get(key)
+
+
+# -------------------------------------------------------------- Ticket numbers ------------------------------------------------------------
+
+class TicketCounterDao:
+
+    @staticmethod
+    async def allocate(outlet_id: int, start_no: int, count: int = 1) -> int:
+        """
+        Reserve `count` consecutive ticket numbers for the outlet and return the last one.
+        The counter row is only locked for the single UPDATE, in its own short transaction.
+        """
+        async with SupportTicketAsyncSession() as session:
+            async with session.begin():
+                result = await session.execute(
+                    text("""
+                        UPDATE ticket_counters
+                        SET last_no = last_no + CAST(:count AS BIGINT), updated_at = NOW()
+                        WHERE outlet_id = :outlet_id
+                        RETURNING last_no;
+                    """).bindparams(outlet_id=outlet_id, count=count)
+                )
+                last_no = result.scalar_one_or_none()
+                if last_no is not None:
+                    return last_no
+
+                # first allocation for this outlet: seed past any ticket numbers already issued
+                result = await session.execute(
+                    text("""
+                        INSERT INTO ticket_counters (outlet_id, last_no)
+                        SELECT
+                            :outlet_id,
+                            GREATEST(
+                                CAST(:start_no AS BIGINT) - 1,
+                                COALESCE(MAX(NULLIF(regexp_replace(support_ticket_id, '\\D', '', 'g'), '')::bigint), 0)
+                            ) + CAST(:count AS BIGINT)
+                        FROM tickets
+                        WHERE outlet_id = :outlet_id
+                        ON CONFLICT (outlet_id) DO UPDATE
+                            SET last_no = ticket_counters.last_no + CAST(:count AS BIGINT), updated_at = NOW()
+                        RETURNING last_no;
+                    """).bindparams(outlet_id=outlet_id, start_no=start_no, count=count)
+                )
+                return result.scalar_one()
+
+
+# outlets whose reserved number block a worker keeps; the least recently used one's block is dropped
+TICKET_NUMBER_BLOCK_OUTLETS = 4096
+
+
+class _NumberBlock:
+    # the lock guards exactly this block, so an evicted block is never shared with its replacement
+    __slots__ = ("lock", "next_no", "last_no")
+
+    def __init__(self):
+        self.lock = asyncio.Lock()
+        self.next_no, self.last_no = 1, 0
+
+
+class TicketNumberAllocator:
+    """
+    Per-process cache of reserved ticket number blocks in front of TicketCounterDao.
+    With a block size above 1 each worker draws from its own block, so bursts don't
+    serialize on the counter row; numbers stay unique but may interleave across workers
+    and a restart (or an evicted outlet) leaves the rest of a block unused.
+    """
+
+    _blocks: LRUCache = LRUCache(maxsize=TICKET_NUMBER_BLOCK_OUTLETS)  # outlet_id -> _NumberBlock
+
+    @classmethod
+    async def take(cls, outlet_id: int, start_no: int, count: int = 1) -> list[int]:
+        block_size = max(get_settings().app.ticket_number_block_size, 1)
+        block = cls._blocks.get(outlet_id)
+        if block is None:
+            block = cls._blocks[outlet_id] = _NumberBlock()
+
+        async with block.lock:
+            numbers: list[int] = []
+            next_no, last_no = block.next_no, block.last_no
+
+            while len(numbers) < count:
+                if next_no > last_no:
+                    size = max(block_size, count - len(numbers))
+                    last_no = await TicketCounterDao.allocate(outlet_id, start_no, size)
+                    next_no = last_no - size + 1
+
+                taken = min(count - len(numbers), last_no - next_no + 1)
+                numbers.extend(range(next_no, next_no + taken))
+                next_no += taken
+
+            block.next_no, block.last_no = next_no, last_no
+            return numbers
+
+    @staticmethod
+    def format_support_ticket_id(prefix: str, number: int) -> str:
+        return f"{prefix}{str(number).zfill(3)}"
+
+    @classmethod
+    async def next_support_ticket_id(cls, outlet_id: int, prefix: str, start_no: str | int) -> str:
+        number, = await cls.take(outlet_id, int(start_no))
+        return cls.format_support_ticket_id(prefix, number)
+
+
+# -------------------------------------------------------------- Assignment history ------------------------------------------------------------
+
+class TicketAssignmentEventsDao:
+    """
+    History pages are keyset-paginated on (ts, id), oldest first; a page costs the same
+    however long the history is, and never more than limit rows are held in memory.
+    """
+
+    @staticmethod
+    def _after_position(cursor: str) -> tuple[datetime, int]:
+        # cursors come back from clients; anything page_cursor would not have produced raises ValueError
+        position = decode_cursor(cursor)
+        ts, id_ = position.get("ts"), position.get("id")
+        if type(id_) is not int or not isinstance(ts, str):
+            raise ValueError("Invalid cursor")
+        return datetime.fromisoformat(ts), id_
+
+    @staticmethod
+    def page_cursor(event: TicketAssignmentEvent) -> str:
+        return encode_cursor({"ts": event.ts.isoformat(), "id": event.id})
+
+    @staticmethod
+    async def _get_page(query, limit: int, cursor: str | None) -> tuple[list[TicketAssignmentEvent], str | None]:
+        if cursor:
+            ts, id_ = TicketAssignmentEventsDao._after_position(cursor)
+            query = query.where(tuple_(TicketAssignmentEvent.ts, TicketAssignmentEvent.id) > tuple_(ts, id_))
+
+        # one extra row tells us whether another page exists
+        events = await fetch_all(query.order_by(TicketAssignmentEvent.ts, TicketAssignmentEvent.id).limit(limit + 1))
+        next_cursor = TicketAssignmentEventsDao.page_cursor(events[limit - 1]) if len(events) > limit else None
+        return list(events[:limit]), next_cursor
+
+    @staticmethod
+    async def get_page_by_ticket_id(ticket_id: int, outlet_id: int, limit: int, cursor: str | None = None) -> tuple[list[TicketAssignmentEvent], str | None]:
+        """Returns (events, next_cursor)."""
+        query = select(TicketAssignmentEvent).where(
+            TicketAssignmentEvent.ticket_id == ticket_id,
+            TicketAssignmentEvent.outlet_id == outlet_id,
+        )
+        return await TicketAssignmentEventsDao._get_page(query, limit, cursor)
+
+    @staticmethod
+    async def get_page_by_agent_id(agent_id: int, outlet_id: int, limit: int, cursor: str | None = None, since: Optional[datetime] = None) -> tuple[list[TicketAssignmentEvent], str | None]:
+        """Assignments to the agent. Returns (events, next_cursor)."""
+        query = select(TicketAssignmentEvent).where(
+            TicketAssignmentEvent.agent_id == agent_id,
+            TicketAssignmentEvent.outlet_id == outlet_id,
+        )
+        if since is not None:
+            query = query.where(TicketAssignmentEvent.ts >= since)
+        return await TicketAssignmentEventsDao._get_page(query, limit, cursor)
+
+
 # -------------------------------------------------------------- SupportSettings ------------------------------------------------------------
 
+# TTL + LRU cache of SupportSettings snapshots, keyed by ("outlet_id", x) and ("web_url", y).
+# Never the ORM instance: it belongs to the request's session, and a rollback there would
+# expire it for every later reader.
+SUPPORT_SETTINGS_CACHE: TTLCache = TTLCache(maxsize=2048, ttl=300)
+SUPPORT_SETTINGS_CHANNEL = "support_settings_invalidate"
+
+
+def _evict_support_settings(id: Optional[int] = None, outlet_id: Optional[int] = None, web_url: Optional[str] = None) -> None:
+    for key in list(SUPPORT_SETTINGS_CACHE.keys()):
+        cached = SUPPORT_SETTINGS_CACHE.get(key)
+        if key == ("outlet_id", outlet_id) or key == ("web_url", web_url) or (cached is not None and id is not None and cached.id == id):
+            SUPPORT_SETTINGS_CACHE.pop(key, None)
+
+
+def _on_support_settings_notify(payload: Optional[dict]) -> None:
+    # None means the listener reconnected and may have missed invalidations
+    if payload is None:
+        SUPPORT_SETTINGS_CACHE.clear()
+        return
+    _evict_support_settings(id=payload.get("id"), outlet_id=payload.get("outlet_id"), web_url=payload.get("web_url"))
+
+
+pg_listener.subscribe(SUPPORT_SETTINGS_CHANNEL, _on_support_settings_notify)
+
+
 class SupportSettingsDao:
 
     @staticmethod
     async def create(setting: SupportSettingsBase) -> int:
         setting = SupportSettings(**setting.dict())
-        return await create(setting)
+        id_ = await create(setting)
+        await SupportSettingsDao.invalidate_cache(id=id_, outlet_id=setting.outlet_id, web_url=setting.web_url)
+        return id_
     
     @staticmethod
-    async def get_by_outlet_id_or_web_url(outlet_id: Optional[int]=None, web_url: Optional[str]=None) -> Optional[SupportSettings]:
+    async def get_by_outlet_id_or_web_url(outlet_id: Optional[int]=None, web_url: Optional[str]=None) -> Optional[SupportSettingsSnapshot]:
+        """Cached; returns a snapshot, so treat .settings as read-only."""
+        cache_key = ("outlet_id", outlet_id) if outlet_id else ("web_url", web_url)
+        cached = SUPPORT_SETTINGS_CACHE.get(cache_key)
+        if cached is not None:
+            return cached
+
         if outlet_id:
             query = select(SupportSettings).where(SupportSettings.outlet_id == outlet_id)
         else:
             query = select(SupportSettings).where(SupportSettings.web_url == web_url)
-        return await fetch_one(query)
+        row = await fetch_one(query)
+        if row is None:
+            return None
+
+        setting = SupportSettingsSnapshot.model_validate(row)
+        SUPPORT_SETTINGS_CACHE[("outlet_id", setting.outlet_id)] = setting
+        if setting.web_url:
+            SUPPORT_SETTINGS_CACHE[("web_url", setting.web_url)] = setting
+        return setting
+
+    @staticmethod
+    async def invalidate_cache(id: Optional[int] = None, outlet_id: Optional[int] = None, web_url: Optional[str] = None) -> None:
+        """
+        Drop the entry here and tell the other workers to do the same.
+        """
+        _evict_support_settings(id=id, outlet_id=outlet_id, web_url=web_url)
+        await notify(SUPPORT_SETTINGS_CHANNEL, {"id": id, "outlet_id": outlet_id, "web_url": web_url})
 
     @staticmethod
     async def get_by_api_key(api_key: str) -> Optional[SupportSettings]:
@@ -324,12 +1120,10 @@ class SupportSettingsDao:
     
     @staticmethod
     async def get_outlet_by_web_url(web_url: str)-> int:
-        query = select(SupportSettings.outlet_id).where(SupportSettings.web_url == web_url)
-        
-        outlet_id = await fetch_one(query)
-        if not outlet_id:
+        setting = await SupportSettingsDao.get_by_outlet_id_or_web_url(web_url=web_url)
+        if not setting or not setting.outlet_id:
             raise ValueError(f"No outlet found for web_url: {web_url}")
-        return outlet_id
+        return setting.outlet_id
     
     @staticmethod
     async def filters(**filters) -> List[SupportSettings]:
@@ -341,11 +1135,14 @@ class SupportSettingsDao:
     @staticmethod
     async def update(setting: SupportSettingsUpdateIn) -> int:
         setting = SupportSettings(**setting.dict())
-        return await update(setting)
+        id_ = await update(setting)
+        await SupportSettingsDao.invalidate_cache(id=setting.id, outlet_id=setting.outlet_id, web_url=setting.web_url)
+        return id_
     
     @staticmethod
     async def delete(id: int):
         await delete_by_id(SupportSettings, id=id)
+        await SupportSettingsDao.invalidate_cache(id=id)
 
     @staticmethod
     async def get_outlet_by_api_key(api_key: str):
@@ -378,7 +1175,9 @@ class AgentsDao:
     @staticmethod
     async def create(agent: AgentBase) -> int:
         agent_obj = Agent(**agent.dict())
-        return await create(agent_obj)
+        id_ = await create(agent_obj)
+        await invalidate_outlet(agent_obj.outlet_id)
+        return id_
     
     @staticmethod
     async def get_by_id(id: int) -> Optional[Agent]:
@@ -458,22 +1257,17 @@ class AgentsDao:
                 func.count().filter(Agent.status == "active").label("total_active_agents"),
             ).where(Agent.outlet_id == outlet_id)
         )
-        total_active_tickets_query = (
-            select(
-                func.count().label("total_active_tickets")
-                ).where(Ticket.outlet_id == outlet_id, Ticket.status != "closed")
-            )
         
         agent_row = await execute_query(agent_count_query)
         agent_result = agent_row.one()
         
-        total_active_tickets_row = await execute_query(total_active_tickets_query)
-        total_active_tickets_result = total_active_tickets_row.one()
+        # active = everything not closed, read from the ticket_stats rollup
+        ticket_stats = await TicketStatsDao.get_by_outlet_id(outlet_id)
         
         return {
             "total_agents": agent_result.total_agents,
             "total_active_agents": agent_result.total_active_agents,
-            "total_active_tickets": total_active_tickets_result.total_active_tickets,
+            "total_active_tickets": ticket_stats["total_tickets_count"] - ticket_stats["closed_tickets_count"],
             }
     
     @staticmethod
@@ -500,8 +1294,12 @@ class AgentsDao:
                 value = value.value
             setattr(existing_agent, key, value)
         
-        return await update(existing_agent)  # existing_agent is an Agent object, not a dict
+        id_ = await update(existing_agent)  # existing_agent is an Agent object, not a dict
+        await invalidate_outlet(existing_agent.outlet_id)
+        return id_
     
     @staticmethod
     async def delete(id: int):
-        await delete_by_id(Agent, id=id)
+        query = sa_delete(Agent).where(Agent.id == id).returning(Agent.outlet_id)
+        result = await execute_query(query)
+        await invalidate_outlet(result.scalar_one_or_none())
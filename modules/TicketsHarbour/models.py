@@ -1,18 +1,31 @@
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 from sqlalchemy.dialects.postgresql import JSONB
-from sqlalchemy import String, Integer, DateTime, Boolean, func, text, Enum as SAEnum, Text, ForeignKey, UniqueConstraint, Index
+from sqlalchemy import String, Integer, BigInteger, DateTime, Boolean, func, text, Enum as SAEnum, Text, ForeignKey, UniqueConstraint, Index, Identity, literal_column
 from typing import Optional, Any
 from app.database import Base
 from sqlalchemy.dialects.postgresql import JSONB, ARRAY
 from datetime import datetime
 
+# Lower-cased haystack for ticket search. Not a column: ix_tickets_outlet_search_text_trgm indexes the
+# expression itself (see migration 3dfcbcd0f50c), and queries must spell it exactly like this to use it
+TICKET_SEARCH_FIELDS = """
+        coalesce(support_ticket_id, '') || ' ' ||
+        coalesce(customer_details ->> 'customer_first_name', '') || ' ' ||
+        coalesce(customer_details ->> 'customer_last_name', '') || ' ' ||
+        coalesce(customer_details ->> 'customer_email', '') || ' ' ||
+        coalesce(subject, '') || ' ' ||
+        coalesce(description, '')
+"""
+TICKET_SEARCH_TEXT_EXPRESSION = f"lower({TICKET_SEARCH_FIELDS})"
+TICKET_SEARCH_TEXT = func.lower(literal_column(TICKET_SEARCH_FIELDS), type_=Text)
+
 class Ticket(Base):
     __tablename__ = "tickets"
 
     # Identity & tenancy
     id: Mapped[int]                = mapped_column(primary_key=True)
     support_ticket_id: Mapped[str] = mapped_column(String(50), index=True)
-    outlet_id: Mapped[int]         = mapped_column(Integer, nullable=False, index=True)
+    outlet_id: Mapped[int]         = mapped_column(Integer, nullable=False) # leading column of the composite indexes below
     api_key: Mapped[Optional[str]] = mapped_column(String(255), nullable=True)
 
     # Content data
@@ -45,7 +58,7 @@ class Ticket(Base):
     # Assignment & status
     status: Mapped[str]                                             = mapped_column(String(20), default="pending", server_default=text("'pending'"), nullable=False)
     assigned_agent_id: Mapped[int]                                  = mapped_column(Integer, ForeignKey("agents.id", ondelete="SET NULL"), nullable=True, index=True)
-    previous_assigned_agent_id: Mapped[list[dict[str, Any]] | None] = mapped_column(JSONB, nullable=False, server_default=text("'[]'::jsonb")) # id, re-assigned timestamps
+    previous_assigned_agent_id: Mapped[list[dict[str, Any]] | None] = mapped_column(JSONB, nullable=False, server_default=text("'[]'::jsonb")) # legacy, frozen and not exposed by the API; see TicketAssignmentEvent
     is_trash: Mapped[bool]                                          = mapped_column(Boolean, default=False, server_default=text("false"), nullable=False)
 
     # Ratings
@@ -57,6 +70,15 @@ class Ticket(Base):
     updated_at: Mapped[datetime]          = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
     closed_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True, index=True)
 
+    # SLA deadlines, stamped from SupportSettings.settings["sla"] on insert by a database trigger (see migration 600eebf68673)
+    first_response_due_at: Mapped[Optional[datetime]]     = mapped_column(DateTime(timezone=True), nullable=True)
+    resolution_due_at: Mapped[Optional[datetime]]         = mapped_column(DateTime(timezone=True), nullable=True)
+    first_response_breached_at: Mapped[Optional[datetime]] = mapped_column(DateTime(timezone=True), nullable=True)
+    resolution_breached_at: Mapped[Optional[datetime]]    = mapped_column(DateTime(timezone=True), nullable=True)
+    sla_escalation_level: Mapped[int]                     = mapped_column(Integer, default=0, server_default=text("0"), nullable=False)
+    # earliest deadline still unmet and unbreached; NULL once there is nothing left to enforce (trigger maintained)
+    sla_due_at: Mapped[Optional[datetime]]                = mapped_column(DateTime(timezone=True), nullable=True)
+
     # Relationships
     assigned_agent: Mapped["Agent"] = relationship( "Agent", back_populates="tickets", foreign_keys=[assigned_agent_id])
     outlet: Mapped["SupportSettings"] = relationship("SupportSettings", back_populates="tickets", primaryjoin="foreign(Ticket.outlet_id)==SupportSettings.outlet_id", viewonly=True,)
@@ -64,6 +86,73 @@ class Ticket(Base):
     outlet_category: Mapped["OutletCategory"] = relationship("OutletCategory", foreign_keys=[outlet_category_id],)
     outlet_sub_category: Mapped["OutletSubCategory"] = relationship("OutletSubCategory", foreign_keys=[outlet_sub_category_id],)
 
+    __table_args__ = (
+        Index("ix_tickets_outlet_search_text_trgm", "outlet_id", text(f"({TICKET_SEARCH_TEXT_EXPRESSION}) gin_trgm_ops"), postgresql_using="gin"),
+        # list/keyset queries: outlet first, then the filter, then the default sort (see migration 33f58bc5de94)
+        Index("ix_tickets_outlet_created_at_id", "outlet_id", text("created_at DESC"), text("id DESC")),
+        Index("ix_tickets_outlet_status_created_at", "outlet_id", "status", text("created_at DESC"), text("id DESC")),
+        Index("ix_tickets_outlet_priority_created_at", "outlet_id", "priority", text("created_at DESC"), text("id DESC")),
+        Index("ix_tickets_outlet_department_created_at", "outlet_id", "department", text("created_at DESC"), text("id DESC")),
+        # open-ticket load per agent; queries must spell status <> 'closed' as a literal to match it
+        Index("ix_tickets_open_assigned_agent_id", "assigned_agent_id", postgresql_where=text("status <> 'closed'")),
+        # SLA scanner queue: only tickets with a pending deadline are indexed
+        Index("ix_tickets_sla_due_at", "sla_due_at", postgresql_where=text("sla_due_at IS NOT NULL")),
+    )
+
+
+class TicketAssignmentEvent(Base):
+    __tablename__ = "ticket_assignment_events"
+
+    # Append-only reassignment history (replaces appending to tickets.previous_assigned_agent_id)
+    id: Mapped[int]                          = mapped_column(BigInteger, primary_key=True)
+    ticket_id: Mapped[int]                   = mapped_column(Integer, ForeignKey("tickets.id", ondelete="CASCADE"), nullable=False)
+    outlet_id: Mapped[int]                   = mapped_column(Integer, nullable=False)
+    previous_agent_id: Mapped[Optional[int]] = mapped_column(Integer, nullable=True)
+    agent_id: Mapped[Optional[int]]          = mapped_column(Integer, nullable=True) # assignee after the change
+    ts: Mapped[datetime]                     = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
+    __table_args__ = (
+        Index("ix_ticket_assignment_events_ticket_id_ts", "ticket_id", "ts"),
+        Index("ix_ticket_assignment_events_agent_id_ts", "agent_id", "ts"),
+    )
+
+
+class TicketCounter(Base):
+    __tablename__ = "ticket_counters"
+
+    # One row per outlet; last_no is the last ticket number handed out
+    outlet_id: Mapped[int]       = mapped_column(Integer, primary_key=True, autoincrement=False)
+    last_no: Mapped[int]         = mapped_column(BigInteger, nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+
+class TicketStats(Base):
+    __tablename__ = "ticket_stats"
+
+    # Per-outlet status rollup, fed by statement triggers on tickets through ticket_stats_deltas (see migrations 263e338a4b4b, 2fa0e7e63bd6)
+    outlet_id: Mapped[int]      = mapped_column(Integer, primary_key=True, autoincrement=False)
+    total_count: Mapped[int]    = mapped_column(BigInteger, server_default=text("0"), nullable=False)
+    open_count: Mapped[int]     = mapped_column(BigInteger, server_default=text("0"), nullable=False)
+    pending_count: Mapped[int]  = mapped_column(BigInteger, server_default=text("0"), nullable=False)
+    closed_count: Mapped[int]   = mapped_column(BigInteger, server_default=text("0"), nullable=False)
+    assigned_count: Mapped[int] = mapped_column(BigInteger, server_default=text("0"), nullable=False)
+    updated_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now(), nullable=False)
+
+
+class TicketStatsDelta(Base):
+    __tablename__ = "ticket_stats_deltas"
+
+    # Per-statement changes to a TicketStats row, appended by the ticket triggers and folded
+    # into ticket_stats by TicketStatsDao.fold_deltas (see migration 2fa0e7e63bd6)
+    id: Mapped[int]             = mapped_column(BigInteger, Identity(), primary_key=True)
+    outlet_id: Mapped[int]      = mapped_column(Integer, index=True, nullable=False)
+    total_count: Mapped[int]    = mapped_column(BigInteger, nullable=False)
+    open_count: Mapped[int]     = mapped_column(BigInteger, nullable=False)
+    pending_count: Mapped[int]  = mapped_column(BigInteger, nullable=False)
+    closed_count: Mapped[int]   = mapped_column(BigInteger, nullable=False)
+    assigned_count: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    created_at: Mapped[datetime] = mapped_column(DateTime(timezone=True), server_default=func.now(), nullable=False)
+
 
 class SupportSettings(Base):
     __tablename__ = "support_settings"
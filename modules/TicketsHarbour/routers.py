@@ -2,10 +2,12 @@ from fastapi import APIRouter, Depends, Request
 from app.utility import ApiResponse
 from app.project_schemas import APIResponse
 from app.auth import verify_jwt_token
+from app.database import get_unit_of_work
 
 from .controller import *
 
-router = APIRouter()
+# every request on this router shares one session/transaction across its DAO calls
+router = APIRouter(dependencies=[Depends(get_unit_of_work)])
 
 
 # ========================== AUTHENTICATED TICKET ROUTES ==========================
@@ -22,6 +24,30 @@ async def get_tickets_authenticated(request: Request, auth_data=Depends(verify_j
     return await auth_tickets_controller(request, outlet_id=outlet_id)
 
 
+@router.api_route("/handler/bulk", methods=["POST"], response_model=APIResponse[dict], response_class=ApiResponse)
+async def bulk_import_tickets_authenticated(request: Request, auth_data=Depends(verify_jwt_token)):
+    outlet_id = auth_data.get("outlet_id")
+    return await auth_tickets_bulk_controller(request, outlet_id=outlet_id)
+
+
+@router.api_route("/handler/attachments/presign", methods=["POST"], response_model=APIResponse[dict], response_class=ApiResponse)
+async def presign_ticket_attachment_authenticated(request: Request, auth_data=Depends(verify_jwt_token)):
+    outlet_id = auth_data.get("outlet_id")
+    return await auth_ticket_attachments_controller(request, "presign", outlet_id=outlet_id)
+
+
+@router.api_route("/handler/attachments/complete", methods=["POST"], response_model=APIResponse[dict], response_class=ApiResponse)
+async def complete_ticket_attachment_authenticated(request: Request, auth_data=Depends(verify_jwt_token)):
+    outlet_id = auth_data.get("outlet_id")
+    return await auth_ticket_attachments_controller(request, "complete", outlet_id=outlet_id)
+
+
+@router.api_route("/handler/history", methods=["GET"], response_model=APIResponse[dict], response_class=ApiResponse)
+async def get_ticket_assignment_history_authenticated(request: Request, auth_data=Depends(verify_jwt_token)):
+    outlet_id = auth_data.get("outlet_id")
+    return await auth_tickets_history_controller(request, outlet_id=outlet_id)
+
+
 @router.api_route("/handler/stats", methods=["GET"], response_model=APIResponse[dict], response_class=ApiResponse)
 async def get_tickets_authenticated(request: Request, auth_data=Depends(verify_jwt_token)):
     outlet_id = auth_data.get("outlet_id")
@@ -1,6 +1,6 @@
-from typing import Optional, Dict, Any, List,Union
+from typing import Optional, Dict, Any, List,Union, Literal
 from datetime import datetime
-from pydantic import BaseModel, Field, model_validator
+from pydantic import BaseModel, Field, field_validator, model_validator
 from enum import Enum
 
 # ================================================ Tickets ====================================================================
@@ -100,7 +100,6 @@ class TicketBase(BaseModel):
     
     status: TicketStatusEnum = TicketStatusEnum.PENDING
     assigned_agent_id: Optional[int] = None
-    previous_assigned_agent_id: List[Dict[str, Any]]
     
     source: Optional[SourceInfo] = None 
 
@@ -117,6 +116,33 @@ class TicketRead(TicketBase):
     created_at: datetime
     updated_at: datetime
     is_trash: bool
+    first_response_due_at: Optional[datetime] = None
+    resolution_due_at: Optional[datetime] = None
+    first_response_breached_at: Optional[datetime] = None
+    resolution_breached_at: Optional[datetime] = None
+
+class TicketAssignmentEventRead(BaseModel):
+    id: int
+    ticket_id: int
+    outlet_id: int
+    previous_agent_id: Optional[int] = None
+    agent_id: Optional[int] = None
+    ts: datetime
+
+    model_config = {"from_attributes": True}
+
+class TicketAssignmentHistoryQuery(BaseModel):
+    id: Optional[int]          = Field(default=None, gt=0) # a ticket's history ...
+    agent_id: Optional[int]    = Field(default=None, gt=0) # ... or an agent's assignments
+    since: Optional[datetime]  = None                      # agent history only
+    limit: int                 = Field(default=100, ge=1, le=500)
+    cursor: Optional[str]      = None                      # next_cursor of the previous page
+
+    @field_validator("*", mode="before")
+    @classmethod
+    def blank_is_missing(cls, value):
+        # query strings send "?id=&agent_id=7"
+        return None if value == "" else value
 
 class TicketRatingIn(BaseModel):
     id: int
@@ -124,14 +150,42 @@ class TicketRatingIn(BaseModel):
     
     model_config = {"from_attributes": True}
 
+class TicketAttachmentPresignIn(BaseModel):
+    filename: str                = Field(default="", max_length=255)
+    content_type: str            = Field(default="", max_length=255) # allowed types are checked by the service (415)
+    size: Optional[int]          = Field(default=None, ge=0)         # bytes; checked against the upload limit (413)
+    method: Literal["post", "put"] = "post"
+
+    @field_validator("content_type", mode="before")
+    @classmethod
+    def normalize_content_type(cls, value):
+        # "Image/PNG; charset=binary" -> "image/png"
+        return value.split(";")[0].strip().lower() if isinstance(value, str) else value
+
+    @field_validator("method", mode="before")
+    @classmethod
+    def normalize_method(cls, value):
+        return value.lower() if isinstance(value, str) else value
+
+
+class TicketAttachmentCompleteIn(BaseModel):
+    id: int  = Field(..., gt=0)
+    key: str = Field(..., min_length=1, max_length=1024) # must sit under the outlet's prefix; checked by the service (403)
 
 # ================================================ SupportSettings ====================================================================
 
+class SLASettings(BaseModel):
+    # minutes from ticket creation; None disables that SLA
+    first_response_minutes: Optional[int] = Field(default=None, gt=0) # met once the ticket leaves open/pending
+    resolution_minutes: Optional[int]     = Field(default=None, gt=0) # met once the ticket is closed
+
 class SettingJSON(BaseModel):
     prefix: Optional[str]       = Field(default="TKT")
     start_no: Optional[str]     = Field(default="001")
     auto_assign: Optional[bool] = Field(default=True)
+    assignment_strategy: Optional[str] = Field(default="least_loaded") # least_loaded | round_robin | skill_match
     email_required: bool        = Field(default=True)
+    sla: Optional[SLASettings]  = Field(default=None)
 
 class SupportSettingsBase(BaseModel):
     outlet_id: int
@@ -146,6 +200,15 @@ class SupportSettingsRead(SupportSettingsBase):
 class SupportSettingsUpdateIn(SupportSettingsBase):
     id: int
 
+class SupportSettingsSnapshot(BaseModel):
+    # detached, immutable copy of a support_settings row; what the settings cache hands out
+    id: int
+    outlet_id: int
+    web_url: Optional[str] = None
+    settings: Optional[dict] = None
+
+    model_config = {"from_attributes": True, "frozen": True}
+
 
 # ================================================ Issue, Category, Sub-category ====================================================================
 
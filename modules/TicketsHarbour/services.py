@@ -1,6 +1,18 @@
 from .schemas import *
 from .dao import *
 from math import ceil
+from datetime import timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from pydantic import ValidationError
+from sqlalchemy.exc import SQLAlchemyError
+from app.uploads import ATTACHMENT_ALLOWED_TYPES, attachment_key, presign_upload, head_object, delete_object
+from app.tasks import enqueue_ticket_created, enqueue_ticket_updated
+
+# rows validated and inserted per batch by the bulk import
+BULK_IMPORT_CHUNK_SIZE = 500
+
+# every attachment object of an outlet lives under this prefix
+TICKET_ATTACHMENT_PREFIX = "ticket_attachments/{outlet_id}"
 
 class AuthTicketService:
     
@@ -32,22 +44,98 @@ class AuthTicketService:
             if raised_by != TicketRaisedByEnum.AGENT.value and raised_by != TicketRaisedByEnum.CUSTOMER.value:
                 return {"error": "Ticket raiser should be valid entity - customer or agent."}, 400
 
-        last_ticket = await TicketsDao.get_last_ticket(outlet_id=outlet_id)
-        if last_ticket:
-            current_no = ''.join(ch for ch in last_ticket if ch.isdigit())
-            next_no = int(current_no) + 1
-        else:
-            next_no = int(start_no)
+        taxonomy = await OutletTaxonomyDao.resolve_one(outlet_id, (data.get("issue_slug"), data.get("category_slug"), data.get("sub_category_slug")))
+        if taxonomy is None:
+            return {"error": "Unknown issue, category or sub-category for this outlet"}, 400
 
-        padded_no = str(next_no).zfill(3)
-        support_ticket_id = f"{ticket_prefix}{padded_no}"
+        # validated before a ticket number is taken, so a bad payload doesn't burn one
+        try:
+            ticket_model = TicketBase.model_validate({**data, "support_ticket_id": ""})
+        except ValidationError as e:
+            return {"error": "Invalid ticket", "errors": e.errors(include_url=False, include_context=False, include_input=False)}, 400
 
-        data.update({"support_ticket_id": support_ticket_id})
+        support_ticket_id = await TicketNumberAllocator.next_support_ticket_id(outlet_id=outlet_id, prefix=ticket_prefix, start_no=start_no)
+        ticket_model = ticket_model.model_copy(update={"support_ticket_id": support_ticket_id})
 
-        ticket_model = TicketBase(**data)
-        id_ = await TicketsDao.create(ticket_model)
+        id_ = await TicketsDao.create(ticket_model, taxonomy)
+        await enqueue_ticket_created(id_, outlet_id, ticket_model.assigned_agent_id)
         return {"id": id_}, 200
 
+    @staticmethod
+    async def bulk_import(*, outlet_id: int, records):
+        """
+        records: async iterator of (row_no, dict | error) from the JSONL/CSV parsers.
+        Every chunk commits on its own, so rows before a failing chunk stay imported.
+        """
+        support_settings_for_outlet = await SupportSettingsDao.get_by_outlet_id_or_web_url(outlet_id=outlet_id)
+        if not support_settings_for_outlet:
+            return {"error": "SupportSettings not found for Outlet"}, 404
+
+        settings = support_settings_for_outlet.settings
+        total_rows, inserted, errors = 0, 0, []
+        chunk = []
+        # slug combination -> resolved ids/snapshots (None when unknown), looked up once per import
+        taxonomies: dict[tuple, Optional[dict]] = {}
+
+        async for row_no, record in records:
+            total_rows += 1
+            chunk.append((row_no, record))
+            if len(chunk) >= BULK_IMPORT_CHUNK_SIZE:
+                inserted += await AuthTicketService._import_chunk(outlet_id, settings, chunk, errors, taxonomies)
+                chunk = []
+
+        if chunk:
+            inserted += await AuthTicketService._import_chunk(outlet_id, settings, chunk, errors, taxonomies)
+
+        print(f"[SERVICE] Bulk import for outlet {outlet_id}: {inserted}/{total_rows} tickets inserted")
+        return {"total_rows": total_rows, "inserted": inserted, "failed": len(errors), "errors": errors}, 200
+
+    @staticmethod
+    async def _import_chunk(outlet_id: int, settings: dict, chunk: list, errors: list, taxonomies: dict) -> int:
+        valid_rows, tickets = [], []
+        for row_no, record in chunk:
+            if not isinstance(record, dict):
+                errors.append({"row": row_no, "errors": [{"msg": record}]})
+                continue
+
+            # numbered after validation, so rejected rows don't use up ticket numbers
+            record.update({"outlet_id": outlet_id, "support_ticket_id": ""})
+            try:
+                tickets.append(TicketBase.model_validate(record))
+                valid_rows.append(row_no)
+            except ValidationError as e:
+                errors.append({"row": row_no, "errors": e.errors(include_url=False, include_context=False, include_input=False)})
+
+        unseen = {ticket_taxonomy_key(ticket) for ticket in tickets} - taxonomies.keys()
+        if unseen:
+            resolved = await OutletTaxonomyDao.resolve(outlet_id, unseen)
+            taxonomies.update({key: resolved.get(key) for key in unseen})
+
+        known_rows, known_tickets = [], []
+        for row_no, ticket in zip(valid_rows, tickets):
+            if taxonomies[ticket_taxonomy_key(ticket)] is None:
+                errors.append({"row": row_no, "errors": [{"msg": "Unknown issue, category or sub-category for this outlet"}]})
+            else:
+                known_rows.append(row_no)
+                known_tickets.append(ticket)
+        valid_rows, tickets = known_rows, known_tickets
+
+        if not tickets:
+            return 0
+
+        numbers = await TicketNumberAllocator.take(outlet_id, int(settings["start_no"]), count=len(tickets))
+        for ticket, number in zip(tickets, numbers):
+            ticket.support_ticket_id = TicketNumberAllocator.format_support_ticket_id(settings["prefix"], number)
+
+        try:
+            ids = await TicketsDao.bulk_create(tickets, taxonomies)
+        except SQLAlchemyError as e:
+            print(f"[SERVICE] Bulk import chunk failed for outlet {outlet_id}: {e}")
+            errors.extend({"row": row_no, "errors": [{"msg": "Database rejected this batch"}]} for row_no in valid_rows)
+            return 0
+
+        return len(ids)
+
     @staticmethod
     async def get_by_support_ticket_id(support_ticket_id: str):
         ticket = await TicketsDao.get_by_support_ticket_id(support_ticket_id)
@@ -115,23 +203,49 @@ class AuthTicketService:
         assigned_agent_id = data.get("assigned_agent_id")
         outlet_id = data.get('outlet_id')
 
-        if assigned_agent_id is not None:
-            agent = await AgentsDao.get_by_id(assigned_agent_id)
-            if not agent:
+        ticket_update = TicketUpdateIn(id = ticket_id, outlet_id=outlet_id, status=status, assigned_agent_id=assigned_agent_id)
+        # print("Ticket Update Payload: ", ticket_update)
+
+        # the agent checks run inside the UPDATE; nothing is written when one fails
+        updated = await TicketsDao.update_status_and_agent(ticket_update)
+
+        if assigned_agent_id is not None and updated["id"] is None:
+            if updated["agent_outlet_id"] is None:
                 return {"error": "Assigned agent not found"}, 400
 
-            if agent.outlet_id != outlet_id:
+            if updated["agent_outlet_id"] != outlet_id:
                 return {"error": "Agent does not belong to this outlet"}, 403
 
-            if agent.status != "active":
+            if updated["agent_status"] != "active":
                 return {"error": "Agent is not active"}, 400
 
-        ticket_update = TicketUpdateIn(id = ticket_id, outlet_id=outlet_id, status=status, assigned_agent_id=assigned_agent_id)
-        # print("Ticket Update Payload: ", ticket_update)
-        
-        updated_id = await TicketsDao.update_status_and_agent(ticket_update)
+        await enqueue_ticket_updated(updated, outlet_id)
+        return {"id": updated["id"]}, 200
 
-        return {"id": updated_id}, 200
+    @staticmethod
+    async def get_assignment_history(**data):
+        try:
+            query = TicketAssignmentHistoryQuery.model_validate({
+                field: data[field] for field in TicketAssignmentHistoryQuery.model_fields if data.get(field) is not None
+            })
+        except ValidationError as e:
+            fields = ", ".join(sorted({str(error["loc"][0]) for error in e.errors() if error["loc"]}))
+            return {"error": f"Invalid {fields or 'history request'}"}, 400
+
+        outlet_id = data.get("outlet_id")
+        try:
+            if query.id is not None:
+                events, next_cursor = await TicketAssignmentEventsDao.get_page_by_ticket_id(query.id, outlet_id, query.limit, query.cursor)
+            elif query.agent_id is not None:
+                events, next_cursor = await TicketAssignmentEventsDao.get_page_by_agent_id(query.agent_id, outlet_id, query.limit, query.cursor, since=query.since)
+            else:
+                return {"error": "id or agent_id is required"}, 400
+        except ValueError as e:
+            # malformed or tampered cursor
+            return {"error": str(e)}, 400
+
+        history = [TicketAssignmentEventRead.model_validate(event).model_dump() for event in events]
+        return {"history": history, "limit": query.limit, "has_next": next_cursor is not None, "next_cursor": next_cursor}, 200
 
     @staticmethod
     async def rate_ticket(**data):
@@ -180,21 +294,47 @@ class AuthTicketService:
 
         filters = {k: v for k, v in filters.items() if v is not None}
 
+        # exact | estimated (planner estimate) | none (only has_next)
+        count_mode = data.get("count_mode") or "exact"
+        if count_mode not in TICKET_COUNT_MODES:
+            return {"error": f"count_mode must be one of {', '.join(TICKET_COUNT_MODES)}"}, 400
+
+        # Keyset mode: opaque cursors instead of page numbers
+        cursor = data.get("cursor")
+        if cursor or data.get("pagination") == "cursor":
+            return await AuthTicketService._get_cursor_paginated_tickets(
+                outlet_id=outlet_id,
+                page_size=max(page_size, 1),
+                cursor=cursor,
+                search=search,
+                filters=filters,
+                sort_by=sort_by,
+                sort_order=sort_order,
+                count_mode=count_mode,
+            )
+
+        # without an exact total, one extra row answers has_next
+        exact_count = count_mode == "exact"
+        fetch_limit = limit + 1 if not exact_count and limit != 0 else limit
+
         tickets, total_ticket_count = await TicketsDao.get_paginated_tickets(
             outlet_id=outlet_id,
-            limit=limit,
+            limit=fetch_limit,
             offset=offset,
             search=search,
             filters=filters,
             sort_by=sort_by,
             sort_order=sort_order,
+            count_mode=count_mode,
         )
 
-        tickets = [TicketRead.from_orm(t).model_dump() for t in tickets]
-
         if (page_size != 0):
-            total_pages = ceil(total_ticket_count[0] / page_size)
-            has_next = page < total_pages
+            total_pages = ceil(total_ticket_count / page_size) if total_ticket_count is not None else None
+            if exact_count:
+                has_next = page < total_pages
+            else:
+                has_next = len(tickets) > page_size
+                tickets = tickets[:page_size]
             has_previous = page > 1
             page_start = offset + 1
         else:
@@ -203,20 +343,64 @@ class AuthTicketService:
             has_previous = False
             page_start = 1
         
-        page_end = min(offset + page_size, total_ticket_count[0])
+        if exact_count:
+            page_end = min(offset + page_size, total_ticket_count)
+        else:
+            page_end = offset + len(tickets)
+
+        # cursors let the client switch to keyset mode from any offset page (relevance has no stable key)
+        keyset_sortable = sort_by != "relevance"
+        next_cursor = TicketsDao.page_cursor(tickets[-1], sort_by, sort_order, "next") if keyset_sortable and tickets and has_next else None
+        prev_cursor = TicketsDao.page_cursor(tickets[0], sort_by, sort_order, "prev") if keyset_sortable and tickets and has_previous else None
+
+        tickets = ticket_rows_to_dicts(tickets)
 
         return {"tickets": tickets, 
                 "page": page, 
                 "page_size": page_size, 
                 "page_content_size": len(tickets), 
-                "total_tickets": total_ticket_count[0],
+                "total_tickets": total_ticket_count,
+                "total_tickets_is_estimate": count_mode == "estimated",
                 "total_pages": total_pages,
                 "page_start": page_start,
                 "page_end": page_end,
                 "has_next": has_next,
                 "has_previous": has_previous,
+                "next_cursor": next_cursor,
+                "prev_cursor": prev_cursor,
                 }, 200 
 
+    @staticmethod
+    async def _get_cursor_paginated_tickets(*, outlet_id, page_size, cursor, search, filters, sort_by, sort_order, count_mode):
+        try:
+            tickets, total_ticket_count, next_cursor, prev_cursor = await TicketsDao.get_cursor_paginated_tickets(
+                outlet_id=outlet_id,
+                limit=page_size,
+                cursor=cursor,
+                search=search,
+                filters=filters,
+                sort_by=sort_by,
+                sort_order=sort_order,
+                count_mode=count_mode,
+            )
+        except ValueError as e:
+            # malformed, tampered or stale cursor
+            return {"error": str(e)}, 400
+
+        tickets = ticket_rows_to_dicts(tickets)
+
+        return {"tickets": tickets,
+                "page_size": page_size,
+                "page_content_size": len(tickets),
+                "total_tickets": total_ticket_count,
+                "total_tickets_is_estimate": count_mode == "estimated",
+                "total_pages": ceil(total_ticket_count / page_size) if total_ticket_count is not None else None,
+                "has_next": next_cursor is not None,
+                "has_previous": prev_cursor is not None,
+                "next_cursor": next_cursor,
+                "prev_cursor": prev_cursor,
+                }, 200
+
     @staticmethod
     async def get_ticket_stats(**data):
         
@@ -230,6 +414,62 @@ class AuthTicketService:
         return {"ticket_stats": ticket_stats}, 200
 
 
+class TicketAttachmentService:
+
+    @staticmethod
+    async def presign(**data):
+        outlet_id = data.get("outlet_id")
+        max_bytes = get_settings().aws.attachment_max_bytes
+
+        try:
+            upload_request = TicketAttachmentPresignIn.model_validate({key: value for key, value in data.items() if value is not None})
+        except ValidationError as e:
+            return {"error": "Invalid upload request", "errors": e.errors(include_url=False, include_context=False, include_input=False)}, 400
+
+        if upload_request.content_type not in ATTACHMENT_ALLOWED_TYPES:
+            return {"error": f"File type {upload_request.content_type or 'unknown'} is not allowed"}, 415
+        if upload_request.size is not None and upload_request.size > max_bytes:
+            return {"error": f"File exceeds {max_bytes} bytes"}, 413
+
+        key = attachment_key(TICKET_ATTACHMENT_PREFIX.format(outlet_id=outlet_id), upload_request.filename)
+        upload = await presign_upload(key=key, content_type=upload_request.content_type, max_file_size=max_bytes, method=upload_request.method)
+        return {"upload": upload}, 200
+
+    @staticmethod
+    async def complete(**data):
+        """Called once the client's direct upload finished; checks the object and links it to the ticket."""
+        outlet_id = data.get("outlet_id")
+
+        if not data.get("id") or not data.get("key"):
+            return {"error": "id and key are required"}, 400
+        try:
+            completed = TicketAttachmentCompleteIn.model_validate({"id": data["id"], "key": data["key"]})
+        except ValidationError as e:
+            return {"error": "Invalid attachment request", "errors": e.errors(include_url=False, include_context=False, include_input=False)}, 400
+
+        key = completed.key
+        if not key.startswith(TICKET_ATTACHMENT_PREFIX.format(outlet_id=outlet_id) + "/"):
+            return {"error": "Attachment does not belong to this outlet"}, 403
+
+        stat = await head_object(key)
+        if stat is None:
+            return {"error": "Attachment has not been uploaded"}, 404
+
+        max_bytes = get_settings().aws.attachment_max_bytes
+        content_type = (stat.get("ContentType") or "").split(";")[0].strip().lower()
+        if stat.get("ContentLength", 0) > max_bytes or content_type not in ATTACHMENT_ALLOWED_TYPES:
+            # a presigned PUT can't enforce these up front
+            await delete_object(key)
+            return {"error": "Attachment is too large or of a type that is not allowed"}, 400
+
+        attachment = get_settings().aws.object_url(key)
+        updated_id = await TicketsDao.set_attachment(completed.id, outlet_id, attachment)
+        if updated_id is None:
+            return {"error": "Ticket not found"}, 404
+
+        return {"id": updated_id, "attachment": attachment}, 200
+
+
 class TicketService:
 
     @staticmethod
@@ -248,7 +488,6 @@ class TicketService:
             return {"error": "department field is required"}, 400
 
         outlet_id = data["outlet_id"]
-        support_settings_for_outlet = await SupportSettingsDao.get_by_outlet_id_or_web_url(outlet_id=outlet_id)
         settings = support_settings_for_outlet.settings
 
         ticket_prefix = settings["prefix"]
@@ -259,39 +498,37 @@ class TicketService:
         if email_required and email is None:
             return {"error": "kindly provide email to generate Ticket."}, 400
 
-        # ---- Generate ticket number ----
-        last_ticket = await TicketsDao.get_last_ticket(outlet_id=outlet_id)
-        if last_ticket:
-            current_no = ''.join(ch for ch in last_ticket if ch.isdigit())
-            next_no = int(current_no) + 1
-        else:
-            next_no = int(start_no)
-
-        padded_no = str(next_no).zfill(3)
-        support_ticket_id = f"{ticket_prefix}{padded_no}"
+        taxonomy = await OutletTaxonomyDao.resolve_one(outlet_id, (data.get("issue_slug"), data.get("category_slug"), data.get("sub_category_slug")))
+        if taxonomy is None:
+            return {"error": "Unknown issue, category or sub-category for this outlet"}, 400
 
-        data["support_ticket_id"] = support_ticket_id
+        # validated before a ticket number is taken, so a bad payload doesn't burn one
+        try:
+            ticket_model = TicketBase.model_validate({**data, "support_ticket_id": ""})
+        except ValidationError as e:
+            return {"error": "Invalid ticket", "errors": e.errors(include_url=False, include_context=False, include_input=False)}, 400
 
         department = additional.get("department")
-        department_agents = await AgentsDao.filters(outlet_id=outlet_id, department=department)
+        if settings.get("auto_assign", True):
+            selected_agent = await AgentAssignmentService.pick_agent(
+                outlet_id=outlet_id,
+                department=department,
+                strategy=settings.get("assignment_strategy") or "least_loaded",
+                skills=data.get("tags") or additional.get("tags"),
+                language=data.get("language") or additional.get("language"),
+            )
 
-        if not department_agents:
-            return {"error": f"No agents found for department '{department}'"}, 400
-        
-        # Find agent with least open tickets, default to first agent
-        lowest_load = -1
-        selected_agent = department_agents[0]
-        
-        for agent in department_agents:
-            open_ticket_count = await TicketsDao.count_open_tickets_by_agent(agent_id=agent.id)
-            if open_ticket_count < lowest_load or lowest_load == -1:
-                lowest_load = open_ticket_count
-                selected_agent = agent
+            if not selected_agent:
+                return {"error": f"No agents found for department '{department}'"}, 400
 
-        data["assigned_agent"] = selected_agent.id
+            ticket_model = ticket_model.model_copy(update={"assigned_agent_id": selected_agent.id})
 
-        ticket_model = TicketBase(**data)
-        id_ = await TicketsDao.create(ticket_model)
+        # ---- Generate ticket number ----
+        support_ticket_id = await TicketNumberAllocator.next_support_ticket_id(outlet_id=outlet_id, prefix=ticket_prefix, start_no=start_no)
+        ticket_model = ticket_model.model_copy(update={"support_ticket_id": support_ticket_id})
+
+        id_ = await TicketsDao.create(ticket_model, taxonomy)
+        await enqueue_ticket_created(id_, outlet_id, ticket_model.assigned_agent_id)
         return {"id": id_}, 200
     
     @staticmethod
@@ -345,6 +582,72 @@ class TicketService:
         return {"id": id_, "rating": rating_model.rating}, 200
 
 
+class AgentAssignmentService:
+    """
+    Chooses the agent for a new ticket within a department.
+    Agents currently inside their working hours are preferred; strategies:
+        least_loaded - fewest open tickets (one grouped count query)
+        round_robin  - rotates through the department, no load query
+        skill_match  - agents whose skills/languages match the ticket, then least loaded
+    """
+
+    STRATEGIES = ("least_loaded", "round_robin", "skill_match")
+
+    _round_robin_positions: dict[tuple[int, str], int] = {}
+
+    @staticmethod
+    def _is_working_now(agent: Agent, now: datetime) -> bool:
+        try:
+            local_now = now.astimezone(ZoneInfo(agent.timezone))
+        except (ZoneInfoNotFoundError, ValueError, TypeError):
+            return True  # unknown timezone, don't exclude the agent
+
+        working_days = {day.lower()[:3] for day in (agent.working_days or [])}
+        if working_days and local_now.strftime("%a").lower() not in working_days:
+            return False
+
+        hours = agent.working_hours or {}
+        try:
+            start = datetime.strptime(hours["start"], "%H:%M").time()
+            end = datetime.strptime(hours["end"], "%H:%M").time()
+        except (KeyError, TypeError, ValueError):
+            return True
+
+        current = local_now.time()
+        if start <= end:
+            return start <= current < end
+        return current >= start or current < end  # overnight shift
+
+    @staticmethod
+    async def pick_agent(*, outlet_id: int, department: str, strategy: str = "least_loaded", skills: Optional[List[str]] = None, language: Optional[str] = None) -> Optional[Agent]:
+        # inactive agents can't take tickets (update_status_and_agent refuses them as well)
+        agents = await AgentsDao.filters(outlet_id=outlet_id, department=department, status="active")
+        if not agents:
+            return None
+
+        now = datetime.now(timezone.utc)
+        candidates = [agent for agent in agents if AgentAssignmentService._is_working_now(agent, now)] or agents
+
+        if strategy == "skill_match" and (skills or language):
+            wanted_skills = {skill.lower() for skill in (skills or [])}
+            matched = [
+                agent for agent in candidates
+                if (not language or language.lower() in {lang.lower() for lang in (agent.languages or [])})
+                and (not wanted_skills or wanted_skills & {skill.lower() for skill in (agent.skills or [])})
+            ]
+            candidates = matched or candidates
+
+        if strategy == "round_robin":
+            candidates.sort(key=lambda agent: agent.id)
+            key = (outlet_id, department)
+            position = AgentAssignmentService._round_robin_positions.get(key, -1) + 1
+            AgentAssignmentService._round_robin_positions[key] = position
+            return candidates[position % len(candidates)]
+
+        loads = await TicketsDao.count_open_tickets_by_agents([agent.id for agent in candidates])
+        return min(candidates, key=lambda agent: (loads.get(agent.id, 0), agent.id))
+
+
 class SupportSettingsService:
 
     @staticmethod
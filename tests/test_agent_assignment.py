@@ -0,0 +1,28 @@
+import asyncio
+from types import SimpleNamespace
+
+from modules.TicketsHarbour.services import AgentAssignmentService, AgentsDao, TicketsDao
+
+
+def agent(id, status="active"):
+    return SimpleNamespace(id=id, status=status, timezone="UTC", working_days=[], working_hours={}, skills=[], languages=[])
+
+
+def test_pick_agent_only_considers_active_agents(monkeypatch):
+    queried = []
+
+    async def fake_filters(**filters):
+        queried.append(filters)
+        return [row for row in [agent(1, "inactive"), agent(2)] if row.status == filters.get("status", row.status)]
+
+    async def fake_loads(agent_ids):
+        return {}
+
+    monkeypatch.setattr(AgentsDao, "filters", staticmethod(fake_filters))
+    monkeypatch.setattr(TicketsDao, "count_open_tickets_by_agents", staticmethod(fake_loads))
+
+    picked = asyncio.run(AgentAssignmentService.pick_agent(outlet_id=7, department="support"))
+
+    assert queried[0]["status"] == "active"
+    assert picked.id == 2
+
@@ -0,0 +1,143 @@
+import asyncio
+import statistics
+import time
+
+import asyncpg
+import pytest
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncSession, create_async_engine
+from sqlalchemy.orm import sessionmaker
+
+from app import database
+from modules.AnalyticsHarbour.dao import AnalyticsDao
+
+OUTLET_ID = 7
+TICKETS = 50_000
+LOADS = 30
+SCHEMA = "analytics_benchmark"
+
+# closed tickets spread over today and yesterday, a few agents and departments, 10 outlets
+SEED_TICKETS = f"""
+    INSERT INTO {SCHEMA}.tickets (
+        id, support_ticket_id, outlet_id, subject, raised_by, raised_by_id, priority, department, status,
+        assigned_agent_id, created_at, closed_at, outlet_issue_id, outlet_category_id, outlet_sub_category_id,
+        issue_name_snapshot, category_name_snapshot, sub_category_name_snapshot
+    )
+    SELECT
+        i, 'TKT-' || i, i % 10 + 1, 'Parcel is late', 'customer', i,
+        'low', (ARRAY['support', 'billing', 'shipping'])[i % 3 + 1], (ARRAY['open', 'assigned', 'closed', 'closed'])[i % 4 + 1],
+        i % 5 + 1, now() - interval '2 days', now() - (i % 2) * interval '1 day', 1, 1, 1, 'Orders', 'Delivery', 'Late'
+    FROM generate_series(1, $1) AS i
+"""
+
+# before: the five queries get_basic_analytics used to await one after another,
+# each in its own session (on today's column names, so both paths read the same data)
+LEGACY_QUERIES = [
+    """
+    SELECT
+        COUNT(*) FILTER (WHERE is_trash = false) as total,
+        COUNT(*) FILTER (WHERE is_trash = false AND status IN ('assigned', 'open')) as in_progress
+    FROM tickets
+    WHERE outlet_id = :outlet_id
+    """,
+    """
+    SELECT AVG(EXTRACT(EPOCH FROM (closed_at - created_at)) / 3600.0) as avg_hours
+    FROM tickets
+    WHERE outlet_id = :outlet_id AND is_trash = false AND status = 'closed' AND closed_at IS NOT NULL
+    """,
+    """
+    SELECT
+        AVG(EXTRACT(EPOCH FROM (closed_at - created_at)) / 3600.0) FILTER (WHERE DATE(closed_at) = CURRENT_DATE) as today_avg,
+        AVG(EXTRACT(EPOCH FROM (closed_at - created_at)) / 3600.0) FILTER (WHERE DATE(closed_at) = CURRENT_DATE - INTERVAL '1 day') as yesterday_avg
+    FROM tickets
+    WHERE outlet_id = :outlet_id AND is_trash = false AND status = 'closed' AND closed_at IS NOT NULL
+        AND DATE(closed_at) >= CURRENT_DATE - INTERVAL '1 day'
+    """,
+    """
+    SELECT assigned_agent_id as user_id, COUNT(*) as closed_count
+    FROM tickets
+    WHERE outlet_id = :outlet_id AND is_trash = false AND status = 'closed' AND assigned_agent_id IS NOT NULL
+    GROUP BY assigned_agent_id
+    ORDER BY closed_count DESC
+    LIMIT 5
+    """,
+    """
+    SELECT department, COUNT(*) as count
+    FROM tickets
+    WHERE outlet_id = :outlet_id AND is_trash = false AND department IS NOT NULL
+    GROUP BY department
+    ORDER BY count DESC
+    LIMIT 10
+    """,
+]
+
+
+async def legacy_basic_analytics(session_factory, outlet_id: int) -> dict:
+    results = []
+    for query in LEGACY_QUERIES:
+        async with session_factory() as session:
+            results.append((await session.execute(text(query), {"outlet_id": outlet_id})).fetchall())
+
+    counts, overall, today, top_users, top_categories = results
+    return {
+        "total": counts[0][0],
+        "in_progress": counts[0][1],
+        "today_avg": float(today[0][0]),
+        "yesterday_avg": float(today[0][1]),
+        "avg_hours": float(overall[0][0]),
+        "top_users": [tuple(row) for row in top_users],
+        "top_categories": [tuple(row) for row in top_categories],
+    }
+
+
+async def median_seconds(load) -> float:
+    timings = []
+    for _ in range(LOADS):
+        started = time.perf_counter()
+        await load()
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def test_single_query_analytics_beats_five_round_trips(database_dsn, monkeypatch):
+    async def run() -> tuple[dict, dict, float, float]:
+        connection = await asyncpg.connect(database_dsn)
+        try:
+            await connection.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+            await connection.execute(f"CREATE SCHEMA {SCHEMA}")
+            await connection.execute(f"CREATE TABLE {SCHEMA}.tickets (LIKE public.tickets INCLUDING DEFAULTS INCLUDING INDEXES)")
+            await connection.execute(SEED_TICKETS, TICKETS)
+            await connection.execute(f"ANALYZE {SCHEMA}.tickets")
+
+            # a pool of its own whose connections see the seeded copy instead of public.tickets
+            engine = create_async_engine(
+                database_dsn.replace("postgresql://", "postgresql+asyncpg://", 1),
+                connect_args={"server_settings": {"search_path": f"{SCHEMA}, public"}},
+            )
+            session_factory = sessionmaker(bind=engine, class_=AsyncSession, expire_on_commit=False)
+            monkeypatch.setattr(database, "get_session_factory", lambda db_name=None: session_factory)
+            try:
+                before = await legacy_basic_analytics(session_factory, OUTLET_ID)
+                after = await AnalyticsDao.get_basic_analytics(OUTLET_ID)
+                legacy_seconds = await median_seconds(lambda: legacy_basic_analytics(session_factory, OUTLET_ID))
+                single_seconds = await median_seconds(lambda: AnalyticsDao.get_basic_analytics(OUTLET_ID))
+            finally:
+                await engine.dispose()
+            return before, after, legacy_seconds, single_seconds
+        finally:
+            await connection.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+            await connection.close()
+
+    before, after, legacy_seconds, single_seconds = asyncio.run(run())
+
+    print(
+        f"\nbasic analytics over {TICKETS} tickets: "
+        f"five queries {legacy_seconds * 1e3:.2f} ms, single CTE {single_seconds * 1e3:.2f} ms "
+        f"({legacy_seconds / single_seconds:.1f}x)"
+    )
+    assert after["total"] == before["total"] and after["in_progress"] == before["in_progress"]
+    for field in ("avg_hours", "today_avg", "yesterday_avg"):
+        assert after[field] == pytest.approx(before[field])
+    assert sorted(after["top_users"]) == sorted(before["top_users"])
+    assert sorted(after["top_categories"]) == sorted(before["top_categories"])
+    assert single_seconds < legacy_seconds
@@ -0,0 +1,67 @@
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from modules.TicketsHarbour import dao
+from modules.TicketsHarbour.models import TicketAssignmentEvent
+from modules.TicketsHarbour.services import AuthTicketService
+
+START = datetime(2026, 10, 1, 12, 0, tzinfo=timezone.utc)
+
+
+@pytest.fixture
+def events(monkeypatch):
+    """Five events on ticket 3; fetch_all answers from them and records each query."""
+    rows = [
+        TicketAssignmentEvent(id=n, ticket_id=3, outlet_id=7, previous_agent_id=None, agent_id=n, ts=START + timedelta(minutes=n))
+        for n in range(1, 6)
+    ]
+    queries = []
+
+    async def fake_fetch_all(query):
+        queries.append(query)
+        params = query.compile(dialect=postgresql.dialect()).params
+        # a cursor adds (ts, id) > (param_1, param_2) ahead of the limit
+        after = (params["param_1"], params["param_2"]) if isinstance(params["param_1"], datetime) else None
+        remaining = [row for row in rows if after is None or (row.ts, row.id) > after]
+        return remaining[:query._limit_clause.value]
+
+    monkeypatch.setattr(dao, "fetch_all", fake_fetch_all)
+    return queries
+
+
+def history(**data):
+    return asyncio.run(AuthTicketService.get_assignment_history(outlet_id=7, **data))
+
+
+def test_history_is_paged_with_a_cursor(events):
+    first, status = history(id="3", limit="2")
+    second, _ = history(id="3", limit="2", cursor=first["next_cursor"])
+    last, _ = history(id="3", limit="2", cursor=second["next_cursor"])
+
+    assert status == 200
+    assert [event["id"] for event in first["history"] + second["history"] + last["history"]] == [1, 2, 3, 4, 5]
+    assert (first["has_next"], second["has_next"], last["has_next"]) == (True, True, False)
+    assert last["next_cursor"] is None
+    # never more than a page (plus the look-ahead row) is fetched
+    assert all(query._limit_clause.value == 3 for query in events)
+
+
+@pytest.mark.parametrize("data", [
+    {"id": "abc"},
+    {"id": "-1"},
+    {"agent_id": "1.5"},
+    {"agent_id": "9", "since": "yesterday"},
+    {"id": "3", "limit": "0"},
+    {"id": "3", "limit": "100000"},
+    {"id": "3", "cursor": "not-a-cursor"},
+    {},
+])
+def test_malformed_history_request_is_a_400(events, data):
+    body, status = history(**data)
+
+    assert status == 400
+    assert body["error"]
+    assert events == []
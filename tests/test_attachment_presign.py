@@ -0,0 +1,61 @@
+import asyncio
+
+import pytest
+
+from modules.TicketsHarbour import services
+from modules.TicketsHarbour.services import TicketAttachmentService
+
+
+@pytest.fixture
+def presigned(monkeypatch):
+    calls = []
+
+    async def fake_presign_upload(**kwargs):
+        calls.append(kwargs)
+        return {"url": "https://bucket.example", "fields": {}}
+
+    monkeypatch.setattr(services, "presign_upload", fake_presign_upload)
+    return calls
+
+
+@pytest.mark.parametrize("data", [
+    {"size": "12kb", "content_type": "image/png"},
+    {"size": -1, "content_type": "image/png"},
+    {"size": [1], "content_type": "image/png"},
+    {"content_type": 42},
+    {"content_type": "image/png", "method": "delete"},
+])
+def test_malformed_presign_request_is_a_400(presigned, data):
+    body, status = asyncio.run(TicketAttachmentService.presign(outlet_id=7, filename="receipt.png", **data))
+
+    assert status == 400
+    assert body["error"] == "Invalid upload request"
+    assert presigned == []
+
+
+def test_presign_normalizes_and_enforces_limits(presigned):
+    body, status = asyncio.run(TicketAttachmentService.presign(outlet_id=7, filename="receipt.png", content_type="Image/PNG; charset=binary", size="2048", method="PUT"))
+    too_big, too_big_status = asyncio.run(TicketAttachmentService.presign(outlet_id=7, content_type="image/png", size=10**12))
+    wrong_type, wrong_type_status = asyncio.run(TicketAttachmentService.presign(outlet_id=7, content_type="application/x-msdownload"))
+
+    assert status == 200
+    assert presigned[0]["content_type"] == "image/png" and presigned[0]["method"] == "put"
+    assert too_big_status == 413
+    assert wrong_type_status == 415
+
+
+@pytest.mark.parametrize("ticket_id, key", [
+    ("abc", "ticket_attachments/7/receipt.png"),
+    ("-3", "ticket_attachments/7/receipt.png"),
+    ("1.5", "ticket_attachments/7/receipt.png"),
+    ("12", ["ticket_attachments/7/receipt.png"]),
+])
+def test_malformed_complete_request_is_a_400(monkeypatch, ticket_id, key):
+    async def unexpected(*args, **kwargs):
+        raise AssertionError("reached storage or the database")
+
+    monkeypatch.setattr(services, "head_object", unexpected)
+    body, status = asyncio.run(TicketAttachmentService.complete(outlet_id=7, id=ticket_id, key=key))
+
+    assert status == 400
+    assert body["error"] == "Invalid attachment request"
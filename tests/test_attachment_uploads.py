@@ -0,0 +1,210 @@
+import asyncio
+import time
+from contextlib import AsyncExitStack, asynccontextmanager
+
+import aioboto3
+import pytest
+
+from app import uploads
+from app.database import on_rollback, unit_of_work
+from app.uploads import UploadRejected, stream_multipart_to_s3
+
+BOUNDARY = "ticketboundary"
+PNG = b"\x89PNG\r\n\x1a\n" + b"\x00" * 64
+PDF = b"%PDF-1.7\n" + b"\x00" * 64
+
+
+class FakeS3:
+    def __init__(self):
+        self.objects: dict[str, bytes] = {}
+
+    async def put_object(self, Bucket, Key, Body, ContentType):
+        self.objects[Key] = Body
+
+    async def delete_object(self, Bucket, Key):
+        self.objects.pop(Key, None)
+
+
+class FakeClients:
+    def __init__(self, s3):
+        self.s3 = s3
+
+    @asynccontextmanager
+    async def client(self):
+        yield self.s3
+
+
+class FakeRequest:
+    def __init__(self, body: bytes, chunk_size: int):
+        self.headers = {"content-type": f"multipart/form-data; boundary={BOUNDARY}"}
+        self._body = body
+        self._chunk_size = chunk_size
+
+    async def stream(self):
+        for start in range(0, len(self._body), self._chunk_size):
+            yield self._body[start:start + self._chunk_size]
+
+
+def multipart_body(content_type: str, content: bytes) -> bytes:
+    return (
+        f"--{BOUNDARY}\r\n"
+        'Content-Disposition: form-data; name="subject"\r\n\r\n'
+        "Receipt attached\r\n"
+        f"--{BOUNDARY}\r\n"
+        'Content-Disposition: form-data; name="attachment"; filename="receipt.png"\r\n'
+        f"Content-Type: {content_type}\r\n\r\n"
+    ).encode() + content + f"\r\n--{BOUNDARY}--\r\n".encode()
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    fake = FakeS3()
+    monkeypatch.setattr(uploads, "s3_clients", FakeClients(fake))
+    return fake
+
+
+def upload(body: bytes, chunk_size: int):
+    return asyncio.run(stream_multipart_to_s3(FakeRequest(body, chunk_size), key_prefix="tickets/7"))
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 4096])
+def test_signature_is_checked_however_the_body_is_chunked(s3, chunk_size):
+    with pytest.raises(UploadRejected) as rejected:
+        upload(multipart_body("image/png", PDF), chunk_size)
+
+    assert rejected.value.status_code == 415
+    assert s3.objects == {}
+
+
+@pytest.mark.parametrize("chunk_size", [1, 5, 4096])
+def test_matching_file_is_stored_whole(s3, chunk_size):
+    fields, keys = upload(multipart_body("image/png", PNG), chunk_size)
+
+    assert fields["subject"] == "Receipt attached"
+    assert s3.objects == {keys[0]: PNG}
+
+
+@pytest.mark.parametrize("content_type, content", [
+    ("image/png", b"<html><script>alert(1)</script></html>"),
+    ("image/jpeg", b"MZ\x90\x00" + b"\x00" * 32),
+    ("application/pdf", b""),
+    ("text/plain", PNG),
+])
+def test_declared_type_must_match_its_signature(s3, content_type, content):
+    with pytest.raises(UploadRejected) as rejected:
+        upload(multipart_body(content_type, content), 7)
+
+    assert rejected.value.status_code == 415
+    assert s3.objects == {}
+
+
+def test_plain_text_without_a_signature_is_stored(s3):
+    fields, keys = upload(multipart_body("text/plain", b"order #1234 never arrived"), 4096)
+
+    assert s3.objects == {keys[0]: b"order #1234 never arrived"}
+
+
+@pytest.mark.parametrize("body", [
+    b"this is not multipart at all",
+    multipart_body("image/png", PNG)[:-40],
+    b"",
+])
+def test_malformed_body_is_a_400_and_leaves_nothing(s3, body):
+    with pytest.raises(UploadRejected) as rejected:
+        upload(body, 16)
+
+    assert rejected.value.status_code == 400
+    assert str(rejected.value) == "Malformed multipart body"
+    assert s3.objects == {}
+
+
+def test_short_file_is_checked_at_part_end(s3):
+    with pytest.raises(UploadRejected):
+        upload(multipart_body("image/png", b"GIF89a"), 1)
+
+
+def test_rollback_runs_compensation_and_commit_does_not():
+    deleted = []
+
+    async def rolled_back():
+        async with unit_of_work():
+            await on_rollback(lambda: asyncio.sleep(0, deleted.append("rolled back")))
+            raise RuntimeError("ticket insert failed")
+
+    async def committed():
+        async with unit_of_work():
+            await on_rollback(lambda: asyncio.sleep(0, deleted.append("committed")))
+
+    with pytest.raises(RuntimeError):
+        asyncio.run(rolled_back())
+    asyncio.run(committed())
+
+    assert deleted == ["rolled back"]
+
+
+# ---- throughput: a client per upload vs the shared client ----
+
+UPLOADS = 20
+UPLOAD_SIZE = 256 * 1024
+
+
+class Aioboto3Clients:
+    """
+    Builds real aioboto3 sessions and clients, the part the shared client saves, but hands
+    out FakeS3 so no request leaves the process (TLS and connection reuse aren't measured).
+    """
+
+    def __init__(self, s3, shared: bool):
+        self.s3 = s3
+        self.shared = shared
+        self.stack = AsyncExitStack()
+        self.opened = 0
+
+    async def _open(self, stack: AsyncExitStack) -> None:
+        session = aioboto3.Session(aws_access_key_id="test", aws_secret_access_key="test", region_name="us-east-1")
+        await stack.enter_async_context(session.client("s3", endpoint_url="http://127.0.0.1:9"))
+        self.opened += 1
+
+    @asynccontextmanager
+    async def client(self):
+        if not self.shared:
+            # before: _get_s3 opened a session and client for every call
+            async with AsyncExitStack() as stack:
+                await self._open(stack)
+                yield self.s3
+            return
+        if not self.opened:
+            await self._open(self.stack)
+        yield self.s3
+
+
+def uploads_per_second(monkeypatch, shared: bool) -> tuple[float, Aioboto3Clients]:
+    clients = Aioboto3Clients(FakeS3(), shared)
+    monkeypatch.setattr(uploads, "s3_clients", clients)
+    body = multipart_body("image/png", PNG + b"\x00" * UPLOAD_SIZE)
+
+    async def run() -> float:
+        try:
+            started = time.perf_counter()
+            await asyncio.gather(*(
+                stream_multipart_to_s3(FakeRequest(body, 64 * 1024), key_prefix="tickets/7")
+                for _ in range(UPLOADS)
+            ))
+            return time.perf_counter() - started
+        finally:
+            await clients.stack.aclose()
+
+    return UPLOADS / asyncio.run(run()), clients
+
+
+def test_shared_client_upload_throughput_beats_a_client_per_upload(monkeypatch):
+    per_call, per_call_clients = uploads_per_second(monkeypatch, shared=False)
+    shared, shared_clients = uploads_per_second(monkeypatch, shared=True)
+
+    print(
+        f"\n{UPLOADS} concurrent {UPLOAD_SIZE // 1024} KiB uploads: "
+        f"client per upload {per_call:.0f}/s, shared client {shared:.0f}/s ({shared / per_call:.1f}x)"
+    )
+    assert (per_call_clients.opened, shared_clients.opened) == (UPLOADS, 1)
+    assert len(shared_clients.s3.objects) == UPLOADS
+    assert shared > per_call
@@ -0,0 +1,60 @@
+import asyncio
+
+from app import database
+from app.database import AdvisoryLockLeader
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+
+    def is_closed(self):
+        return self.closed
+
+    async def fetchval(self, query, *args):
+        return True
+
+    async def execute(self, query, *args):
+        return None
+
+    async def close(self):
+        self.closed = True
+
+
+def test_failed_election_releases_the_lock(monkeypatch):
+    connections = []
+
+    async def fake_connect(dsn):
+        connections.append(FakeConnection())
+        return connections[-1]
+
+    async def failing_elected():
+        raise RuntimeError("job store unavailable")
+
+    async def failing_demoted():
+        raise RuntimeError("scheduler not running")
+
+    monkeypatch.setattr(database.asyncpg, "connect", fake_connect)
+
+    async def scenario():
+        leader = AdvisoryLockLeader("postgresql://", 1, on_elected=failing_elected, on_demoted=failing_demoted, interval=0.01)
+        await leader.start()
+        await asyncio.sleep(0.05)
+        alive = not leader._task.done()
+        await leader.stop()
+        return leader, alive
+
+    leader, alive = asyncio.run(scenario())
+
+    assert alive
+    assert not leader.is_leader
+    # every session that won the lock was closed, and the loop kept retrying
+    assert len(connections) > 1
+    assert all(connection.closed for connection in connections)
+
+
+def test_demotion_is_a_noop_before_the_scheduler_started():
+    from app import cron
+
+    assert not cron.scheduler.running
+    asyncio.run(cron._on_demoted())
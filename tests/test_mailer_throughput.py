@@ -0,0 +1,113 @@
+import asyncio
+import time
+
+import aiosmtplib
+import pytest
+
+from app import mailer as mailer_module
+from app.mailer import MAIL_DIGESTED, Mailer, build_message
+from app.smtp_sink import SMTPSink
+
+MESSAGES = 400
+POOL_SIZE = 2
+BATCH_SIZE = 25
+LATENCY = 0.001  # per DATA, a nearby relay
+
+
+@pytest.fixture
+def sink_settings(monkeypatch):
+    email = mailer_module.settings.email
+    for name, value in {
+        "smtp_host": "127.0.0.1",
+        "smtp_user": "sink",
+        "smtp_password": "sink",
+        "from_email": "support@example.com",
+        "use_tls": False,
+        "smtp_pool_size": POOL_SIZE,
+        "smtp_batch_size": BATCH_SIZE,
+        "digest_threshold": 3,
+        "digest_window_seconds": 60,
+        "digest_interval_seconds": 3600,
+    }.items():
+        monkeypatch.setattr(email, name, value)
+    return email
+
+
+async def started_sink(email) -> SMTPSink:
+    sink = SMTPSink(port=0, latency=LATENCY)
+    await sink.start()
+    email.smtp_port = sink._server.sockets[0].getsockname()[1]
+    return sink
+
+
+def test_pooled_mailer_batches_on_persistent_sessions(sink_settings, monkeypatch):
+    batches = []
+    send_batch = Mailer._send_batch
+
+    async def recording_send_batch(self, smtp, batch):
+        batches.append(len(batch))
+        return await send_batch(self, smtp, batch)
+
+    monkeypatch.setattr(Mailer, "_send_batch", recording_send_batch)
+
+    async def run() -> tuple[SMTPSink, SMTPSink, float, float]:
+        # before: one session (connect, EHLO, AUTH, QUIT) per email
+        naive = await started_sink(sink_settings)
+        started = time.perf_counter()
+        for n in range(MESSAGES):
+            await aiosmtplib.send(
+                build_message(f"agent{n % 20}@example.com", f"Ticket {n} assigned", "A ticket was assigned to you."),
+                hostname="127.0.0.1", port=sink_settings.smtp_port, username="sink", password="sink",
+            )
+        naive_seconds = time.perf_counter() - started
+        await naive.stop()
+
+        # after: the pooled mailer, with callers sending concurrently as the notification tasks do
+        pooled = await started_sink(sink_settings)
+        mailer = Mailer()
+        await mailer.start()
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            mailer.send(f"agent{n % 20}@example.com", f"Ticket {n} assigned", "A ticket was assigned to you.")
+            for n in range(MESSAGES)
+        ))
+        pooled_seconds = time.perf_counter() - started
+        await mailer.stop()
+        await pooled.stop()
+        return naive, pooled, naive_seconds, pooled_seconds
+
+    naive, pooled, naive_seconds, pooled_seconds = asyncio.run(run())
+
+    print(
+        f"\n{MESSAGES} emails through the SMTP sink: "
+        f"session per email {MESSAGES / naive_seconds:.0f} msg/s, "
+        f"pooled mailer {MESSAGES / pooled_seconds:.0f} msg/s ({naive_seconds / pooled_seconds:.1f}x), "
+        f"largest batch {max(batches)}"
+    )
+    assert naive.connections == MESSAGES
+    assert pooled.messages == MESSAGES
+    assert pooled.connections == POOL_SIZE
+    assert 1 < max(batches) <= BATCH_SIZE
+    assert pooled_seconds < naive_seconds
+
+
+def test_notification_spike_is_held_for_one_digest(sink_settings):
+    async def run() -> tuple[int, SMTPSink]:
+        sink = await started_sink(sink_settings)
+        mailer = Mailer()
+        await mailer.start()
+        for n in range(10):
+            await mailer.send("agent@example.com", f"Ticket {n} assigned", "A ticket was assigned to you.", digest=True)
+        sent_before_digest = sink.messages
+        # stop flushes what is held instead of waiting for the digest interval
+        await mailer.stop()
+        await sink.stop()
+        return sent_before_digest, sink
+
+    digested = MAIL_DIGESTED._value.get()
+    sent_before_digest, sink = asyncio.run(run())
+
+    assert sent_before_digest == 3
+    assert MAIL_DIGESTED._value.get() - digested == 7
+    # three individual notifications, then the other seven in one email
+    assert sink.messages == 4
@@ -0,0 +1,95 @@
+import asyncio
+import statistics
+import time
+
+import asyncpg
+import httpx
+from apscheduler.events import EVENT_JOB_EXECUTED
+from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+from fastapi import FastAPI
+
+from app.jobstore import AsyncPgJobStore
+
+JOBS = 300
+SECONDS = 3.5
+TABLENAME = "apscheduler_benchmark_jobs"
+
+app = FastAPI()
+
+
+@app.get("/ping")
+async def ping():
+    return {"ok": True}
+
+
+def p99(timings: list[float]) -> float:
+    return statistics.quantiles(timings, n=100)[98]
+
+
+async def request_timings(seconds: float) -> list[float]:
+    timings = []
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+        deadline = time.perf_counter() + seconds
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            await client.get("/ping")
+            timings.append(time.perf_counter() - started)
+            await asyncio.sleep(0.001)
+    return timings
+
+
+async def timings_while_jobs_fire(jobstore) -> tuple[list[float], int]:
+    fired = 0
+
+    def count(event) -> None:
+        nonlocal fired
+        fired += 1
+
+    scheduler = AsyncIOScheduler(jobstores={"default": jobstore})
+    scheduler.add_listener(count, EVENT_JOB_EXECUTED)
+    # every job is due at the same instant each second, and each run rewrites its row
+    for n in range(JOBS):
+        scheduler.add_job("asyncio:sleep", trigger="interval", seconds=1, args=[0], id=f"benchmark-{n}", max_instances=1)
+    scheduler.start()
+    try:
+        timings = await request_timings(SECONDS)
+    finally:
+        scheduler.shutdown(wait=False)
+    return timings, fired
+
+
+def test_request_p99_stays_flat_while_jobs_fire(database_dsn):
+    async def run() -> dict[str, tuple[list[float], int]]:
+        connection = await asyncpg.connect(database_dsn)
+        try:
+            results = {"idle": (await request_timings(SECONDS), 0)}
+
+            # before: SQLAlchemyJobStore, a blocking psycopg2 query on the event loop per lookup and write
+            sync_store = SQLAlchemyJobStore(url=database_dsn.replace("postgresql://", "postgresql+psycopg2://", 1), tablename=TABLENAME)
+            results["sqlalchemy"] = await timings_while_jobs_fire(sync_store)
+            sync_store.engine.dispose()
+            await connection.execute(f"DROP TABLE IF EXISTS {TABLENAME}")
+
+            # after: served from memory, written behind in batches
+            async_store = AsyncPgJobStore(dsn=database_dsn, tablename=TABLENAME)
+            await async_store.load()
+            results["asyncpg"] = await timings_while_jobs_fire(async_store)
+            await async_store.close()
+            return results
+        finally:
+            await connection.execute(f"DROP TABLE IF EXISTS {TABLENAME}")
+            await connection.close()
+
+    results = asyncio.run(run())
+    idle, sync, async_ = (p99(results[store][0]) for store in ("idle", "sqlalchemy", "asyncpg"))
+
+    print(
+        f"\nrequest p99 with {JOBS} jobs firing every second: "
+        f"idle {idle * 1e3:.2f} ms, SQLAlchemyJobStore {sync * 1e3:.2f} ms "
+        f"({results['sqlalchemy'][1]} runs), AsyncPgJobStore {async_ * 1e3:.2f} ms ({results['asyncpg'][1]} runs)"
+    )
+    assert results["asyncpg"][1] >= JOBS
+    # a flush is one awaited round trip; nothing the scheduler does should hold the loop for long
+    assert async_ < idle + 0.010
+    assert async_ < sync
@@ -0,0 +1,55 @@
+import asyncio
+from types import SimpleNamespace
+
+from modules.ShopifyHarbour import services
+from modules.ShopifyHarbour.services import TicketService, TicketsDao
+
+
+def run_update(monkeypatch, result: dict | None = None, **data):
+    ticket = SimpleNamespace(id=5, outlet_id=7, assigned_agent_id=11, customer_details={"customer_id": 3})
+    sent = []
+
+    async def fake_get_by_id(id):
+        return ticket
+
+    async def fake_update(ticket_update):
+        sent.append(ticket_update)
+        return result or {"id": ticket_update.id, "agent_outlet_id": 7, "agent_status": "active"}
+
+    async def fake_enqueue(updated, outlet_id):
+        pass
+
+    monkeypatch.setattr(TicketsDao, "get_by_id", staticmethod(fake_get_by_id))
+    monkeypatch.setattr(TicketsDao, "update_status_and_agent", staticmethod(fake_update))
+    monkeypatch.setattr(services, "enqueue_ticket_updated", fake_enqueue)
+
+    return asyncio.run(TicketService.update(id=5, customer_id=3, **data)), sent
+
+
+def test_status_only_update_keeps_the_assignee(monkeypatch):
+    (body, status), sent = run_update(monkeypatch, status="closed")
+
+    assert status == 200 and body == {"id": 5}
+    assert sent[0].assigned_agent_id == 11
+    assert sent[0].status.value == "closed"
+
+
+def test_agent_is_passed_as_assigned_agent_id(monkeypatch):
+    (_, status), sent = run_update(monkeypatch, status=None, assigned_agent_id=12)
+    (_, legacy_status), legacy = run_update(monkeypatch, status=None, assigned_agent=13)
+
+    assert status == legacy_status == 200
+    assert sent[0].assigned_agent_id == 12
+    assert legacy[0].assigned_agent_id == 13
+
+
+def test_inactive_agent_is_rejected(monkeypatch):
+    (body, status), _ = run_update(
+        monkeypatch,
+        result={"id": None, "agent_outlet_id": 7, "agent_status": "inactive"},
+        status=None,
+        assigned_agent_id=12,
+    )
+
+    assert status == 400
+    assert body == {"error": "Agent is not active"}
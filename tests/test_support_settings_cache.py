@@ -0,0 +1,30 @@
+import asyncio
+
+from modules.TicketsHarbour import dao
+from modules.TicketsHarbour.dao import SUPPORT_SETTINGS_CACHE, SupportSettingsDao
+from modules.TicketsHarbour.models import SupportSettings
+from modules.TicketsHarbour.schemas import SupportSettingsSnapshot
+
+
+def test_cache_holds_a_snapshot_not_the_orm_row(monkeypatch):
+    row = SupportSettings(id=1, outlet_id=11, web_url="shop.example", settings={"prefix": "TKT", "start_no": "001"})
+    fetches = []
+
+    async def fake_fetch_one(query):
+        fetches.append(query)
+        return row
+
+    monkeypatch.setattr(dao, "fetch_one", fake_fetch_one)
+    SUPPORT_SETTINGS_CACHE.clear()
+
+    first = asyncio.run(SupportSettingsDao.get_by_outlet_id_or_web_url(outlet_id=11))
+    # what a rollback of the request's session does to the instance it loaded
+    row.settings = None
+    by_outlet = asyncio.run(SupportSettingsDao.get_by_outlet_id_or_web_url(outlet_id=11))
+    by_url = asyncio.run(SupportSettingsDao.get_by_outlet_id_or_web_url(web_url="shop.example"))
+
+    assert isinstance(first, SupportSettingsSnapshot)
+    assert by_outlet is first and by_url is first
+    assert by_outlet.settings["prefix"] == "TKT"
+    assert len(fetches) == 1
+    SUPPORT_SETTINGS_CACHE.clear()
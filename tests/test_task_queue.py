@@ -0,0 +1,112 @@
+import asyncio
+
+import pytest
+from pydantic import BaseModel
+
+from app import tasks
+from app.database import unit_of_work
+from app.tasks import TASK_MAX_TRIES, TaskQueue, enqueue, retry_delay
+
+
+class Ping(BaseModel):
+    ticket_id: int
+
+
+@pytest.fixture
+def inline_queue(monkeypatch):
+    monkeypatch.setattr(tasks, "TASKS", {})
+    monkeypatch.setattr(tasks, "TASK_NAMES", {})
+    queue = TaskQueue()
+    monkeypatch.setattr(tasks, "task_queue", queue)
+    return queue
+
+
+@pytest.fixture
+def delays(monkeypatch):
+    # the real backoff starts at seconds; record it and wait a millisecond instead
+    recorded = []
+
+    def fast_retry_delay(job_try: int) -> float:
+        recorded.append(job_try)
+        return 0.001
+
+    monkeypatch.setattr(tasks, "retry_delay", fast_retry_delay)
+    return recorded
+
+
+def register(handler):
+    return tasks.task(Ping)(handler)
+
+
+def test_task_runs_only_after_the_unit_of_work_commits(inline_queue):
+    ran = []
+
+    @register
+    async def ping(payload: Ping) -> None:
+        ran.append(payload.ticket_id)
+
+    async def committed() -> list:
+        async with unit_of_work():
+            await enqueue(Ping(ticket_id=1))
+            await asyncio.sleep(0)
+            queued_inside = list(ran) + list(inline_queue._inline)
+        await inline_queue.drain()
+        return queued_inside
+
+    async def rolled_back() -> None:
+        async with unit_of_work():
+            await enqueue(Ping(ticket_id=2))
+            raise RuntimeError("ticket insert failed")
+
+    assert asyncio.run(committed()) == []
+    with pytest.raises(RuntimeError):
+        asyncio.run(rolled_back())
+    asyncio.run(inline_queue.drain())
+
+    assert ran == [1]
+
+
+def test_failed_task_is_retried_until_it_succeeds(inline_queue, delays):
+    tries = []
+
+    @register
+    async def flaky(payload: Ping) -> None:
+        tries.append(payload.ticket_id)
+        if len(tries) < 3:
+            raise ConnectionError("smtp relay unavailable")
+
+    async def run() -> None:
+        await inline_queue.enqueue(Ping(ticket_id=7))
+        await inline_queue.drain()
+
+    asyncio.run(run())
+
+    assert tries == [7, 7, 7]
+    assert delays == [1, 2]
+
+
+def test_task_gives_up_after_max_tries(inline_queue, delays):
+    tries = []
+
+    @register
+    async def broken(payload: Ping) -> None:
+        tries.append(payload.ticket_id)
+        raise ConnectionError("smtp relay unavailable")
+
+    async def run() -> None:
+        await inline_queue.enqueue(Ping(ticket_id=7))
+        await inline_queue.drain()
+
+    asyncio.run(run())
+
+    assert len(tries) == TASK_MAX_TRIES
+    assert delays == list(range(1, TASK_MAX_TRIES))
+
+
+def test_retry_delay_doubles_up_to_the_cap_with_jitter(monkeypatch):
+    monkeypatch.setattr(tasks.random, "uniform", lambda low, high: high)
+    assert [retry_delay(job_try) for job_try in range(1, 5)] == [5, 10, 20, 40]
+    assert retry_delay(20) == tasks.TASK_RETRY_MAX_DELAY
+
+    monkeypatch.setattr(tasks.random, "uniform", lambda low, high: low)
+    assert retry_delay(1) == 2.5
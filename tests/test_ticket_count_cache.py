@@ -0,0 +1,35 @@
+import asyncio
+
+import pytest
+
+from app import response_cache
+from modules.TicketsHarbour.dao import TICKET_COUNT_CACHE, _ticket_count_key
+
+
+@pytest.fixture
+def counts(monkeypatch):
+    async def fake_notify(channel, payload):
+        pass
+
+    monkeypatch.setattr(response_cache, "notify", fake_notify)
+    TICKET_COUNT_CACHE.clear()
+    TICKET_COUNT_CACHE[_ticket_count_key(7, None, None, "exact")] = 120
+    TICKET_COUNT_CACHE[_ticket_count_key(7, "parcel", {"status": "open"}, "estimated")] = 4
+    TICKET_COUNT_CACHE[_ticket_count_key(8, None, None, "exact")] = 30
+    yield TICKET_COUNT_CACHE
+    TICKET_COUNT_CACHE.clear()
+
+
+def test_outlet_write_drops_only_that_outlets_counts(counts):
+    asyncio.run(response_cache.invalidate_outlet(7))
+
+    assert list(counts) == [_ticket_count_key(8, None, None, "exact")]
+
+
+def test_other_workers_drop_counts_on_notify(counts):
+    response_cache._on_response_cache_notify({"outlet_id": 8})
+    assert {key[0] for key in counts} == {7}
+
+    # a reconnected listener may have missed invalidations for any outlet
+    response_cache._on_response_cache_notify(None)
+    assert len(counts) == 0
@@ -0,0 +1,58 @@
+import asyncio
+import base64
+
+import orjson
+import pytest
+
+from app.utility import encode_cursor
+from modules.TicketsHarbour import dao
+from modules.TicketsHarbour.services import AuthTicketService
+
+
+def tampered(payload: dict) -> str:
+    return base64.urlsafe_b64encode(orjson.dumps(payload)).rstrip(b"=").decode()
+
+
+VALID = {"sort_by": "created_at", "sort_order": "desc", "direction": "next", "value": "2026-10-01T12:00:00+00:00", "id": 42}
+
+
+@pytest.mark.parametrize("cursor", [
+    "not-a-cursor!",
+    base64.urlsafe_b64encode(b"[1, 2]").decode(),
+    tampered({**VALID, "id": "42 OR 1=1"}),
+    tampered({**VALID, "value": "yesterday"}),
+    tampered({**VALID, "value": 1700000000}),
+    tampered({**VALID, "direction": "sideways"}),
+    tampered({**VALID, "sort_by": "priority"}),
+])
+def test_bad_cursor_is_a_400_without_querying(monkeypatch, cursor):
+    async def no_queries(*args, **kwargs):
+        raise AssertionError("a bad cursor must be rejected before any query runs")
+
+    monkeypatch.setattr(dao, "_count_tickets", no_queries)
+    monkeypatch.setattr(dao, "execute_query", no_queries)
+
+    body, status = asyncio.run(AuthTicketService.get_auth_paginated_tickets(outlet_id=1, page_size=10, cursor=cursor))
+
+    assert status == 400
+    assert "error" in body
+
+
+def test_valid_cursor_is_accepted(monkeypatch):
+    class Result:
+        def all(self):
+            return []
+
+    async def fake_count(query, key, count_mode):
+        return 0
+
+    async def fake_execute_query(query):
+        return Result()
+
+    monkeypatch.setattr(dao, "_count_tickets", fake_count)
+    monkeypatch.setattr(dao, "execute_query", fake_execute_query)
+
+    body, status = asyncio.run(AuthTicketService.get_auth_paginated_tickets(outlet_id=1, page_size=10, cursor=encode_cursor(VALID)))
+
+    assert status == 200
+    assert body["tickets"] == []
@@ -0,0 +1,94 @@
+import asyncio
+
+from sqlalchemy import insert
+from sqlalchemy.dialects import postgresql
+
+from modules.TicketsHarbour import dao
+from modules.TicketsHarbour.dao import TicketsDao, ticket_insert_row, ticket_taxonomy_key
+from modules.TicketsHarbour.models import Ticket
+from modules.TicketsHarbour.schemas import TicketBase
+from modules.ShopifyHarbour.schemas import TicketBase as StorefrontTicketBase
+
+TAXONOMY = {
+    "outlet_issue_id": 1,
+    "outlet_category_id": 2,
+    "outlet_sub_category_id": 3,
+    "issue_name_snapshot": "Orders",
+    "category_name_snapshot": "Delivery",
+    "sub_category_name_snapshot": "Late",
+}
+
+PAYLOAD = {
+    "outlet_id": 7,
+    "support_ticket_id": "TKT-001",
+    "subject": "Parcel is late",
+    "raised_by": "customer",
+    "raised_by_id": 42,
+    "tags": ["delivery"],
+    "department": "support",
+}
+
+
+def _required_columns() -> set[str]:
+    # NOT NULL columns the database won't fill in by itself
+    return {
+        column.key
+        for column in Ticket.__table__.columns
+        if not column.nullable and not column.primary_key and column.server_default is None and column.computed is None
+    }
+
+
+def _assert_insertable(rows: list[dict]) -> None:
+    columns = set(Ticket.__table__.columns.keys())
+    for row in rows:
+        assert set(row) <= columns, set(row) - columns
+        assert _required_columns() <= set(row), _required_columns() - set(row)
+    insert(Ticket).values(rows).returning(Ticket.id).compile(dialect=postgresql.dialect())
+
+
+def test_insert_row_uses_ticket_columns_only():
+    ticket = TicketBase(**PAYLOAD, issue_slug="orders", category_slug="delivery", sub_category_slug="late")
+
+    row = ticket_insert_row(ticket, TAXONOMY)
+
+    _assert_insertable([row])
+    assert "issue_slug" not in row
+    assert row["outlet_issue_id"] == 1
+    assert ticket_taxonomy_key(ticket) == ("orders", "delivery", "late")
+
+
+def test_storefront_payload_maps_to_the_same_columns():
+    ticket = StorefrontTicketBase(**PAYLOAD, issue="orders", category="delivery", sub_category="late")
+
+    _assert_insertable([ticket_insert_row(ticket, TAXONOMY)])
+    assert ticket_taxonomy_key(ticket) == ("orders", "delivery", "late")
+
+
+def test_bulk_create_inserts_resolved_rows(monkeypatch):
+    inserted = []
+
+    async def fake_bulk_insert(model, rows):
+        inserted.extend(rows)
+        return list(range(1, len(rows) + 1))
+
+    async def fake_invalidate(outlet_id):
+        return None
+
+    monkeypatch.setattr(dao, "bulk_insert", fake_bulk_insert)
+    monkeypatch.setattr(dao, "invalidate_outlet", fake_invalidate)
+
+    tickets = [
+        TicketBase(**{**PAYLOAD, "support_ticket_id": f"TKT-00{n}"}, issue_slug="orders", category_slug="delivery", sub_category_slug="late")
+        for n in range(3)
+    ]
+    ids = asyncio.run(TicketsDao.bulk_create(tickets, {("orders", "delivery", "late"): TAXONOMY}))
+
+    assert ids == [1, 2, 3]
+    _assert_insertable(inserted)
+
+
+def test_legacy_assignment_list_is_not_read_or_written():
+    # reassignment history lives in ticket_assignment_events; the frozen column keeps its server default
+    assert "previous_assigned_agent_id" not in TicketBase.model_fields
+    assert "previous_assigned_agent_id" not in StorefrontTicketBase.model_fields
+    assert "previous_assigned_agent_id" not in dao.TICKET_LIST_FIELDS
@@ -0,0 +1,66 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+from cachetools import LRUCache
+
+from modules.ShopifyHarbour.services import TicketService as StorefrontTicketService
+from modules.TicketsHarbour.dao import OutletTaxonomyDao, SupportSettingsDao, TicketCounterDao, TicketNumberAllocator
+from modules.TicketsHarbour.services import TicketService
+
+SUPPORT_SETTINGS = SimpleNamespace(outlet_id=7, settings={"prefix": "TKT", "start_no": "001", "email_required": True, "auto_assign": False})
+
+
+@pytest.fixture
+def counter(monkeypatch):
+    """A per-outlet counter standing in for ticket_counters; returns the numbers handed out."""
+    last = {}
+
+    async def fake_allocate(outlet_id, start_no, count=1):
+        last[outlet_id] = last.get(outlet_id, 0) + count
+        return last[outlet_id]
+
+    monkeypatch.setattr(TicketCounterDao, "allocate", staticmethod(fake_allocate))
+    monkeypatch.setattr(TicketNumberAllocator, "_blocks", LRUCache(maxsize=2))
+    return last
+
+
+@pytest.fixture
+def storefront(monkeypatch, counter):
+    async def fake_settings(**kwargs):
+        return SUPPORT_SETTINGS
+
+    async def fake_resolve_one(outlet_id, slugs):
+        return {"outlet_issue_id": 1, "outlet_category_id": 1, "outlet_sub_category_id": 1}
+
+    monkeypatch.setattr(SupportSettingsDao, "get_by_outlet_id_or_web_url", staticmethod(fake_settings))
+    monkeypatch.setattr(OutletTaxonomyDao, "resolve_one", staticmethod(fake_resolve_one))
+    return counter
+
+
+@pytest.mark.parametrize("service", [TicketService, StorefrontTicketService])
+def test_invalid_ticket_is_rejected_before_a_number_is_taken(storefront, service):
+    body, status = asyncio.run(service.save(
+        web_url="shop.example.com",
+        subject=None,  # required
+        raised_by={"email": "sam@example.com"},
+        additional_details={"department": "support"},
+    ))
+
+    assert status == 400
+    assert body["error"] == "Invalid ticket"
+    assert storefront == {}
+
+
+def test_allocator_keeps_a_bounded_number_of_outlets(counter):
+    async def run() -> dict[int, list[int]]:
+        taken = {}
+        for outlet_id in (1, 2, 3, 1):
+            taken.setdefault(outlet_id, []).extend(await TicketNumberAllocator.take(outlet_id, 1, count=2))
+        return taken
+
+    taken = asyncio.run(run())
+
+    assert len(TicketNumberAllocator._blocks) == 2
+    # outlet 1 was evicted and came back; its numbers still never repeat
+    assert taken == {1: [1, 2, 3, 4], 2: [1, 2], 3: [1, 2]}
@@ -0,0 +1,92 @@
+import asyncio
+
+import asyncpg
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from modules.TicketsHarbour import dao
+from modules.TicketsHarbour.dao import TicketsDao
+from modules.TicketsHarbour.models import Ticket
+
+
+def captured_queries(monkeypatch, call) -> list:
+    queries = []
+
+    class Result:
+        def all(self):
+            return []
+
+    async def fake_execute_query(query):
+        queries.append(query)
+        return Result()
+
+    async def fake_count_tickets(query, key, count_mode):
+        return 0
+
+    monkeypatch.setattr(dao, "execute_query", fake_execute_query)
+    monkeypatch.setattr(dao, "_count_tickets", fake_count_tickets)
+    asyncio.run(call())
+    return queries
+
+
+def captured_open_tickets_query(monkeypatch, agent_ids):
+    return captured_queries(monkeypatch, lambda: TicketsDao.count_open_tickets_by_agents(agent_ids))[0]
+
+
+def captured_page_query(monkeypatch, filters):
+    return captured_queries(monkeypatch, lambda: TicketsDao.get_cursor_paginated_tickets(7, limit=20, filters=filters))[0]
+
+
+def compile_sql(query, literal_binds: bool = False) -> str:
+    return str(query.compile(dialect=postgresql.dialect(), compile_kwargs={"literal_binds": literal_binds}))
+
+
+def test_open_ticket_predicate_is_a_literal(monkeypatch):
+    compiled = captured_open_tickets_query(monkeypatch, [1, 2]).compile(dialect=postgresql.dialect())
+
+    # a bound 'closed' can't be matched against the partial index predicate
+    assert "tickets.status != 'closed'" in str(compiled)
+    assert "closed" not in compiled.params.values()
+
+
+def test_unused_outlet_indexes_are_gone():
+    names = {index.name for index in Ticket.__table__.indexes}
+
+    assert "ix_tickets_open_assigned_agent_id" in names
+    assert "ix_tickets_outlet_id" not in names
+    assert "ix_tickets_open_outlet_created_at" not in names
+
+
+def explain(dsn: str, sql: str) -> str:
+    async def run() -> str:
+        connection = await asyncpg.connect(dsn)
+        try:
+            async with connection.transaction():
+                # small test tables would otherwise always be scanned sequentially
+                await connection.execute("SET LOCAL enable_seqscan = off")
+                rows = await connection.fetch(f"EXPLAIN {sql}")
+                return "\n".join(row[0] for row in rows)
+        finally:
+            await connection.close()
+
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize("filters, index", [
+    (None, "ix_tickets_outlet_created_at_id"),
+    ({"status": "open"}, "ix_tickets_outlet_status_created_at"),
+    ({"priority": "high"}, "ix_tickets_outlet_priority_created_at"),
+    ({"department": "billing"}, "ix_tickets_outlet_department_created_at"),
+])
+def test_ticket_list_plans_on_its_composite_index(database_dsn, monkeypatch, filters, index):
+    sql = compile_sql(captured_page_query(monkeypatch, filters), literal_binds=True)
+
+    plan = explain(database_dsn, sql)
+    assert index in plan, plan
+
+
+def test_open_ticket_load_plans_on_the_partial_index(database_dsn, monkeypatch):
+    sql = compile_sql(captured_open_tickets_query(monkeypatch, [1, 2, 3]), literal_binds=True)
+
+    plan = explain(database_dsn, sql)
+    assert "ix_tickets_open_assigned_agent_id" in plan, plan
@@ -0,0 +1,113 @@
+import asyncio
+import hashlib
+import importlib.util
+import os
+import re
+import statistics
+import time
+from pathlib import Path
+
+import asyncpg
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.dialects.postgresql import asyncpg as pg_asyncpg
+
+from modules.TicketsHarbour.dao import _tickets_base_query
+from modules.TicketsHarbour.models import TICKET_SEARCH_TEXT_EXPRESSION, Ticket
+
+MIGRATION = Path(__file__).resolve().parents[1] / "alembic" / "versions" / "3dfcbcd0f50c_add_ticket_trigram_search_index.py"
+
+
+def normalized(sql: str) -> str:
+    return re.sub(r"\s+", "", sql)
+
+
+def load_migration():
+    spec = importlib.util.spec_from_file_location("add_ticket_trigram_search_index", MIGRATION)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_search_is_an_expression_index_not_a_column():
+    assert "search_text" not in Ticket.__table__.columns
+    # a generated column would rewrite tickets under ACCESS EXCLUSIVE
+    assert "Computed" not in MIGRATION.read_text()
+
+
+def test_queries_use_the_indexed_expression():
+    migration = load_migration()
+    sql = str(_tickets_base_query(1, search="Late Parcel").compile(dialect=postgresql.dialect()))
+
+    assert normalized(migration.SEARCH_TEXT_EXPRESSION) == normalized(TICKET_SEARCH_TEXT_EXPRESSION)
+    assert normalized(TICKET_SEARCH_TEXT_EXPRESSION) in normalized(sql)
+
+
+# ---- latency at scale (needs TEST_DATABASE_DSN) ----
+
+SEARCH_BENCHMARK_ROWS = int(os.environ.get("TEST_SEARCH_BENCHMARK_ROWS", 1_000_000))
+SEARCH_BENCHMARK_RUNS = 5
+
+# every NOT NULL column without a server default, the search haystack spread over 10 outlets
+SEED_TICKETS = """
+    INSERT INTO tickets (
+        id, support_ticket_id, outlet_id, subject, description, customer_details, raised_by, raised_by_id,
+        priority, department, status, outlet_issue_id, outlet_category_id, outlet_sub_category_id,
+        issue_name_snapshot, category_name_snapshot, sub_category_name_snapshot
+    )
+    SELECT
+        i, 'TKT-' || i, i % 10 + 1, 'Order ' || md5(i::text), 'The parcel has not arrived yet',
+        jsonb_build_object('customer_first_name', 'Sam', 'customer_last_name', 'Lee', 'customer_email', 'customer' || i || '@example.com'),
+        'customer', i, 'low', 'support', 'open', 1, 1, 1, 'Orders', 'Delivery', 'Late'
+    FROM generate_series(1, $1) AS i
+"""
+
+
+def search_sql(outlet_id: int, search: str) -> str:
+    query = _tickets_base_query(outlet_id, search=search).limit(20)
+    return str(query.compile(dialect=pg_asyncpg.dialect(), compile_kwargs={"literal_binds": True}))
+
+
+async def median_seconds(connection, sql: str) -> float:
+    timings = []
+    for _ in range(SEARCH_BENCHMARK_RUNS):
+        started = time.perf_counter()
+        await connection.fetch(sql)
+        timings.append(time.perf_counter() - started)
+    return statistics.median(timings)
+
+
+def test_search_latency_at_scale_uses_the_trigram_index(database_dsn):
+    migration = load_migration()
+    target = 424_242 % SEARCH_BENCHMARK_ROWS + 1
+    sql = search_sql(target % 10 + 1, hashlib.md5(str(target).encode()).hexdigest()[:12])
+
+    async def run() -> tuple[float, float, str]:
+        connection = await asyncpg.connect(database_dsn)
+        try:
+            # a session-local copy without triggers, foreign keys or indexes; it shadows
+            # public.tickets for this connection and disappears with it
+            await connection.execute("CREATE TEMP TABLE tickets (LIKE public.tickets INCLUDING DEFAULTS)")
+            await connection.execute(SEED_TICKETS, SEARCH_BENCHMARK_ROWS)
+            await connection.execute("ANALYZE tickets")
+            before = await median_seconds(connection, sql)
+
+            await connection.execute(f"""
+                CREATE INDEX ix_tickets_outlet_search_text_trgm
+                ON tickets USING gin (outlet_id, ({migration.SEARCH_TEXT_EXPRESSION}) gin_trgm_ops)
+            """)
+            await connection.execute("ANALYZE tickets")
+            plan = "\n".join(row[0] for row in await connection.fetch(f"EXPLAIN {sql}"))
+            after = await median_seconds(connection, sql)
+            return before, after, plan
+        finally:
+            await connection.close()
+
+    before, after, plan = asyncio.run(run())
+
+    print(
+        f"\nticket search over {SEARCH_BENCHMARK_ROWS} tickets: "
+        f"without index {before * 1e3:.1f} ms, with trigram index {after * 1e3:.1f} ms "
+        f"({before / after:.0f}x)"
+    )
+    assert "ix_tickets_outlet_search_text_trgm" in plan, plan
+    assert after < before
@@ -0,0 +1,69 @@
+import asyncio
+import importlib.util
+from pathlib import Path
+from types import SimpleNamespace
+
+from modules.TicketsHarbour import dao
+from modules.TicketsHarbour.dao import TicketStatsDao
+
+MIGRATION = Path(__file__).resolve().parents[1] / "alembic" / "versions" / "2fa0e7e63bd6_buffer_ticket_stats_in_delta_rows.py"
+
+
+def load_migration():
+    spec = importlib.util.spec_from_file_location("buffer_ticket_stats_in_delta_rows", MIGRATION)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def test_trigger_only_appends_deltas():
+    migration = load_migration()
+    function = migration.trigger_function(migration.APPEND_DELTAS)
+
+    # the request transaction must not take the rollup row lock
+    assert "INSERT INTO ticket_stats_deltas" in function
+    assert "INSERT INTO ticket_stats " not in function and "ON CONFLICT" not in function
+    assert function.count("INSERT INTO ticket_stats_deltas") == 3
+
+
+def test_stats_read_adds_buffered_deltas(monkeypatch):
+    queries = []
+
+    class Result:
+        def first(self):
+            return SimpleNamespace(total_count=7, open_count=3, pending_count=1, closed_count=2, assigned_count=1)
+
+    async def fake_execute_query(query):
+        queries.append(str(query))
+        return Result()
+
+    monkeypatch.setattr(dao, "execute_query", fake_execute_query)
+    stats = asyncio.run(TicketStatsDao.get_by_outlet_id(11))
+
+    assert "ticket_stats_deltas" in queries[0]
+    assert stats == {
+        "total_tickets_count": 7,
+        "open_tickets_count": 3,
+        "pending_tickets_count": 1,
+        "closed_tickets_count": 2,
+        "assigned_tickets_count": 1,
+    }
+
+
+def test_reconcile_all_keeps_going_after_a_failed_outlet(monkeypatch):
+    class Result:
+        def scalars(self):
+            return SimpleNamespace(all=lambda: [1, 2, 3])
+
+    async def fake_execute_query(query):
+        return Result()
+
+    async def fake_reconcile(outlet_id):
+        if outlet_id == 2:
+            raise RuntimeError("could not serialize access due to concurrent update")
+        return outlet_id == 3
+
+    monkeypatch.setattr(dao, "execute_query", fake_execute_query)
+    monkeypatch.setattr(TicketStatsDao, "reconcile", staticmethod(fake_reconcile))
+
+    assert asyncio.run(TicketStatsDao.reconcile_all()) == 1
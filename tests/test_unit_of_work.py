@@ -0,0 +1,45 @@
+import asyncio
+
+from fastapi import params
+from sqlalchemy.exc import IntegrityError
+
+from app.database import after_commit, get_unit_of_work, on_rollback, session_scope, unit_of_work
+from modules.ShopifyHarbour.routers import router as shopify_router
+from modules.TicketsHarbour.routers import router as tickets_router
+
+
+def test_handled_database_error_rolls_the_unit_of_work_back():
+    ran = []
+
+    async def request() -> None:
+        async with unit_of_work():
+            await after_commit(lambda: asyncio.sleep(0, ran.append("after_commit")))
+            await on_rollback(lambda: asyncio.sleep(0, ran.append("on_rollback")))
+            try:
+                async with session_scope():
+                    raise IntegrityError("INSERT INTO tickets ...", {}, Exception("duplicate key"))
+            except IntegrityError:
+                # what a service does before returning {"error": ...}, 500
+                pass
+
+    asyncio.run(request())
+
+    assert ran == ["on_rollback"]
+
+
+def test_clean_unit_of_work_commits():
+    ran = []
+
+    async def request() -> None:
+        async with unit_of_work():
+            await after_commit(lambda: asyncio.sleep(0, ran.append("after_commit")))
+            await on_rollback(lambda: asyncio.sleep(0, ran.append("on_rollback")))
+
+    asyncio.run(request())
+
+    assert ran == ["after_commit"]
+
+
+def test_every_ticket_router_runs_in_a_unit_of_work():
+    for router in (tickets_router, shopify_router):
+        assert any(isinstance(dependency, params.Depends) and dependency.dependency is get_unit_of_work for dependency in router.dependencies)
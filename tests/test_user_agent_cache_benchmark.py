@@ -0,0 +1,38 @@
+import timeit
+
+from modules.TicketsHarbour.controller import _source_from_user_agent
+
+# a handful of distinct UAs, the way real ticket traffic looks
+USER_AGENTS = [
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0.0.0 Safari/537.36",
+    "Mozilla/5.0 (iPhone; CPU iPhone OS 17_5 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.5 Mobile/15E148 Safari/604.1",
+    "Mozilla/5.0 (Macintosh; Intel Mac OS X 14_5) AppleWebKit/605.1.15 (KHTML, like Gecko) Version/17.5 Safari/605.1.15",
+    "Mozilla/5.0 (Linux; Android 14; Pixel 8) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/126.0.0.0 Mobile Safari/537.36",
+]
+
+ROUNDS = 200
+
+
+def parse_all(parse) -> None:
+    for user_agent in USER_AGENTS:
+        parse(user_agent)
+
+
+def test_cached_user_agent_parsing_beats_parsing_every_request():
+    uncached = _source_from_user_agent.__wrapped__
+    _source_from_user_agent.cache_clear()
+    parse_all(_source_from_user_agent)
+
+    uncached_seconds = min(timeit.repeat(lambda: parse_all(uncached), number=ROUNDS, repeat=3))
+    cached_seconds = min(timeit.repeat(lambda: parse_all(_source_from_user_agent), number=ROUNDS, repeat=3))
+
+    requests = ROUNDS * len(USER_AGENTS)
+    print(
+        f"\nuser agent parsing, {requests} requests: "
+        f"uncached {uncached_seconds * 1e6 / requests:.1f} us/request, "
+        f"cached {cached_seconds * 1e6 / requests:.2f} us/request "
+        f"({uncached_seconds / cached_seconds:.0f}x)"
+    )
+    assert _source_from_user_agent(USER_AGENTS[0]) == uncached(USER_AGENTS[0])
+    # a cache hit is a dict lookup; anything under 10x means the cache isn't being hit
+    assert cached_seconds * 10 < uncached_seconds